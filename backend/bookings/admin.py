@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Booking, BookingStatusHistory
+from .models import Booking, BookingStatusHistory, BookingDailyRollup, OutboxEmail
+from .services import bulk_transition
 
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
@@ -29,8 +30,11 @@ class BookingAdmin(admin.ModelAdmin):
         'tour_package__title'
     )
     
+    # El estado solo cambia con las acciones, que pasan por bookings.services
+    # (cupos, historial y resúmenes diarios)
     readonly_fields = (
         'booking_code',
+        'status',
         'created_at',
         'updated_at',
         'paid_at',
@@ -124,12 +128,18 @@ class BookingAdmin(admin.ModelAdmin):
     
     @admin.action(description='Marcar como Confirmadas')
     def mark_as_confirmed(self, request, queryset):
-        updated = queryset.filter(status='PENDING').update(status='CONFIRMED')
+        updated = bulk_transition(
+            queryset.filter(status='PENDING'), Booking.Status.CONFIRMED,
+            changed_by=request.user, notes='Acción del admin'
+        )
         self.message_user(request, f'{updated} reservas marcadas como confirmadas.')
     
     @admin.action(description='Marcar como Completadas')
     def mark_as_completed(self, request, queryset):
-        updated = queryset.filter(status='CONFIRMED').update(status='COMPLETED')
+        updated = bulk_transition(
+            queryset.filter(status='CONFIRMED'), Booking.Status.COMPLETED,
+            changed_by=request.user, notes='Acción del admin'
+        )
         self.message_user(request, f'{updated} reservas marcadas como completadas.')
 
 @admin.register(BookingStatusHistory)
@@ -137,4 +147,19 @@ class BookingStatusHistoryAdmin(admin.ModelAdmin):
     list_display = ('booking', 'from_status', 'to_status', 'changed_by', 'created_at')
     list_filter = ('from_status', 'to_status', 'created_at')
     search_fields = ('booking__booking_code', 'notes')
-    readonly_fields = ('created_at',)
\ No newline at end of file
+    readonly_fields = ('created_at',)
+
+@admin.register(BookingDailyRollup)
+class BookingDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ('day', 'tour_package', 'operator', 'status', 'bookings_count', 'people', 'gross_amount')
+    list_filter = ('status', 'day')
+    search_fields = ('tour_package__title', 'operator__username')
+    list_select_related = ('tour_package', 'operator')
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('subject', 'booking__booking_code')
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+    raw_id_fields = ('booking',)
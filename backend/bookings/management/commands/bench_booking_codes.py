@@ -0,0 +1,106 @@
+import string
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from bookings.models import Booking
+from tours.management.commands._bench import (
+    best_of, create_bench_bookings, create_bench_tours, create_bench_user, rolled_back,
+)
+
+
+def legacy_booking_code():
+    """Generación anterior: código al azar + exists() hasta encontrar uno libre"""
+    while True:
+        code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
+        if not Booking.objects.filter(booking_code=code).exists():
+            return code
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara la creación de reservas con el código anterior (exists() antes "
+        "del INSERT) y el actual (INSERT y reintento ante IntegrityError) sobre "
+        "reservas de prueba (se crean en una transacción que se revierte)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--existing',
+            type=int,
+            default=1000000,
+            help='Reservas existentes antes de medir (por defecto 1000000)'
+        )
+        parser.add_argument(
+            '--bookings',
+            type=int,
+            default=2000,
+            help='Reservas creadas con save() en cada medición (por defecto 2000)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Mediciones por variante; se toma la mejor (por defecto 3)'
+        )
+
+    def handle(self, *args, **options):
+        existing = options['existing']
+        count = options['bookings']
+
+        with rolled_back():
+            self.stderr.write(f'Creando {existing} reservas de prueba...')
+            tours = create_bench_tours(20)
+            traveler = create_bench_user('bench_traveler', 'TRAVELER')
+            chunk = 50000
+            for start in range(0, existing, chunk):
+                create_bench_bookings(tours, min(chunk, existing - start), traveler, start=start)
+                self.stderr.write(f'{min(start + chunk, existing)}/{existing}')
+
+            template = Booking.objects.order_by('pk').first()
+
+            def create(code_for, count=count):
+                def run():
+                    with rolled_back():
+                        for _ in range(count):
+                            booking = Booking(
+                                tour_package_id=template.tour_package_id,
+                                traveler_id=template.traveler_id,
+                                travel_date=template.travel_date,
+                                tickets_detail=template.tickets_detail,
+                                tickets_prices=template.tickets_prices,
+                                subtotal_tickets=template.subtotal_tickets,
+                                total_amount=template.total_amount,
+                                commission_amount=template.commission_amount,
+                                operator_amount=template.operator_amount,
+                                commission_rate=template.commission_rate,
+                                contact_name=template.contact_name,
+                                contact_email=template.contact_email,
+                                contact_phone=template.contact_phone,
+                                booking_code=code_for(),
+                            )
+                            booking.save()
+                return run
+
+            legacy = best_of(create(legacy_booking_code), options['repeat'])
+            current = best_of(create(lambda: ''), options['repeat'])
+
+            # Sentencias SQL por reserva (incluye las de las señales de Booking)
+            statements = {}
+            for label, code_for in (('legacy', legacy_booking_code), ('current', lambda: '')):
+                with CaptureQueriesContext(connection) as queries:
+                    create(code_for, count=10)()
+                statements[label] = (len(queries) - 2) / 10
+
+        self.stdout.write(f'{count} reservas con {existing} existentes:')
+        for label, elapsed, key in (
+            ('exists() + INSERT', legacy, 'legacy'),
+            ('INSERT + reintento', current, 'current'),
+        ):
+            self.stdout.write(
+                f'  {label}: {elapsed:.2f} s | {count / elapsed:.0f} reservas/s | '
+                f'{elapsed / count * 1000:.2f} ms/reserva | {statements[key]:.1f} sentencias/reserva'
+            )
+        self.stdout.write(f'  x{legacy / current:.2f}')
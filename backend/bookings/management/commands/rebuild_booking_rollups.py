@@ -0,0 +1,31 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = "Reconstruye BookingDailyRollup a partir de las reservas"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--operator',
+            help='Solo los resúmenes de este operador (username)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Filas por bulk_create (por defecto 1000)'
+        )
+
+    def handle(self, *args, **options):
+        operator = None
+        if options['operator']:
+            try:
+                operator = get_user_model().objects.get(username=options['operator'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"No existe el usuario {options['operator']}")
+
+        created = rebuild(operator=operator, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{created} resúmenes diarios creados.'))
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookings.outbox import deliver_due
+
+
+class Command(BaseCommand):
+    help = "Envía los emails pendientes de bookings.OutboxEmail (worker en bucle o una sola pasada)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Emails por conexión SMTP (por defecto 100)'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Segundos de espera cuando no hay emails pendientes (por defecto 5)'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Envía lo pendiente y termina'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            result = deliver_due(batch_size=options['batch_size'])
+            if any(result.values()):
+                self.stdout.write(
+                    f"{result['sent']} enviados, {result['retrying']} a reintentar, "
+                    f"{result['failed']} fallidos"
+                )
+
+            # Lote completo: probablemente quedan más, seguir sin esperar
+            if sum(result.values()) >= options['batch_size']:
+                continue
+            if options['once']:
+                break
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                break
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:41
+
+from django.db import migrations, models
+
+
+def backfill_people_count(apps, schema_editor):
+    Booking = apps.get_model('bookings', 'Booking')
+    pending = []
+    for booking in Booking.objects.only('id', 'tickets_detail').iterator(chunk_size=500):
+        booking.people_count = sum((booking.tickets_detail or {}).values())
+        pending.append(booking)
+        if len(pending) >= 500:
+            Booking.objects.bulk_update(pending, ['people_count'])
+            pending = []
+    if pending:
+        Booking.objects.bulk_update(pending, ['people_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='people_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Cantidad de Personas'),
+        ),
+        migrations.RunPython(backfill_people_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:48
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_booking_rollups(apps, schema_editor):
+    """Mismo cálculo que bookings.rollups.rebuild, con los modelos históricos"""
+    Booking = apps.get_model('bookings', 'Booking')
+    BookingDailyRollup = apps.get_model('bookings', 'BookingDailyRollup')
+
+    grouped = Booking.objects.order_by().values(
+        'tour_package_id',
+        'status',
+        operator_id=F('tour_package__operator_id'),
+        day=TruncDate('booking_date'),
+    ).annotate(
+        total_bookings=Count('id'),
+        total_people=Sum('people_count'),
+        total_gross=Sum('total_amount'),
+        total_commission=Sum('commission_amount'),
+        total_operator=Sum('operator_amount'),
+    )
+    BookingDailyRollup.objects.bulk_create([
+        BookingDailyRollup(
+            operator_id=row['operator_id'],
+            tour_package_id=row['tour_package_id'],
+            day=row['day'],
+            status=row['status'],
+            bookings_count=row['total_bookings'],
+            people=row['total_people'] or 0,
+            gross_amount=row['total_gross'] or Decimal('0.00'),
+            commission_amount=row['total_commission'] or Decimal('0.00'),
+            operator_amount=row['total_operator'] or Decimal('0.00'),
+        )
+        for row in grouped.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0002_booking_people_count'),
+        ('tours', '0012_departure_inventory'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Día')),
+                ('status', models.CharField(choices=[('PENDING', 'Pendiente de Pago'), ('CONFIRMED', 'Confirmada'), ('CANCELLED', 'Cancelada'), ('COMPLETED', 'Completada'), ('REFUNDED', 'Reembolsada')], max_length=20, verbose_name='Estado')),
+                ('bookings_count', models.IntegerField(default=0, verbose_name='Reservas')),
+                ('people', models.IntegerField(default=0, verbose_name='Personas')),
+                ('gross_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Total Cobrado')),
+                ('commission_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Comisión')),
+                ('operator_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Monto Operador')),
+                ('operator', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_rollups', to=settings.AUTH_USER_MODEL)),
+                ('tour_package', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booking_rollups', to='tours.tourpackage')),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario de Reservas',
+                'verbose_name_plural': 'Resúmenes Diarios de Reservas',
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['operator', 'day'], name='bookings_bo_operato_d462f1_idx')],
+                'constraints': [models.UniqueConstraint(fields=('tour_package', 'day', 'status'), name='unique_booking_rollup_per_tour_day_status')],
+            },
+        ),
+        migrations.RunPython(backfill_booking_rollups, migrations.RunPython.noop),
+    ]
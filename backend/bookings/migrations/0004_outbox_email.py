@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:49
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0003_booking_daily_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=255, verbose_name='Asunto')),
+                ('body', models.TextField(verbose_name='Mensaje')),
+                ('from_email', models.CharField(max_length=255, verbose_name='Remitente')),
+                ('recipients', models.JSONField(verbose_name='Destinatarios')),
+                ('status', models.CharField(choices=[('PENDING', 'Pendiente'), ('SENT', 'Enviado'), ('FAILED', 'Fallido')], default='PENDING', max_length=20, verbose_name='Estado')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Intentos')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Próximo Intento')),
+                ('last_error', models.TextField(blank=True, verbose_name='Último Error')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('booking', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='outbox_emails', to='bookings.booking')),
+            ],
+            options={
+                'verbose_name': 'Email Pendiente',
+                'verbose_name_plural': 'Emails Pendientes',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='bookings_ou_status_b587e4_idx')],
+            },
+        ),
+    ]
@@ -4,13 +4,34 @@ Modelo de Reservas para VENTU
 Implementa el sistema completo de booking con tracking de precios y estados
 """
 
-from django.db import models
+from django.db import models, router, transaction, IntegrityError
 from django.conf import settings
+from django.utils import timezone
 from django.core.validators import MinValueValidator
 from decimal import Decimal
-import random
+import secrets
 import string
 
+BOOKING_CODE_ALPHABET = string.ascii_uppercase + string.digits
+BOOKING_CODE_LENGTH = 8
+# Intentos de INSERT antes de rendirse ante colisiones de booking_code
+BOOKING_CODE_ATTEMPTS = 5
+
+
+def generate_booking_code():
+    """Código aleatorio no adivinable (secrets), p. ej. 'K7Q2ZP9A'"""
+    return ''.join(secrets.choice(BOOKING_CODE_ALPHABET) for _ in range(BOOKING_CODE_LENGTH))
+
+# Reservas vigentes o ya viajadas (sin canceladas ni reembolsadas): las que
+# cuentan en los totales de reservas y viajeros de los paneles
+ACTIVE_STATUSES = ('PENDING', 'CONFIRMED', 'COMPLETED')
+
+# Campos de Booking que definen su aporte a BookingDailyRollup
+ROLLUP_FIELDS = (
+    'tour_package_id', 'booking_date', 'status',
+    'people_count', 'total_amount', 'commission_amount', 'operator_amount',
+)
+
 class Booking(models.Model):
     """
     Representa una reserva de un paquete turístico por parte de un viajero.
@@ -65,6 +86,14 @@ class Booking(models.Model):
         help_text='Cantidad de personas por tipo de ticket'
     )
     
+    # Total de personas de tickets_detail (calculado en save), para poder
+    # sumar cupos por día en SQL sin leer el JSON
+    people_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Cantidad de Personas'
+    )
+    
     # Precios de cada tipo al momento de la reserva (snapshot)
     # Formato: {"adulto": "110.00", "niño": "55.00"}
     tickets_prices = models.JSONField(
@@ -248,6 +277,8 @@ class Booking(models.Model):
         Calcula todos los totales basándose en tickets_detail y selected_extras.
         Debe llamarse antes de guardar una nueva reserva.
         """
+        self.people_count = self.total_people
+        
         # Calcular subtotal de tickets
         self.subtotal_tickets = Decimal('0.00')
         for ticket_type, quantity in self.tickets_detail.items():
@@ -274,52 +305,77 @@ class Booking(models.Model):
         )
         self.operator_amount = self.total_amount - self.commission_amount
     
-    def confirm_payment(self, payment_id, payment_method):
+    def confirm_payment(self, payment_id, payment_method, changed_by=None):
         """Marca la reserva como confirmada tras pago exitoso"""
         from django.utils import timezone
+        from .services import transition
         
-        self.status = self.Status.CONFIRMED
-        self.payment_id = payment_id
-        self.payment_method = payment_method
-        self.paid_at = timezone.now()
-        self.save()
-    
-    def cancel(self, reason=''):
-        """Cancela la reserva y libera los cupos"""
-        from django.utils import timezone
+        transition(
+            self, self.Status.CONFIRMED, changed_by=changed_by,
+            payment_id=payment_id,
+            payment_method=payment_method,
+            paid_at=timezone.now(),
+        )
+    
+    def cancel(self, reason='', changed_by=None):
+        """Cancela la reserva y libera los cupos (ver bookings.services)"""
+        from .services import transition
         
         if not self.can_be_cancelled:
             raise ValueError('Esta reserva no puede ser cancelada')
         
-        self.status = self.Status.CANCELLED
-        self.cancelled_at = timezone.now()
-        self.cancellation_reason = reason
-        self.save()
-        
-        # Liberar cupos en el tour
-        self.tour_package.decrement_bookings(self.total_people)
+        transition(
+            self, self.Status.CANCELLED, changed_by=changed_by, notes=reason,
+            cancellation_reason=reason,
+        )
     
-    def complete(self):
+    def complete(self, changed_by=None):
         """Marca la reserva como completada (después del viaje)"""
-        self.status = self.Status.COMPLETED
-        self.save()
+        from .services import transition
+        
+        transition(self, self.Status.COMPLETED, changed_by=changed_by)
     
     def save(self, *args, **kwargs):
-        """Sobrescribir save para generar código único"""
-        # Generar código de reserva único
-        if not self.booking_code:
-            while True:
-                code = ''.join(
-                    random.choices(
-                        string.ascii_uppercase + string.digits, 
-                        k=8
-                    )
-                )
-                if not Booking.objects.filter(booking_code=code).exists():
-                    self.booking_code = code
-                    break
+        """
+        Sobrescribir save para generar código único.
         
-        super().save(*args, **kwargs)
+        El código se genera al azar y se inserta directamente: la
+        restricción UNIQUE de booking_code detecta una colisión (muy
+        improbable con 36^8 combinaciones) y solo entonces se reintenta con
+        otro código. Así no hay una consulta previa por reserva ni una
+        carrera entre la comprobación y el INSERT.
+        """
+        self.people_count = self.total_people
+        
+        if self.booking_code or not self._state.adding:
+            return super().save(*args, **kwargs)
+        
+        using = kwargs.get('using') or router.db_for_write(Booking, instance=self)
+        for attempt in range(BOOKING_CODE_ATTEMPTS):
+            self.booking_code = generate_booking_code()
+            try:
+                # Dentro de una transacción, un savepoint permite seguir tras el error
+                if transaction.get_connection(using).in_atomic_block:
+                    with transaction.atomic(using=using):
+                        super().save(*args, **kwargs)
+                else:
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                code, self.booking_code = self.booking_code, ''
+                last_attempt = attempt == BOOKING_CODE_ATTEMPTS - 1
+                # Otra restricción falló: no es un problema del código
+                if last_attempt or not Booking.objects.using(using).filter(booking_code=code).exists():
+                    raise
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Guarda los valores leídos que afectan a BookingDailyRollup (ver bookings.rollups)"""
+        booking = super().from_db(db, field_names, values)
+        booking._rollup_snapshot = {
+            name: getattr(booking, name) for name in ROLLUP_FIELDS if name in field_names
+        }
+        return booking
     
     def __str__(self):
         return f"Reserva {self.booking_code} - {self.tour_package.title}"
@@ -381,3 +437,119 @@ class BookingStatusHistory(models.Model):
         verbose_name = 'Historial de Estado'
         verbose_name_plural = 'Historiales de Estado'
         ordering = ['-created_at']
+
+
+class BookingDailyRollup(models.Model):
+    """
+    Reservas agregadas por operador, tour, día de creación y estado.
+    Se mantiene de forma incremental desde bookings.signals y se puede
+    reconstruir con `manage.py rebuild_booking_rollups`. Los dashboards
+    leen de aquí en vez de recorrer todas las reservas.
+    """
+    operator = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='booking_rollups'
+    )
+    tour_package = models.ForeignKey(
+        'tours.TourPackage',
+        on_delete=models.CASCADE,
+        related_name='booking_rollups'
+    )
+    day = models.DateField(verbose_name='Día')
+    status = models.CharField(
+        max_length=20,
+        choices=Booking.Status.choices,
+        verbose_name='Estado'
+    )
+    
+    bookings_count = models.IntegerField(default=0, verbose_name='Reservas')
+    people = models.IntegerField(default=0, verbose_name='Personas')
+    gross_amount = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name='Total Cobrado'
+    )
+    commission_amount = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name='Comisión'
+    )
+    operator_amount = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        verbose_name='Monto Operador'
+    )
+    
+    class Meta:
+        verbose_name = 'Resumen Diario de Reservas'
+        verbose_name_plural = 'Resúmenes Diarios de Reservas'
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tour_package', 'day', 'status'],
+                name='unique_booking_rollup_per_tour_day_status'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['operator', 'day']),
+        ]
+    
+    def __str__(self):
+        return f"{self.tour_package_id} {self.day} {self.status}: {self.bookings_count}"
+
+
+class OutboxEmail(models.Model):
+    """
+    Email pendiente de envío (patrón outbox). Se crea en la misma
+    transacción que el cambio que lo origina, así que si esa transacción
+    se revierte el email no sale. Lo entrega `manage.py run_outbox`
+    (ver bookings.outbox).
+    """
+    
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pendiente'
+        SENT = 'SENT', 'Enviado'
+        FAILED = 'FAILED', 'Fallido'
+    
+    booking = models.ForeignKey(
+        Booking,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='outbox_emails'
+    )
+    subject = models.CharField(max_length=255, verbose_name='Asunto')
+    body = models.TextField(verbose_name='Mensaje')
+    from_email = models.CharField(max_length=255, verbose_name='Remitente')
+    recipients = models.JSONField(verbose_name='Destinatarios')
+    
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING,
+        verbose_name='Estado'
+    )
+    attempts = models.PositiveIntegerField(default=0, verbose_name='Intentos')
+    next_attempt_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Próximo Intento'
+    )
+    last_error = models.TextField(blank=True, verbose_name='Último Error')
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Email Pendiente'
+        verbose_name_plural = 'Emails Pendientes'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.subject} ({self.get_status_display()})"
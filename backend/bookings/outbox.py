@@ -0,0 +1,124 @@
+"""
+Outbox de emails de reservas.
+
+- message(...) / enqueue(messages): guarda emails en OutboxEmail con un
+  solo INSERT (sin conexión SMTP).
+- deliver_due(...): envía un lote de emails pendientes por una sola
+  conexión; usado por `manage.py run_outbox`.
+
+Cada lote se reserva antes de enviarlo (next_attempt_at = ahora + LEASE)
+en una transacción corta con select_for_update(skip_locked), así varios
+workers no envían el mismo email y no se mantiene una transacción abierta
+mientras se habla con el servidor SMTP.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+# Tiempo que un worker se reserva un lote antes de que otro pueda tomarlo
+LEASE = timedelta(minutes=5)
+
+
+def message(subject, body, recipients, booking=None, from_email=None):
+    """OutboxEmail sin guardar (ver enqueue)"""
+    return OutboxEmail(
+        booking=booking,
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipients),
+    )
+
+
+def enqueue(messages):
+    """Guarda los mensajes en la transacción actual; run_outbox los envía"""
+    return OutboxEmail.objects.bulk_create(
+        [email for email in messages if any(email.recipients)]
+    )
+
+
+def deliver_due(batch_size=100, max_attempts=None, backoff=None, now=None):
+    """
+    Envía hasta `batch_size` emails pendientes cuyo próximo intento ya
+    venció. Los que fallan se reprograman con espera exponencial
+    (backoff * 2^(intentos-1)) y pasan a FAILED al agotar max_attempts.
+    Devuelve {'sent': n, 'failed': m, 'retrying': k}.
+    """
+    max_attempts = max_attempts or settings.OUTBOX_MAX_ATTEMPTS
+    backoff = backoff if backoff is not None else settings.OUTBOX_RETRY_BACKOFF
+    now = now or timezone.now()
+
+    emails = _claim(batch_size, now)
+    result = {'sent': 0, 'failed': 0, 'retrying': 0}
+    if not emails:
+        return result
+
+    sent, failures = [], []
+    connection = get_connection()
+    try:
+        connection.open()
+        for email in emails:
+            try:
+                EmailMessage(
+                    subject=email.subject,
+                    body=email.body,
+                    from_email=email.from_email,
+                    to=email.recipients,
+                    connection=connection,
+                ).send()
+            except Exception as e:
+                failures.append((email, f'{type(e).__name__}: {e}'))
+            else:
+                sent.append(email.pk)
+    except Exception as e:
+        # No se pudo abrir la conexión: todo el lote cuenta como intento fallido
+        sent_ids = set(sent)
+        failures = [(email, f'{type(e).__name__}: {e}') for email in emails if email.pk not in sent_ids]
+    finally:
+        connection.close()
+
+    if sent:
+        OutboxEmail.objects.filter(pk__in=sent).update(
+            status=OutboxEmail.Status.SENT,
+            sent_at=timezone.now(),
+            last_error='',
+        )
+        result['sent'] = len(sent)
+
+    for email, error in failures:
+        email.attempts += 1
+        email.last_error = error
+        if email.attempts >= max_attempts:
+            email.status = OutboxEmail.Status.FAILED
+            result['failed'] += 1
+        else:
+            email.next_attempt_at = now + timedelta(seconds=backoff * 2 ** (email.attempts - 1))
+            result['retrying'] += 1
+    if failures:
+        OutboxEmail.objects.bulk_update(
+            [email for email, _ in failures],
+            ['attempts', 'last_error', 'status', 'next_attempt_at'],
+        )
+    return result
+
+
+def _claim(batch_size, now):
+    """Reserva el siguiente lote vencido para este worker"""
+    with transaction.atomic():
+        emails = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True).filter(
+                status=OutboxEmail.Status.PENDING,
+                next_attempt_at__lte=now,
+            ).order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if emails:
+            OutboxEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+                next_attempt_at=now + LEASE
+            )
+    return emails
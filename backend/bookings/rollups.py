@@ -0,0 +1,149 @@
+"""
+Mantenimiento de BookingDailyRollup.
+
+Cada reserva aporta una fila (tour, día de creación, estado) con su conteo,
+personas y montos. Al crear, cambiar o borrar una reserva se resta el aporte
+anterior y se suma el nuevo con UPDATEs atómicos (F()), así dos reservas
+simultáneas del mismo tour no se pisan.
+
+- apply_change(before, after): aplica la diferencia entre dos aportes.
+- apply_status_change(rows, to_status): para cambios de estado masivos.
+- rebuild(operator=None): recalcula la tabla desde las reservas.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from tours.models import TourPackage
+from .models import Booking, BookingDailyRollup, ROLLUP_FIELDS
+
+
+def contribution(values):
+    """
+    Aporte de una reserva a partir de sus ROLLUP_FIELDS (dict o Booking):
+    ((tour_package_id, día, estado), {contadores}).
+    """
+    if not isinstance(values, dict):
+        values = {name: getattr(values, name) for name in ROLLUP_FIELDS}
+    key = (
+        values['tour_package_id'],
+        timezone.localdate(values['booking_date']),
+        values['status'],
+    )
+    return key, {
+        'bookings_count': 1,
+        'people': values['people_count'],
+        'gross_amount': values['total_amount'],
+        'commission_amount': values['commission_amount'],
+        'operator_amount': values['operator_amount'],
+    }
+
+
+def apply_change(before, after):
+    """Resta el aporte `before` y suma `after` (cualquiera puede ser None)"""
+    deltas = defaultdict(lambda: defaultdict(int))
+    for item, sign in ((before, -1), (after, 1)):
+        if item is None:
+            continue
+        key, counters = contribution(item)
+        for name, value in counters.items():
+            deltas[key][name] += sign * value
+    _apply_deltas(deltas)
+
+
+def apply_status_change(rows, to_status):
+    """
+    Mueve el aporte de varias reservas a `to_status`. `rows` son dicts con
+    ROLLUP_FIELDS y el estado anterior en 'status'.
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+    for row in rows:
+        (tour_id, day, from_status), counters = contribution(row)
+        for name, value in counters.items():
+            deltas[tour_id, day, from_status][name] -= value
+            deltas[tour_id, day, to_status][name] += value
+    _apply_deltas(deltas)
+
+
+def _apply_deltas(deltas):
+    deltas = {
+        key: counters for key, counters in deltas.items()
+        if any(counters.values())
+    }
+    if not deltas:
+        return
+    operators = dict(
+        TourPackage.objects.filter(
+            pk__in={tour_id for tour_id, _, _ in deltas}
+        ).values_list('pk', 'operator_id')
+    )
+    with transaction.atomic():
+        for (tour_id, day, status), counters in deltas.items():
+            _add(operators[tour_id], tour_id, day, status, counters)
+
+
+def _add(operator_id, tour_id, day, status, counters):
+    """UPDATE += contadores; si la fila no existe se crea (y se reintenta si otro la creó antes)"""
+    rows = BookingDailyRollup.objects.filter(tour_package_id=tour_id, day=day, status=status)
+    changes = {name: F(name) + value for name, value in counters.items()}
+    if rows.update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            BookingDailyRollup.objects.create(
+                operator_id=operator_id,
+                tour_package_id=tour_id,
+                day=day,
+                status=status,
+                **counters
+            )
+    except IntegrityError:
+        rows.update(**changes)
+
+
+def rebuild(operator=None, batch_size=1000):
+    """
+    Recalcula los resúmenes desde Booking (de un operador o de todos) con un
+    GROUP BY. Devuelve la cantidad de filas creadas.
+    """
+    bookings = Booking.objects.all()
+    rollups = BookingDailyRollup.objects.all()
+    if operator is not None:
+        bookings = bookings.filter(tour_package__operator=operator)
+        rollups = rollups.filter(operator=operator)
+
+    grouped = bookings.order_by().values(
+        'tour_package_id',
+        'status',
+        operator_id=F('tour_package__operator_id'),
+        day=TruncDate('booking_date'),
+    ).annotate(
+        total_bookings=Count('id'),
+        total_people=Sum('people_count'),
+        total_gross=Sum('total_amount'),
+        total_commission=Sum('commission_amount'),
+        total_operator=Sum('operator_amount'),
+    )
+
+    with transaction.atomic():
+        rollups.delete()
+        created = BookingDailyRollup.objects.bulk_create([
+            BookingDailyRollup(
+                operator_id=row['operator_id'],
+                tour_package_id=row['tour_package_id'],
+                day=row['day'],
+                status=row['status'],
+                bookings_count=row['total_bookings'],
+                people=row['total_people'] or 0,
+                gross_amount=row['total_gross'] or Decimal('0.00'),
+                commission_amount=row['total_commission'] or Decimal('0.00'),
+                operator_amount=row['total_operator'] or Decimal('0.00'),
+            )
+            for row in grouped.iterator()
+        ], batch_size=batch_size)
+    return len(created)
@@ -4,11 +4,13 @@ Serializers para el sistema de reservas
 """
 
 from rest_framework import serializers
+from django.db import transaction
 from django.utils import timezone
 from decimal import Decimal
 from .models import Booking, BookingStatusHistory
 from tours.serializers import TourPackageListSerializer
 from users.serializers import UserProfileSerializer
+from ventu_api.serializers import SparseFieldsetMixin
 
 
 class BookingCreateSerializer(serializers.ModelSerializer):
@@ -59,7 +61,7 @@ class BookingCreateSerializer(serializers.ModelSerializer):
         tour_package = attrs['tour_package']
         tickets_detail = attrs['tickets_detail']
         
-        # Validar disponibilidad del tour
+        # Validar disponibilidad del tour (en OPEN_DATES, la del día elegido)
         total_people = sum(tickets_detail.values())
         
         if not tour_package.is_active:
@@ -67,9 +69,10 @@ class BookingCreateSerializer(serializers.ModelSerializer):
                 "Este tour no está disponible actualmente"
             )
         
-        if tour_package.available_slots < total_people:
+        available_slots = tour_package.available_slots_on(attrs['travel_date'])
+        if available_slots < total_people:
             raise serializers.ValidationError(
-                f"Solo hay {tour_package.available_slots} plazas disponibles"
+                f"Solo hay {available_slots} plazas disponibles"
             )
         
         # Validar que los tipos de ticket existen en el tour
@@ -143,21 +146,31 @@ class BookingCreateSerializer(serializers.ModelSerializer):
         # Calcular todos los totales
         booking.calculate_totals()
         
-        # Guardar la reserva
-        booking.save()
-        
-        # Incrementar las reservas del tour
-        total_people = sum(tickets_detail.values())
-        tour_package.increment_bookings(total_people)
+        with transaction.atomic():
+            # Ocupar los cupos primero: el UPDATE condicional es la validación
+            # definitiva de disponibilidad (la de validate() puede estar desactualizada)
+            total_people = sum(tickets_detail.values())
+            if not tour_package.reserve_seats(total_people, booking.travel_date):
+                raise serializers.ValidationError(
+                    "No hay plazas suficientes para esta reserva"
+                )
+            
+            # Guardar la reserva
+            booking.save()
         
         return booking
 
 
-class BookingListSerializer(serializers.ModelSerializer):
+class BookingListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializer optimizado para listar reservas.
     Incluye información básica del tour y viajero.
+    Acepta ?fields=, ?omit= y ?expand=tour_package (ver SparseFieldsetMixin).
     """
+    expandable_fields = {
+        'tour_package': lambda: TourPackageListSerializer(read_only=True),
+    }
+
     tour_title = serializers.CharField(
         source='tour_package.title', 
         read_only=True
@@ -280,6 +293,8 @@ class BookingDetailSerializer(serializers.ModelSerializer):
             'cancelled_at',
             'cancellation_reason',
         ]
+        # Los cambios de estado van por /cancel/ y bookings.services.transition
+        read_only_fields = ['status']
     
     def get_days_until_travel(self, obj):
         """Calcular días hasta el viaje"""
@@ -306,13 +321,22 @@ class BookingStatsSerializer(serializers.Serializer):
     cancelled_bookings = serializers.IntegerField()
     completed_bookings = serializers.IntegerField()
     
+    # Operadores y admin
     total_revenue = serializers.DecimalField(
         max_digits=12,
-        decimal_places=2
+        decimal_places=2,
+        required=False
     )
     total_commission = serializers.DecimalField(
         max_digits=12,
-        decimal_places=2
+        decimal_places=2,
+        required=False
+    )
+    # Viajeros
+    total_spent = serializers.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        required=False
     )
     
     total_people = serializers.IntegerField()
@@ -0,0 +1,153 @@
+"""
+Cambios de estado de reservas.
+
+Todas las transiciones (confirmar pago, cancelar, completar, acciones del
+admin) pasan por aquí para que:
+
+- solo se permitan las transiciones de ALLOWED_TRANSITIONS;
+- el cambio sea un UPDATE condicional (WHERE status = <estado esperado>):
+  si dos procesos cambian la misma reserva a la vez, solo uno gana;
+- quede registro en BookingStatusHistory (bulk_create en cambios masivos);
+- se actualicen BookingDailyRollup, los cupos liberados y la caché de
+  disponibilidad, que los UPDATE no disparan por señales.
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from tours import cache as catalog_cache
+from tours.models import TourPackage
+from .models import Booking, BookingStatusHistory, ROLLUP_FIELDS
+from . import rollups
+
+Status = Booking.Status
+
+ALLOWED_TRANSITIONS = {
+    Status.PENDING: {Status.CONFIRMED, Status.CANCELLED},
+    Status.CONFIRMED: {Status.COMPLETED, Status.CANCELLED, Status.REFUNDED},
+    Status.CANCELLED: {Status.REFUNDED},
+    Status.COMPLETED: set(),
+    Status.REFUNDED: set(),
+}
+
+# Estados que ocupan cupos en el tour
+SEAT_HOLDING_STATUSES = {Status.PENDING, Status.CONFIRMED}
+
+# Columnas leídas de cada reserva para aplicar el cambio
+ROW_FIELDS = ('id', 'travel_date') + ROLLUP_FIELDS
+
+
+class InvalidTransition(ValueError):
+    pass
+
+
+def transition(booking, to_status, changed_by=None, notes='', **changes):
+    """
+    Cambia el estado de `booking` (y los campos de `changes`) si la
+    transición está permitida y nadie la cambió antes. Actualiza la
+    instancia en memoria. Lanza InvalidTransition si no.
+    """
+    _check(booking.status, to_status)
+    row = {name: getattr(booking, 'pk' if name == 'id' else name) for name in ROW_FIELDS}
+
+    with transaction.atomic():
+        applied, fields = _apply([row], to_status, changed_by, notes, changes)
+    if not applied:
+        raise InvalidTransition(
+            'La reserva cambió de estado mientras se procesaba. Intente de nuevo'
+        )
+
+    for name, value in fields.items():
+        setattr(booking, name, value)
+    booking._rollup_snapshot = {name: getattr(booking, name) for name in ROLLUP_FIELDS}
+
+
+def bulk_transition(queryset, to_status, changed_by=None, notes='', **changes):
+    """
+    Cambia a `to_status` las reservas de `queryset` que lo permitan (las
+    demás se ignoran). Devuelve la cantidad de reservas cambiadas.
+    """
+    sources = [status for status, targets in ALLOWED_TRANSITIONS.items() if to_status in targets]
+    with transaction.atomic():
+        rows = list(
+            queryset.order_by().select_for_update(of=('self',)).filter(
+                status__in=sources
+            ).values(*ROW_FIELDS)
+        )
+        applied, _ = _apply(rows, to_status, changed_by, notes, changes)
+    return len(applied)
+
+
+def _check(from_status, to_status):
+    if to_status not in ALLOWED_TRANSITIONS.get(from_status, ()):
+        raise InvalidTransition(
+            f'No se puede pasar una reserva de {Status(from_status).label} a {Status(to_status).label}'
+        )
+
+
+def _apply(rows, to_status, changed_by, notes, changes):
+    """
+    UPDATE condicional por estado de origen + historial, resúmenes, cupos y
+    caché. Devuelve (filas cambiadas, campos escritos).
+    """
+    now = timezone.now()
+    fields = {'status': to_status, 'updated_at': now}
+    if to_status == Status.CANCELLED:
+        fields['cancelled_at'] = now
+    fields.update(changes)
+
+    by_status = defaultdict(list)
+    for row in rows:
+        by_status[row['status']].append(row)
+
+    applied = []
+    for from_status, group in by_status.items():
+        ids = [row['id'] for row in group]
+        updated = Booking.objects.filter(pk__in=ids, status=from_status).update(**fields)
+        if updated < len(group):
+            # Otro proceso cambió parte del grupo: quedarse con las que ganamos
+            won = set(
+                Booking.objects.filter(pk__in=ids, status=to_status, updated_at=now)
+                .values_list('pk', flat=True)
+            )
+            group = [row for row in group if row['id'] in won]
+        applied.extend(group)
+
+    if not applied:
+        return applied, fields
+
+    BookingStatusHistory.objects.bulk_create([
+        BookingStatusHistory(
+            booking_id=row['id'],
+            from_status=row['status'],
+            to_status=to_status,
+            changed_by=changed_by,
+            notes=notes,
+        )
+        for row in applied
+    ])
+    rollups.apply_status_change(applied, to_status)
+    _release_seats(applied, to_status)
+    return applied, fields
+
+
+def _release_seats(rows, to_status):
+    """Devuelve los cupos de las reservas que dejan de ocuparlos"""
+    releasing = defaultdict(int)
+    changed_tours = set()
+    for row in rows:
+        if row['status'] in SEAT_HOLDING_STATUSES and to_status not in SEAT_HOLDING_STATUSES:
+            changed_tours.add(row['tour_package_id'])
+            # Una reserva completada ya viajó: sus cupos no se devuelven
+            if to_status != Status.COMPLETED:
+                releasing[row['tour_package_id'], row['travel_date']] += row['people_count']
+
+    if releasing:
+        tours = TourPackage.objects.in_bulk({tour_id for tour_id, _ in releasing})
+        for (tour_id, travel_date), people in releasing.items():
+            tours[tour_id].release_seats(people, travel_date)
+
+    for tour_id in changed_tours:
+        catalog_cache.bump_version_on_commit(catalog_cache.availability_scope(tour_id))
@@ -1,23 +1,83 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from django.core.mail import send_mail
-from django.conf import settings
-from .models import Booking
+from tours import cache as catalog_cache
+from .models import Booking, ROLLUP_FIELDS
+from . import rollups, outbox
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_tour_availability(sender, instance, **kwargs):
+    """El calendario de disponibilidad del tour se cachea hasta que cambie una reserva"""
+    catalog_cache.bump_version_on_commit(
+        catalog_cache.availability_scope(instance.tour_package_id)
+    )
+
+
+def _touches_rollup(update_fields):
+    """save(update_fields=...) que no escribe ningún campo del resumen"""
+    if update_fields is None:
+        return True
+    return bool(set(update_fields) & (set(ROLLUP_FIELDS) | {'tour_package'}))
+
+
+@receiver(pre_save, sender=Booking)
+def load_rollup_snapshot(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Valores guardados antes del cambio. from_db los toma de la fila leída y
+    services.transition() los actualiza tras cada cambio de estado; solo
+    se consultan los que falten (instancia armada a mano o con only/defer).
+    """
+    if raw or instance._state.adding or not _touches_rollup(update_fields):
+        return
+    snapshot = getattr(instance, '_rollup_snapshot', {})
+    missing = [name for name in ROLLUP_FIELDS if name not in snapshot]
+    if missing:
+        stored = Booking.objects.filter(pk=instance.pk).values(*missing).first() or {}
+        snapshot = {**snapshot, **stored}
+    instance._rollup_snapshot = snapshot
+
+
+@receiver(post_save, sender=Booking)
+def update_booking_rollup(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Mueve el aporte de la reserva en BookingDailyRollup"""
+    if raw or (not created and not _touches_rollup(update_fields)):
+        return
+    before = None
+    if not created:
+        snapshot = getattr(instance, '_rollup_snapshot', {})
+        if len(snapshot) == len(ROLLUP_FIELDS):
+            before = snapshot
+    after = {name: getattr(instance, name) for name in ROLLUP_FIELDS}
+    rollups.apply_change(before, after)
+    instance._rollup_snapshot = after
+
+
+@receiver(post_delete, sender=Booking)
+def remove_booking_rollup(sender, instance, **kwargs):
+    before = getattr(instance, '_rollup_snapshot', None)
+    if not before or len(before) != len(ROLLUP_FIELDS):
+        before = {name: getattr(instance, name) for name in ROLLUP_FIELDS}
+    rollups.apply_change(before, None)
+
 
 @receiver(post_save, sender=Booking)
-def send_booking_notifications(sender, instance, created, **kwargs):
+def send_booking_notifications(sender, instance, created, raw=False, **kwargs):
     """
-    Enviar emails cuando se crea o actualiza una reserva
+    Encolar los emails de una reserva nueva en el outbox. Se guardan en la
+    misma transacción que la reserva y los envía `manage.py run_outbox`.
     """
-    if created:
-        # Email al viajero
-        send_mail(
-            subject=f'Confirmación de Reserva - {instance.booking_code}',
-            message=f'''
+    if created and not raw:
+        tour_package = instance.tour_package
+        outbox.enqueue([
+            # Email al viajero
+            outbox.message(
+                subject=f'Confirmación de Reserva - {instance.booking_code}',
+                body=f'''
             ¡Gracias por tu reserva en VENTU!
             
             Código de reserva: {instance.booking_code}
-            Tour: {instance.tour_package.title}
+            Tour: {tour_package.title}
             Fecha: {instance.travel_date}
             Total: ${instance.total_amount}
             
@@ -26,19 +86,17 @@ def send_booking_notifications(sender, instance, created, **kwargs):
             Saludos,
             Equipo VENTU
             ''',
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[instance.contact_email],
-            fail_silently=True,
-        )
-        
-        # Email al operador
-        send_mail(
-            subject=f'Nueva Reserva - {instance.booking_code}',
-            message=f'''
+                recipients=[instance.contact_email],
+                booking=instance,
+            ),
+            # Email al operador
+            outbox.message(
+                subject=f'Nueva Reserva - {instance.booking_code}',
+                body=f'''
             ¡Tienes una nueva reserva!
             
             Código: {instance.booking_code}
-            Tour: {instance.tour_package.title}
+            Tour: {tour_package.title}
             Viajero: {instance.contact_name}
             Fecha del viaje: {instance.travel_date}
             Personas: {instance.total_people}
@@ -50,7 +108,7 @@ def send_booking_notifications(sender, instance, created, **kwargs):
             Saludos,
             Equipo VENTU
             ''',
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[instance.tour_package.operator.email],
-            fail_silently=True,
-        )
\ No newline at end of file
+                recipients=[tour_package.operator.email],
+                booking=instance,
+            ),
+        ])
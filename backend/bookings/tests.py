@@ -0,0 +1,487 @@
+import csv
+import io
+import json
+from datetime import date, time, timedelta
+from decimal import Decimal
+from smtplib import SMTPException
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.admin.sites import AdminSite
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from tours.models import TourPackage, DepartureInventory
+from users.models import CustomUser
+from . import outbox
+from .admin import BookingAdmin
+from .models import Booking, BookingDailyRollup, BookingStatusHistory, OutboxEmail
+from .services import InvalidTransition, bulk_transition, transition
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise SMTPException('Servidor no disponible')
+
+
+class BookingTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.operator = CustomUser.objects.create_user(
+            username='operador', email='operador@ventu.com', password='x', role='OPERATOR'
+        )
+        cls.traveler = CustomUser.objects.create_user(
+            username='viajero', email='viajero@ventu.com', password='x', role='TRAVELER'
+        )
+        cls.tour = TourPackage.objects.create(
+            title='Tour',
+            description='Descripción',
+            operator=cls.operator,
+            base_price=Decimal('100.00'),
+            meeting_point='Plaza Altamira',
+            meeting_time=time(8, 0),
+            available_from=date.today() + timedelta(days=1),
+            available_until=date.today() + timedelta(days=30),
+        )
+
+    def create_booking(self):
+        return Booking.objects.create(
+            tour_package=self.tour,
+            traveler=self.traveler,
+            travel_date=date.today() + timedelta(days=5),
+            tickets_detail={'adulto': 2},
+            tickets_prices={'adulto': '110.00'},
+            subtotal_tickets=Decimal('220.00'),
+            total_amount=Decimal('220.00'),
+            commission_amount=Decimal('20.00'),
+            operator_amount=Decimal('200.00'),
+            commission_rate=Decimal('0.10'),
+            contact_name='Ana',
+            contact_email='ana@ventu.com',
+            contact_phone='04141234567',
+        )
+
+
+class BookingCodeTests(BookingTestCase):
+
+    def test_code_is_generated_on_insert(self):
+        booking = self.create_booking()
+        self.assertRegex(booking.booking_code, r'^[A-Z0-9]{8}$')
+
+    def test_collision_retries_with_a_new_code(self):
+        existing = self.create_booking()
+
+        with mock.patch(
+            'bookings.models.generate_booking_code',
+            side_effect=[existing.booking_code, 'NUEVO123'],
+        ):
+            booking = self.create_booking()
+
+        self.assertEqual(booking.booking_code, 'NUEVO123')
+        self.assertEqual(Booking.objects.count(), 2)
+
+
+class OutboxTests(BookingTestCase):
+
+    def test_new_booking_enqueues_emails_without_sending(self):
+        booking = self.create_booking()
+
+        self.assertEqual(len(mail.outbox), 0)
+        recipients = sorted(
+            email.recipients[0] for email in OutboxEmail.objects.filter(booking=booking)
+        )
+        self.assertEqual(recipients, ['ana@ventu.com', 'operador@ventu.com'])
+
+    def test_rolled_back_booking_leaves_no_emails(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.create_booking()
+                raise RuntimeError
+
+        self.assertFalse(OutboxEmail.objects.exists())
+
+    def test_deliver_due_sends_batch_and_marks_sent(self):
+        self.create_booking()
+        self.create_booking()
+
+        result = outbox.deliver_due(batch_size=10)
+
+        self.assertEqual(result, {'sent': 4, 'failed': 0, 'retrying': 0})
+        self.assertEqual(len(mail.outbox), 4)
+        self.assertFalse(OutboxEmail.objects.exclude(status=OutboxEmail.Status.SENT).exists())
+        self.assertEqual(outbox.deliver_due(batch_size=10)['sent'], 0)
+
+    @override_settings(EMAIL_BACKEND='bookings.tests.FailingEmailBackend')
+    def test_failed_sends_back_off_then_give_up(self):
+        self.create_booking()
+        now = timezone.now()
+
+        result = outbox.deliver_due(max_attempts=2, backoff=60, now=now)
+        self.assertEqual(result['retrying'], 2)
+        email = OutboxEmail.objects.first()
+        self.assertEqual(email.attempts, 1)
+        self.assertEqual(email.next_attempt_at, now + timedelta(seconds=60))
+        self.assertIn('Servidor no disponible', email.last_error)
+
+        # Todavía no vence el reintento
+        self.assertEqual(outbox.deliver_due(max_attempts=2, backoff=60, now=now)['retrying'], 0)
+
+        result = outbox.deliver_due(max_attempts=2, backoff=60, now=now + timedelta(seconds=61))
+        self.assertEqual(result['failed'], 2)
+        self.assertEqual(
+            OutboxEmail.objects.filter(status=OutboxEmail.Status.FAILED).count(), 2
+        )
+
+
+class BookingTransitionTests(BookingTestCase):
+
+    def rollup_counts(self):
+        return dict(
+            BookingDailyRollup.objects.filter(bookings_count__gt=0)
+            .values_list('status', 'bookings_count')
+        )
+
+    def test_cancel_records_history_and_releases_seats(self):
+        booking = self.create_booking()
+        self.tour.reserve_seats(2, booking.travel_date)
+
+        booking.cancel(reason='Cambio de planes', changed_by=self.traveler)
+
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, Booking.Status.CANCELLED)
+        self.assertIsNotNone(booking.cancelled_at)
+        history = BookingStatusHistory.objects.get(booking=booking)
+        self.assertEqual(
+            (history.from_status, history.to_status, history.changed_by),
+            ('PENDING', 'CANCELLED', self.traveler)
+        )
+        departure = DepartureInventory.objects.get(tour_package=self.tour)
+        self.assertEqual(departure.booked, 0)
+        self.assertEqual(self.rollup_counts(), {'CANCELLED': 1})
+
+    def test_stale_instance_cannot_transition_twice(self):
+        booking = self.create_booking()
+        stale = Booking.objects.get(pk=booking.pk)
+
+        booking.confirm_payment('pago-1', 'manual')
+        with self.assertRaises(InvalidTransition):
+            stale.cancel()
+
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, Booking.Status.CONFIRMED)
+        self.assertEqual(BookingStatusHistory.objects.count(), 1)
+
+    def test_disallowed_transition_is_rejected(self):
+        booking = self.create_booking()
+        with self.assertRaises(InvalidTransition):
+            booking.complete()
+
+    def test_bulk_transition_skips_invalid_rows(self):
+        pending = [self.create_booking() for _ in range(3)]
+        pending[0].cancel()
+
+        updated = bulk_transition(
+            Booking.objects.all(), Booking.Status.CONFIRMED, changed_by=self.operator
+        )
+
+        self.assertEqual(updated, 2)
+        self.assertEqual(
+            BookingStatusHistory.objects.filter(to_status='CONFIRMED').count(), 2
+        )
+        self.assertEqual(self.rollup_counts(), {'CANCELLED': 1, 'CONFIRMED': 2})
+
+
+class BookingRollupTests(BookingTestCase):
+
+    def rollup_rows(self):
+        return sorted(
+            BookingDailyRollup.objects.filter(bookings_count__gt=0).values_list(
+                'operator_id', 'tour_package_id', 'day', 'status',
+                'bookings_count', 'people', 'gross_amount', 'commission_amount', 'operator_amount',
+            )
+        )
+
+    def test_create_and_transition_move_the_contribution(self):
+        first = self.create_booking()
+        self.create_booking()
+        row = BookingDailyRollup.objects.get(status='PENDING')
+        self.assertEqual(
+            (row.operator, row.bookings_count, row.people, row.gross_amount),
+            (self.operator, 2, 4, Decimal('440.00'))
+        )
+
+        first.confirm_payment('pago-1', 'manual')
+
+        counts = dict(BookingDailyRollup.objects.values_list('status', 'bookings_count'))
+        self.assertEqual(counts, {'PENDING': 1, 'CONFIRMED': 1})
+
+    def assertNoSnapshotReload(self, queries):
+        # La consulta de valores previos lee los montos de la reserva
+        self.assertFalse([
+            q for q in queries
+            if q['sql'].startswith('SELECT') and '"bookings_booking"."operator_amount"' in q['sql']
+        ])
+
+    def test_save_uses_the_loaded_values(self):
+        booking = Booking.objects.get(pk=self.create_booking().pk)
+        booking.total_amount = Decimal('330.00')
+
+        with CaptureQueriesContext(connection) as queries:
+            booking.save()
+
+        self.assertNoSnapshotReload(queries)
+        self.assertEqual(BookingDailyRollup.objects.get().gross_amount, Decimal('330.00'))
+
+    def test_partial_save_outside_the_rollup_does_not_reload(self):
+        pk = self.create_booking().pk
+        booking = Booking.objects.only('id', 'special_requests').get(pk=pk)
+        booking.special_requests = 'Sin gluten'
+
+        with CaptureQueriesContext(connection) as queries:
+            booking.save(update_fields=['special_requests'])
+
+        self.assertNoSnapshotReload(queries)
+        self.assertEqual(BookingDailyRollup.objects.get().bookings_count, 1)
+
+    def test_rebuild_matches_incremental_rows(self):
+        bookings = [self.create_booking() for _ in range(4)]
+        bookings[0].confirm_payment('pago-1', 'manual')
+        bookings[1].cancel()
+        bookings[2].delete()
+        incremental = self.rollup_rows()
+
+        call_command('rebuild_booking_rollups', stdout=io.StringIO())
+
+        self.assertEqual(self.rollup_rows(), incremental)
+
+    def test_dashboard_counts_only_active_bookings(self):
+        self.create_booking()
+        self.create_booking().cancel()
+        self.client.force_login(self.operator)
+
+        response = self.client.get('/api/users/dashboard/', secure=True)
+
+        self.assertEqual(response.json()['statistics']['total_bookings'], 1)
+
+
+class OpenDatesBookingTotalsTests(BookingTestCase):
+    """Tours OPEN_DATES: los totales salen de las reservas, no de current_bookings"""
+
+    def setUp(self):
+        self.create_booking()
+        self.create_booking().cancel()
+        self.assertEqual(TourPackage.objects.get(pk=self.tour.pk).current_bookings, 0)
+
+    def test_tour_stats_count_active_bookings(self):
+        self.client.force_login(self.operator)
+        response = self.client.get('/api/tours/stats/', secure=True)
+        self.assertEqual(response.json()['total_bookings'], 1)
+
+    def test_public_profile_counts_travelers(self):
+        response = self.client.get('/api/users/operators/operador/profile/', secure=True)
+        self.assertEqual(response.json()['statistics']['total_travelers'], 2)
+
+
+class BookingStatusEditTests(BookingTestCase):
+
+    def test_update_cannot_change_the_status(self):
+        booking = self.create_booking()
+        self.client.force_login(self.traveler)
+
+        response = self.client.patch(
+            f'/api/bookings/{booking.pk}/', {'status': 'CANCELLED', 'special_requests': 'Vegetariano'},
+            content_type='application/json', secure=True
+        )
+
+        self.assertEqual(response.status_code, 200)
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'PENDING')
+        self.assertEqual(booking.special_requests, 'Vegetariano')
+        self.assertFalse(BookingStatusHistory.objects.filter(booking=booking, to_status='CANCELLED').exists())
+
+    def test_admin_status_is_read_only(self):
+        self.assertIn('status', BookingAdmin(Booking, AdminSite()).get_readonly_fields(None))
+
+
+class TourStatsTests(BookingTestCase):
+
+    def test_stats_come_from_rollups_and_rating_aggregates(self):
+        transition(self.create_booking(), 'CONFIRMED')
+        self.create_booking()
+        self.create_booking().cancel()
+        TourPackage.objects.create(
+            title='Borrador', description='Descripción', operator=self.operator,
+            base_price=Decimal('50.00'), meeting_point='Plaza', meeting_time=time(8, 0),
+            available_from=self.tour.available_from, available_until=self.tour.available_until,
+            status='DRAFT', is_active=False,
+        )
+        TourPackage.objects.filter(pk=self.tour.pk).update(rating_sum=13, rating_count=3)
+        self.client.force_login(self.operator)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/tours/stats/', secure=True)
+
+        self.assertEqual(response.json(), {
+            'total_packages': 2,
+            'published_packages': 1,
+            'draft_packages': 1,
+            'active_packages': 1,
+            'total_bookings': 2,
+            'total_revenue': '200.00',
+            'average_rating': '4.33',
+        })
+        tables = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('"bookings_booking"', tables)
+        self.assertNotIn('"tours_review"', tables)
+
+
+class BookingExportTests(BookingTestCase):
+
+    def setUp(self):
+        self.client.force_login(self.operator)
+
+    def export(self, **params):
+        return self.client.get('/api/bookings/export/', params, secure=True)
+
+    def test_csv_streams_one_row_per_booking(self):
+        bookings = [self.create_booking() for _ in range(2)]
+
+        response = self.export(file_format='csv')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual({row['booking_code'] for row in rows}, {b.booking_code for b in bookings})
+        self.assertEqual(rows[0]['tour_title'], 'Tour')
+        self.assertEqual(rows[0]['traveler_username'], 'viajero')
+
+    def test_csv_cells_cannot_start_a_formula(self):
+        booking = self.create_booking()
+        Booking.objects.filter(pk=booking.pk).update(
+            contact_name='=HYPERLINK("http://malo.com","Ana")', contact_phone='+584141234567'
+        )
+
+        response = self.export(file_format='csv')
+
+        row, = csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode()))
+        self.assertEqual(row['contact_name'], '\'=HYPERLINK("http://malo.com","Ana")')
+        self.assertEqual(row['contact_phone'], "'+584141234567")
+        self.assertEqual(row['contact_email'], 'ana@ventu.com')
+        self.assertEqual(row['total_amount'], '220.00')
+
+        response = self.export(file_format='jsonl')
+        line, = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(json.loads(line)['contact_phone'], '+584141234567')
+
+    def test_jsonl_applies_filters(self):
+        kept = self.create_booking()
+        self.create_booking().cancel()
+
+        response = self.export(file_format='jsonl', status='PENDING')
+
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['booking_code'] for line in lines], [kept.booking_code])
+
+    def test_invalid_parameters_are_rejected(self):
+        self.assertEqual(self.export(file_format='xlsx').status_code, 400)
+        self.assertEqual(self.export(travel_date_from='ayer').status_code, 400)
+
+        self.client.force_login(self.traveler)
+        self.assertEqual(self.export().status_code, 403)
+
+
+class TravelerStatsTests(BookingTestCase):
+
+    def test_stats_come_from_one_aggregate_query(self):
+        confirmed, cancelled, _ = (self.create_booking() for _ in range(3))
+        confirmed.confirm_payment('pago-1', 'manual')
+        cancelled.cancel()
+        self.client.force_login(self.traveler)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/bookings/stats/', secure=True)
+
+        self.assertEqual(response.status_code, 200)
+        booking_queries = [q for q in queries if 'bookings_booking' in q['sql']]
+        self.assertEqual(len(booking_queries), 1)
+        self.assertEqual(response.json(), {
+            'total_bookings': 3,
+            'pending_bookings': 1,
+            'confirmed_bookings': 1,
+            'cancelled_bookings': 1,
+            'completed_bookings': 0,
+            'total_spent': '220.00',
+            'total_people': 6,
+            'average_booking_value': '220.00',
+        })
+
+
+@override_settings(REST_FRAMEWORK={
+    **settings.REST_FRAMEWORK,
+    'DEFAULT_THROTTLE_RATES': {
+        **settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'],
+        'booking_verify': '3/min',
+    },
+    'NUM_PROXIES': 1,
+})
+class BookingVerifyThrottleTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def verify(self, ip):
+        return self.client.get(
+            '/api/bookings-public/verify/',
+            {'code': 'NOEXISTE', 'email': 'ana@ventu.com'},
+            REMOTE_ADDR=ip,
+            secure=True,
+        )
+
+    def test_code_lookups_are_limited_per_ip(self):
+        for _ in range(3):
+            self.assertEqual(self.verify('10.0.0.1').status_code, 404)
+
+        response = self.verify('10.0.0.1')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+        self.assertEqual(self.verify('10.0.0.2').status_code, 404)
+
+    def test_forwarded_for_cannot_reset_the_limit(self):
+        # Detrás de un proxy (NUM_PROXIES=1): cuenta la IP que agrega el proxy
+        def verify(spoofed):
+            return self.client.get(
+                '/api/bookings-public/verify/',
+                {'code': 'NOEXISTE', 'email': 'ana@ventu.com'},
+                REMOTE_ADDR='10.0.0.254',
+                HTTP_X_FORWARDED_FOR=f'{spoofed}, 203.0.113.7',
+                secure=True,
+            )
+
+        for i in range(3):
+            self.assertEqual(verify(f'198.51.100.{i}').status_code, 404)
+        self.assertEqual(verify('198.51.100.99').status_code, 429)
+
+    def test_forwarded_for_is_ignored_without_proxies(self):
+        # NUM_PROXIES=0 (valor por defecto): solo cuenta REMOTE_ADDR
+        rest_framework = {**settings.REST_FRAMEWORK, 'NUM_PROXIES': 0}
+        with self.settings(REST_FRAMEWORK=rest_framework):
+            for i in range(3):
+                response = self.client.get(
+                    '/api/bookings-public/verify/',
+                    {'code': 'NOEXISTE', 'email': 'ana@ventu.com'},
+                    REMOTE_ADDR='10.0.0.1',
+                    HTTP_X_FORWARDED_FOR=f'198.51.100.{i}',
+                    secure=True,
+                )
+                self.assertEqual(response.status_code, 404)
+
+            self.assertEqual(self.verify('10.0.0.1').status_code, 429)
@@ -8,11 +8,16 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.exceptions import PermissionDenied
-from django.db.models import Q, Count, Sum, Avg
+from django.db.models import Q, Count, Sum, Avg, F
+from django.core.exceptions import ValidationError
 from django.utils import timezone
 from decimal import Decimal
 
-from .models import Booking
+from .models import Booking, BookingDailyRollup
+from .services import InvalidTransition
+from tours.models import main_image_prefetch
+from ventu_api.pagination import CursorPaginationMixin
+from ventu_api import exports
 from .serializers import (
     BookingCreateSerializer,
     BookingListSerializer,
@@ -21,8 +26,26 @@ from .serializers import (
     BookingStatsSerializer,
 )
 
+# Columnas de /api/bookings/export/, en orden
+EXPORT_COLUMNS = (
+    'booking_code', 'status', 'booking_date', 'travel_date',
+    'tour_id', 'tour_title', 'traveler_username', 'traveler_email',
+    'contact_name', 'contact_email', 'contact_phone', 'people_count',
+    'subtotal_tickets', 'subtotal_extras', 'total_amount',
+    'commission_rate', 'commission_amount', 'operator_amount',
+    'payment_method', 'paid_at', 'cancelled_at',
+)
+# Columnas que no son campos de Booking
+EXPORT_ALIASES = {
+    'tour_id': F('tour_package_id'),
+    'tour_title': F('tour_package__title'),
+    'traveler_username': F('traveler__username'),
+    'traveler_email': F('traveler__email'),
+}
+EXPORT_CHUNK_SIZE = 2000
+
 
-class BookingViewSet(viewsets.ModelViewSet):
+class BookingViewSet(CursorPaginationMixin, viewsets.ModelViewSet):
     """
     ViewSet completo para gestión de reservas.
     
@@ -35,9 +58,17 @@ class BookingViewSet(viewsets.ModelViewSet):
     - GET    /api/bookings/my_trips/     - Historial viajero
     - GET    /api/bookings/incoming/     - Reservas operador
     - GET    /api/bookings/stats/        - Estadísticas
+    - GET    /api/bookings/export/       - Exportar CSV/JSONL (operador/admin)
+    
+    incoming acepta ?pagination=cursor para paginar por cursor.
     """
     
     permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = {
+        'incoming': ('travel_date', 'id'),
+    }
+    # Acciones que responden con BookingListSerializer
+    list_actions = ('list', 'my_trips', 'incoming')
     
     def get_serializer_class(self):
         """Serializer según la acción"""
@@ -59,13 +90,16 @@ class BookingViewSet(viewsets.ModelViewSet):
         user = self.request.user
         
         # Optimizar queries
-        queryset = Booking.objects.select_related(
-            'tour_package',
-            'tour_package__operator',
-            'traveler'
-        ).prefetch_related(
-            'tour_package__images'
-        )
+        if self.action in self.list_actions:
+            queryset = self._list_queryset()
+        else:
+            queryset = Booking.objects.select_related(
+                'tour_package',
+                'tour_package__operator',
+                'traveler'
+            ).prefetch_related(
+                main_image_prefetch('tour_package__images')
+            )
         
         if user.role == 'TRAVELER':
             return queryset.filter(traveler=user)
@@ -78,6 +112,30 @@ class BookingViewSet(viewsets.ModelViewSet):
         
         return queryset.none()
     
+    def _list_queryset(self):
+        """
+        Relaciones según los campos pedidos a BookingListSerializer
+        (?fields= / ?omit= / ?expand=tour_package).
+        """
+        selected = BookingListSerializer.selected_fields(self.request)
+        queryset = Booking.objects.all()
+        
+        related = []
+        if selected & {'tour_title', 'tour_destination', 'tour_image', 'tour_package'}:
+            related.append('tour_package')
+        if 'tour_package' in selected:
+            related.append('tour_package__operator')
+        if selected & {'traveler_name', 'traveler_email'}:
+            related.append('traveler')
+        if related:
+            queryset = queryset.select_related(*related)
+        
+        if selected & {'tour_image', 'tour_package'}:
+            queryset = queryset.prefetch_related(
+                main_image_prefetch('tour_package__images')
+            )
+        return queryset
+    
     def perform_create(self, serializer):
         """
         Validar que solo viajeros puedan crear reservas.
@@ -164,7 +222,7 @@ class BookingViewSet(viewsets.ModelViewSet):
         
         try:
             reason = serializer.validated_data.get('cancellation_reason', '')
-            booking.cancel(reason=reason)
+            booking.cancel(reason=reason, changed_by=request.user)
             
             return Response({
                 'message': 'Reserva cancelada exitosamente',
@@ -212,8 +270,9 @@ class BookingViewSet(viewsets.ModelViewSet):
         ).order_by('-travel_date')
         
         # Serializar
-        upcoming_serializer = BookingListSerializer(upcoming, many=True)
-        past_serializer = BookingListSerializer(past, many=True)
+        context = self.get_serializer_context()
+        upcoming_serializer = BookingListSerializer(upcoming, many=True, context=context)
+        past_serializer = BookingListSerializer(past, many=True, context=context)
         
         return Response({
             'upcoming_trips': upcoming_serializer.data,
@@ -252,12 +311,57 @@ class BookingViewSet(viewsets.ModelViewSet):
         # Paginar
         page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = BookingListSerializer(page, many=True)
+            serializer = BookingListSerializer(page, many=True, context=self.get_serializer_context())
             return self.get_paginated_response(serializer.data)
         
-        serializer = BookingListSerializer(queryset, many=True)
+        serializer = BookingListSerializer(queryset, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Exporta en streaming las reservas visibles para el usuario.
+        ?file_format=csv|jsonl, ?status=, ?travel_date_from= y ?travel_date_to=
+
+        Las filas salen de values() con iterator(): la memoria no crece con
+        la cantidad de reservas y la respuesta empieza a enviarse enseguida.
+        """
+        user = request.user
+        if user.role not in ['OPERATOR', 'ADMIN'] and not user.is_staff:
+            return Response(
+                {'error': 'Este endpoint es solo para operadores'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        file_format = exports.get_file_format(request)
+        if file_format is None:
+            return Response(
+                {'error': 'Formato no soportado. Use csv o jsonl'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        queryset = self.get_queryset()
+        filters = {
+            'status': request.query_params.get('status'),
+            'travel_date__gte': request.query_params.get('travel_date_from'),
+            'travel_date__lte': request.query_params.get('travel_date_to'),
+        }
+        try:
+            queryset = queryset.filter(**{key: value for key, value in filters.items() if value})
+        except ValidationError:
+            return Response(
+                {'error': 'Formato de fecha inválido. Use YYYY-MM-DD'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        rows = queryset.select_related(None).prefetch_related(None).order_by(
+            'travel_date', 'id'
+        ).values(
+            *[column for column in EXPORT_COLUMNS if column not in EXPORT_ALIASES],
+            **EXPORT_ALIASES
+        ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        return exports.streaming_export(rows, EXPORT_COLUMNS, file_format, 'reservas')
+    
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """
@@ -267,54 +371,78 @@ class BookingViewSet(viewsets.ModelViewSet):
         - ADMIN: estadísticas globales
         """
         user = request.user
-        queryset = self.get_queryset()
-        
-        # Contar por estado
-        stats = {
-            'total_bookings': queryset.count(),
-            'pending_bookings': queryset.filter(status='PENDING').count(),
-            'confirmed_bookings': queryset.filter(status='CONFIRMED').count(),
-            'cancelled_bookings': queryset.filter(status='CANCELLED').count(),
-            'completed_bookings': queryset.filter(status='COMPLETED').count(),
-        }
         
-        # Calcular ingresos (solo para operadores y admin)
-        if user.role in ['OPERATOR', 'ADMIN'] or user.is_staff:
-            revenue_data = queryset.filter(
-                status__in=['CONFIRMED', 'COMPLETED']
-            ).aggregate(
-                total_revenue=Sum('operator_amount'),
-                total_commission=Sum('commission_amount'),
-            )
-            
-            stats['total_revenue'] = revenue_data['total_revenue'] or Decimal('0.00')
-            stats['total_commission'] = revenue_data['total_commission'] or Decimal('0.00')
-        else:
-            # Para viajeros, mostrar cuánto han gastado
-            spent = queryset.filter(
-                status__in=['CONFIRMED', 'COMPLETED']
-            ).aggregate(total=Sum('total_amount'))
-            
-            stats['total_spent'] = spent['total'] or Decimal('0.00')
-        
-        # Total de personas
-        total_people = 0
-        for booking in queryset:
-            total_people += booking.total_people
-        stats['total_people'] = total_people
-        
-        # Valor promedio de reserva
-        if stats['total_bookings'] > 0:
-            avg = queryset.filter(
-                status__in=['CONFIRMED', 'COMPLETED']
-            ).aggregate(avg=Avg('total_amount'))
-            stats['average_booking_value'] = avg['avg'] or Decimal('0.00')
+        # Mismo orden de roles que get_queryset
+        if user.role != 'TRAVELER' and (user.role in ['OPERATOR', 'ADMIN'] or user.is_staff):
+            stats = self._rollup_stats(user)
         else:
-            stats['average_booking_value'] = Decimal('0.00')
+            stats = self._traveler_stats()
         
         serializer = BookingStatsSerializer(stats)
         return Response(serializer.data)
     
+    def _rollup_stats(self, user):
+        """Operadores y admin: suma de BookingDailyRollup en vez de recorrer las reservas"""
+        rollups = BookingDailyRollup.objects.all()
+        if user.role == 'OPERATOR':
+            rollups = rollups.filter(operator=user)
+        
+        paid = Q(status__in=['CONFIRMED', 'COMPLETED'])
+        totals = rollups.order_by().aggregate(
+            total_bookings=Sum('bookings_count'),
+            pending_bookings=Sum('bookings_count', filter=Q(status='PENDING')),
+            confirmed_bookings=Sum('bookings_count', filter=Q(status='CONFIRMED')),
+            cancelled_bookings=Sum('bookings_count', filter=Q(status='CANCELLED')),
+            completed_bookings=Sum('bookings_count', filter=Q(status='COMPLETED')),
+            total_people=Sum('people'),
+            total_revenue=Sum('operator_amount', filter=paid),
+            total_commission=Sum('commission_amount', filter=paid),
+            paid_bookings=Sum('bookings_count', filter=paid),
+            paid_amount=Sum('gross_amount', filter=paid),
+        )
+        
+        paid_bookings = totals['paid_bookings'] or 0
+        return {
+            'total_bookings': totals['total_bookings'] or 0,
+            'pending_bookings': totals['pending_bookings'] or 0,
+            'confirmed_bookings': totals['confirmed_bookings'] or 0,
+            'cancelled_bookings': totals['cancelled_bookings'] or 0,
+            'completed_bookings': totals['completed_bookings'] or 0,
+            'total_people': totals['total_people'] or 0,
+            'total_revenue': totals['total_revenue'] or Decimal('0.00'),
+            'total_commission': totals['total_commission'] or Decimal('0.00'),
+            'average_booking_value': (
+                totals['paid_amount'] / paid_bookings if paid_bookings else Decimal('0.00')
+            ),
+        }
+    
+    def _traveler_stats(self):
+        """Viajeros: una sola consulta con agregados condicionales sobre sus reservas"""
+        queryset = self.get_queryset().select_related(None).prefetch_related(None)
+        
+        paid = Q(status__in=['CONFIRMED', 'COMPLETED'])
+        totals = queryset.order_by().aggregate(
+            total_bookings=Count('id'),
+            pending_bookings=Count('id', filter=Q(status='PENDING')),
+            confirmed_bookings=Count('id', filter=Q(status='CONFIRMED')),
+            cancelled_bookings=Count('id', filter=Q(status='CANCELLED')),
+            completed_bookings=Count('id', filter=Q(status='COMPLETED')),
+            total_spent=Sum('total_amount', filter=paid),
+            total_people=Sum('people_count'),
+            average_booking_value=Avg('total_amount', filter=paid),
+        )
+        
+        return {
+            'total_bookings': totals['total_bookings'],
+            'pending_bookings': totals['pending_bookings'],
+            'confirmed_bookings': totals['confirmed_bookings'],
+            'cancelled_bookings': totals['cancelled_bookings'],
+            'completed_bookings': totals['completed_bookings'],
+            'total_people': totals['total_people'] or 0,
+            'total_spent': totals['total_spent'] or Decimal('0.00'),
+            'average_booking_value': totals['average_booking_value'] or Decimal('0.00'),
+        }
+    
     @action(detail=True, methods=['post'])
     def confirm_payment(self, request, pk=None):
         """
@@ -344,7 +472,13 @@ class BookingViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        booking.confirm_payment(payment_id, payment_method)
+        try:
+            booking.confirm_payment(payment_id, payment_method, changed_by=request.user)
+        except InvalidTransition as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         serializer = self.get_serializer(booking)
         return Response({
@@ -361,6 +495,8 @@ class BookingPublicViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [permissions.AllowAny]
     serializer_class = BookingDetailSerializer
     lookup_field = 'booking_code'
+    # Límite estricto por IP: evita adivinar códigos de reserva a fuerza bruta
+    throttle_scope = 'booking_verify'
     
     def get_queryset(self):
         return Booking.objects.select_related(
@@ -1,6 +1,8 @@
 from django.contrib import admin
+from django.utils import timezone
 from django.utils.html import format_html
-from .models import Tag, TourPackage, PackageImage, Review, IncludedItem
+from .models import Tag, TourPackage, PackageImage, Review, IncludedItem, DepartureInventory
+from . import cache as catalog_cache
 
 class PackageImageInline(admin.TabularInline):
     model = PackageImage
@@ -42,12 +44,17 @@ class TourPackageAdmin(admin.ModelAdmin):
     )
     
     filter_horizontal = ('tags', 'what_is_included', 'what_is_not_included')
+    # Lo actualizan las reservas (save() no lo escribe)
+    readonly_fields = ('current_bookings',)
     inlines = [PackageImageInline]
 
     actions = ['mark_as_published']
     
     def mark_as_published(self, request, queryset):
-        updated = queryset.update(status='PUBLISHED')
+        # update() no toca auto_now ni dispara señales: updated_at (ETag del
+        # detalle) y la caché del catálogo se actualizan a mano
+        updated = queryset.update(status='PUBLISHED', updated_at=timezone.now())
+        catalog_cache.bump_version_on_commit(catalog_cache.CATALOG)
         self.message_user(request, f'{updated} tours marcados como publicados.')
     mark_as_published.short_description = "Marcar los tours seleccionados como PUBLICADOS"
 
@@ -57,5 +64,12 @@ class ReviewAdmin(admin.ModelAdmin):
     list_filter = ('rating', 'tour_package')
     search_fields = ('comment', 'traveler__user__email')
 
+@admin.register(DepartureInventory)
+class DepartureInventoryAdmin(admin.ModelAdmin):
+    list_display = ('tour_package', 'travel_date', 'booked', 'capacity')
+    list_filter = ('travel_date',)
+    search_fields = ('tour_package__title',)
+    raw_id_fields = ('tour_package',)
+
 admin.site.register(IncludedItem)
 admin.site.register(Tag)
\ No newline at end of file
@@ -0,0 +1,251 @@
+"""
+Importación y exportación masiva de paquetes turísticos (CSV / JSONL).
+
+- read_rows: recorre el archivo línea a línea, sin cargarlo completo.
+- TourImporter: valida cada fila con TourPackageImportSerializer, resuelve
+  etiquetas e ítems incluidos por nombre una vez por lote y crea los tours
+  con bulk_create + un INSERT masivo por tabla intermedia.
+- export_rows: filas con las mismas columnas que acepta la importación.
+
+Mismo formato en ambos sentidos: lo exportado se puede volver a importar.
+En CSV las columnas JSON (precios, itinerario...) van como JSON y las
+listas de nombres como JSON o separadas por '|'; el apóstrofo que la
+exportación CSV antepone a '=', '+', '-'... se quita al leer.
+"""
+
+import codecs
+import csv
+import json
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from rest_framework import serializers
+
+from ventu_api.exports import CSV_FORMULA_PREFIXES
+
+from .models import TourPackage
+from .serializers import TourPackageImportSerializer
+from . import cache as catalog_cache
+
+# Columna del archivo -> campo ManyToMany del tour (relación por nombre)
+RELATION_COLUMNS = {
+    'tags': 'tags',
+    'included_items': 'what_is_included',
+    'not_included_items': 'what_is_not_included',
+}
+JSON_COLUMNS = ('price_variations', 'extra_services', 'highlights', 'itinerary')
+
+IMPORT_COLUMNS = tuple(TourPackageImportSerializer.Meta.fields)
+# Las columnas extra de la exportación se ignoran al importar
+EXPORT_COLUMNS = ('id',) + IMPORT_COLUMNS + ('status', 'final_price', 'created_at')
+
+
+# ============ LECTURA ============
+
+def read_rows(lines, file_format):
+    """
+    (número de fila, dict) por cada registro de `lines` (archivo binario o
+    iterable de líneas en bytes). Un registro JSONL ilegible llega como
+    (número, None) para reportarlo junto a los demás errores.
+    """
+    text = codecs.iterdecode(lines, 'utf-8-sig')
+    if file_format == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, {column: _unescape(value) for column, value in row.items()}
+        return
+
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError:
+            yield number, None
+
+
+def _unescape(value):
+    """Quita el apóstrofo que agrega la exportación CSV ante '=', '+', '-'..."""
+    if isinstance(value, str) and value[:1] == "'" and value[1:].startswith(CSV_FORMULA_PREFIXES):
+        return value[1:]
+    return value
+
+
+def _normalize(row):
+    """Fila del archivo -> (datos para el serializer, errores de formato)"""
+    if not isinstance(row, dict):
+        return None, {'non_field_errors': ['Registro JSON inválido']}
+
+    data, errors = {}, {}
+    for column, value in row.items():
+        if column is None or value is None or value == '':
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if column in JSON_COLUMNS:
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    errors[column] = ['JSON inválido']
+                    continue
+            elif column in RELATION_COLUMNS:
+                value = _split_names(value)
+        data[column] = value
+    return data, errors
+
+
+def _split_names(value):
+    if value.startswith('['):
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+    return [name.strip() for name in value.split('|') if name.strip()]
+
+
+# ============ IMPORTACIÓN ============
+
+class TourImporter:
+    """
+    Crea tours de `operator` a partir de filas (número, dict).
+
+    Las filas inválidas no detienen la importación: se reportan en
+    result['errors'] con su número de fila. Cada lote válido se inserta en
+    su propia transacción. Con dry_run solo se valida.
+    """
+
+    def __init__(self, operator, batch_size=500, dry_run=False):
+        self.operator = operator
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        # Un solo serializer para todas las filas: run_validation no
+        # reconstruye los campos en cada fila
+        self.serializer = TourPackageImportSerializer()
+
+    def run(self, rows):
+        """Devuelve {'created': n, 'errors': [{'row': n, 'errors': {...}}]}"""
+        result = {'created': 0, 'errors': []}
+        batch = []
+        for number, row in rows:
+            tour, names, errors = self._build(row)
+            if errors:
+                result['errors'].append({'row': number, 'errors': errors})
+                continue
+            batch.append((number, tour, names))
+            if len(batch) >= self.batch_size:
+                self._flush(batch, result)
+                batch = []
+        if batch:
+            self._flush(batch, result)
+        return result
+
+    def _build(self, row):
+        """Tour sin guardar y nombres de sus relaciones, o los errores de la fila"""
+        data, errors = _normalize(row)
+        if errors:
+            return None, None, errors
+
+        try:
+            validated = self.serializer.run_validation(data)
+        except serializers.ValidationError as exc:
+            return None, None, exc.detail
+
+        names = {column: validated.pop(column, []) for column in RELATION_COLUMNS}
+        tour = TourPackage(operator=self.operator, **validated)
+        # Lo mismo que TourPackage.save() antes de guardar; bulk_create no llama a save()
+        tour._calculate_prices_with_commission()
+        try:
+            tour.clean()
+        except DjangoValidationError as exc:
+            return None, None, exc.message_dict
+        return tour, names, None
+
+    def _flush(self, batch, result):
+        lookups = self._resolve_names(batch)
+
+        valid = []
+        for number, tour, names in batch:
+            missing = {
+                column: [f'No existe: {name}' for name in values if name not in lookups[column]]
+                for column, values in names.items()
+            }
+            missing = {column: errors for column, errors in missing.items() if errors}
+            if missing:
+                result['errors'].append({'row': number, 'errors': missing})
+            else:
+                valid.append((tour, names))
+
+        if not valid:
+            return
+        if self.dry_run:
+            result['created'] += len(valid)
+            return
+
+        with transaction.atomic():
+            TourPackage.objects.bulk_create([tour for tour, _ in valid])
+            for column, field_name in RELATION_COLUMNS.items():
+                field = TourPackage._meta.get_field(field_name)
+                through = field.remote_field.through
+                source = f'{field.m2m_field_name()}_id'
+                target = f'{field.m2m_reverse_field_name()}_id'
+                through.objects.bulk_create([
+                    through(**{source: tour.pk, target: related_id})
+                    for tour, names in valid
+                    for related_id in {lookups[column][name] for name in names[column]}
+                ])
+            catalog_cache.bump_version_on_commit(catalog_cache.CATALOG)
+        result['created'] += len(valid)
+
+    def _resolve_names(self, batch):
+        """{columna: {nombre: id}} con una consulta por columna para todo el lote"""
+        lookups = {}
+        for column, field_name in RELATION_COLUMNS.items():
+            wanted = {name for _, _, names in batch for name in names[column]}
+            model = TourPackage._meta.get_field(field_name).related_model
+            lookups[column] = dict(
+                model.objects.filter(name__in=wanted).values_list('name', 'id')
+            ) if wanted else {}
+        return lookups
+
+
+# ============ EXPORTACIÓN ============
+
+def export_rows(queryset, chunk_size=500):
+    """
+    Dicts con EXPORT_COLUMNS, en lotes por pk (keyset). Los nombres de las
+    relaciones salen de una consulta por tabla intermedia y lote.
+    """
+    value_fields = [column for column in EXPORT_COLUMNS if column not in RELATION_COLUMNS]
+    rows = queryset.order_by('pk').values(*value_fields)
+    last_pk = None
+    while True:
+        chunk = rows if last_pk is None else rows.filter(pk__gt=last_pk)
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            return
+        tour_ids = [row['id'] for row in chunk]
+        last_pk = tour_ids[-1]
+
+        names = _relation_names(tour_ids)
+        for row in chunk:
+            for column in RELATION_COLUMNS:
+                row[column] = names[column].get(row['id'], [])
+            yield row
+
+
+def _relation_names(tour_ids):
+    """{columna: {tour_id: [nombres]}}"""
+    names = {}
+    for column, field_name in RELATION_COLUMNS.items():
+        field = TourPackage._meta.get_field(field_name)
+        source = f'{field.m2m_field_name()}_id'
+        target = field.m2m_reverse_field_name()
+        by_tour = defaultdict(list)
+        pairs = field.remote_field.through.objects.filter(
+            **{f'{source}__in': tour_ids}
+        ).order_by(f'{target}__name').values_list(source, f'{target}__name')
+        for tour_id, name in pairs:
+            by_tour[tour_id].append(name)
+        names[column] = by_tour
+    return names
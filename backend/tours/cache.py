@@ -0,0 +1,66 @@
+"""
+Caché versionada para respuestas públicas del catálogo.
+
+Cada ámbito (p. ej. 'catalog') tiene un número de versión guardado en la
+caché que forma parte de las claves. Las señales de tours.signals lo
+incrementan cuando cambia el catálogo, así las entradas anteriores dejan
+de leerse sin tener que borrarlas una por una.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+CATALOG = 'catalog'
+# Cambios que solo afectan al listado (cupos, reseñas, etiquetas, nombre del
+# operador), no a las estadísticas: invalidan el ETag del listado sin vaciar
+# la caché de CATALOG
+LISTING = 'listing'
+
+
+def availability_scope(tour_package_id):
+    """Ámbito por tour para el calendario de disponibilidad"""
+    return f'availability:{tour_package_id}'
+
+
+def _version_key(scope):
+    return f'tours:{scope}:version'
+
+
+def get_version(scope):
+    key = _version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        # Arrancar desde un valor basado en el tiempo para no reutilizar
+        # versiones anteriores si la clave fue desalojada
+        cache.add(key, int(time.time() * 1000), settings.TOURS_CACHE_VERSION_TIMEOUT)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(scope):
+    try:
+        cache.incr(_version_key(scope))
+    except ValueError:
+        cache.add(_version_key(scope), int(time.time() * 1000), settings.TOURS_CACHE_VERSION_TIMEOUT)
+
+
+def bump_version_on_commit(scope):
+    """Invalidar cuando la transacción confirme, no antes"""
+    transaction.on_commit(lambda: bump_version(scope))
+
+
+def get_or_build(scope, name, builder, key_parts=(), timeout=None):
+    """Devuelve el valor cacheado para `name` o lo construye con `builder()`"""
+    if timeout is None:
+        timeout = settings.TOURS_STATS_CACHE_TIMEOUT
+    suffix = ':'.join(str(part) for part in key_parts)
+    key = f'tours:{scope}:v{get_version(scope)}:{name}:{suffix}'
+
+    value = cache.get(key)
+    if value is None:
+        value = builder()
+        cache.set(key, value, timeout)
+    return value
@@ -1,6 +1,8 @@
 import django_filters
 from django.db.models import Q
+from rest_framework.filters import OrderingFilter
 from .models import TourPackage
+from . import search
 import unicodedata
 
 
@@ -14,8 +16,9 @@ class TourPackageFilter(django_filters.FilterSet):
     
     # Filtros específicos
     state_destination = django_filters.CharFilter(lookup_expr='iexact')
-    max_price = django_filters.NumberFilter(field_name='final_price', lookup_expr='lte')
-    min_price = django_filters.NumberFilter(field_name='final_price', lookup_expr='gte')
+    # Sobre el precio que se muestra en listados (el menor con variaciones)
+    max_price = django_filters.NumberFilter(field_name='min_display_price', lookup_expr='lte')
+    min_price = django_filters.NumberFilter(field_name='min_display_price', lookup_expr='gte')
     
     tags = django_filters.CharFilter(method='filter_tags')
     environment = django_filters.CharFilter(field_name='environment', lookup_expr='iexact')
@@ -55,6 +58,11 @@ class TourPackageFilter(django_filters.FilterSet):
             return queryset
         search_normalized = self.normalize_text(value)
         words = search_normalized.split()
+
+        # Búsqueda de texto completo con ranking (una sola consulta)
+        if search.is_fulltext_available(queryset.db):
+            return search.fulltext_search(queryset, words)
+
         q_objects = Q()
         search_fields = [
             'title',
@@ -101,4 +109,35 @@ class TourPackageFilter(django_filters.FilterSet):
         
         return queryset.filter(
             tags__name__icontains=value
-        ).distinct()
\ No newline at end of file
+        ).distinct()
+
+
+class TourOrderingFilter(OrderingFilter):
+    """
+    OrderingFilter que, cuando hay búsqueda de texto completo y el cliente
+    no pidió un orden explícito, ordena por relevancia (search_rank).
+    También traduce alias públicos, p. ej. ?ordering=-display_price.
+    """
+    # Alias -> columna real (el alias debe estar en ordering_fields de la vista)
+    ordering_aliases = {
+        'display_price': 'min_display_price',
+    }
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        return [self._resolve_alias(field) for field in ordering]
+
+    def _resolve_alias(self, field):
+        prefix = '-' if field.startswith('-') else ''
+        name = field.lstrip('-')
+        return prefix + self.ordering_aliases.get(name, name)
+
+    def filter_queryset(self, request, queryset, view):
+        if (
+            'search_rank' in queryset.query.annotations
+            and not request.query_params.get(self.ordering_param)
+        ):
+            return queryset.order_by('-search_rank', *(self.get_default_ordering(view) or []))
+        return super().filter_queryset(request, queryset, view)
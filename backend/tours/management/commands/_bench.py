@@ -0,0 +1,100 @@
+"""
+Utilidades compartidas por los comandos bench_*: datos de prueba dentro de
+una transacción que se revierte y medición del mejor de N intentos.
+"""
+
+import contextlib
+import time
+from datetime import time as dt_time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from tours.models import TourPackage, PackageImage
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextlib.contextmanager
+def rolled_back():
+    """Ejecuta el bloque en una transacción que siempre se revierte"""
+    try:
+        with transaction.atomic():
+            yield
+            raise _Rollback
+    except _Rollback:
+        pass
+
+
+def best_of(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def create_bench_user(username, role):
+    return get_user_model().objects.create_user(
+        username=username, email=f'{username}@example.com', password=None,
+        role=role, first_name='Bench', last_name=role.title()
+    )
+
+
+def create_bench_tours(count, operator=None):
+    """Tours publicados (un tercio con variaciones de precio, la mitad con imagen principal)"""
+    operator = operator or create_bench_user('bench_operator', 'OPERATOR')
+    today = timezone.now().date()
+    tours = []
+    for i in range(count):
+        tour = TourPackage(
+            title=f'Tour de prueba {i}', description='Benchmark',
+            operator=operator, base_price=Decimal('100.00') + i,
+            meeting_point='Plaza', meeting_time=dt_time(8),
+            available_from=today + timedelta(days=1),
+            available_until=today + timedelta(days=60),
+            status='PUBLISHED',
+        )
+        if i % 3 == 0:
+            tour.price_variations = {'adulto': '120.00', 'niño': '80.00'}
+        tour._calculate_prices_with_commission()
+        tours.append(tour)
+    tours = TourPackage.objects.bulk_create(tours)
+
+    PackageImage.objects.bulk_create(
+        PackageImage(tour_package=tour, image=f'tour_packages/bench/{tour.pk}.jpg', is_main_image=True)
+        for tour in tours[::2]
+    )
+    return tours
+
+
+def create_bench_bookings(tours, count, traveler=None, start=0):
+    """Reservas con booking_code B0000000, B0000001... a partir de `start`"""
+    from bookings.models import Booking
+
+    traveler = traveler or create_bench_user('bench_traveler', 'TRAVELER')
+    today = timezone.now().date()
+    bookings = []
+    for i in range(start, start + count):
+        tour = tours[i % len(tours)]
+        people = 1 + i % 4
+        total = tour.final_price * people
+        commission = (total * tour.commission_rate).quantize(Decimal('0.01'))
+        bookings.append(Booking(
+            tour_package=tour, traveler=traveler,
+            travel_date=today + timedelta(days=1 + i % 30),
+            tickets_detail={'adulto': people},
+            tickets_prices={'adulto': str(tour.final_price)},
+            subtotal_tickets=total, total_amount=total,
+            commission_amount=commission, operator_amount=total - commission,
+            commission_rate=tour.commission_rate,
+            contact_name='Viajero Bench', contact_email='bench@example.com',
+            contact_phone='04140000000', booking_code=f'B{i:07d}',
+        ))
+    return Booking.objects.bulk_create(bookings)
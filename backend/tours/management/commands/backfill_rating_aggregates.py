@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum, Q
+
+from tours.models import TourPackage
+
+
+class Command(BaseCommand):
+    help = "Recalcula rating_count, rating_sum y rating_avg de los tours a partir de las reseñas aprobadas"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Cantidad de tours por bulk_update (por defecto 500)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        approved = Q(reviews__is_approved=True)
+
+        tours = TourPackage.objects.order_by().annotate(
+            approved_count=Count('reviews', filter=approved),
+            approved_sum=Sum('reviews__rating', filter=approved),
+        ).only('id', 'rating_count', 'rating_sum', 'rating_avg')
+
+        pending = []
+        updated = 0
+        with transaction.atomic():
+            for tour in tours.iterator(chunk_size=batch_size):
+                rating_count = tour.approved_count
+                rating_sum = tour.approved_sum or 0
+                rating_avg = TourPackage._rating_average(rating_sum, rating_count)
+
+                if (tour.rating_count, tour.rating_sum, tour.rating_avg) == (rating_count, rating_sum, rating_avg):
+                    continue
+
+                tour.rating_count = rating_count
+                tour.rating_sum = rating_sum
+                tour.rating_avg = rating_avg
+                pending.append(tour)
+
+                if len(pending) >= batch_size:
+                    TourPackage.objects.bulk_update(pending, ['rating_count', 'rating_sum', 'rating_avg'])
+                    updated += len(pending)
+                    pending = []
+
+            if pending:
+                TourPackage.objects.bulk_update(pending, ['rating_count', 'rating_sum', 'rating_avg'])
+                updated += len(pending)
+
+        self.stdout.write(self.style.SUCCESS(f'{updated} tours actualizados.'))
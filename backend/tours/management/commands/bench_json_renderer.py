@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from bookings.models import Booking
+from bookings.serializers import BookingListSerializer
+from tours.models import TourPackage, main_image_prefetch
+from tours.serializers import TourPackageListRows, TourPackageDetailSerializer
+from ventu_api.renderers import ORJSONRenderer, orjson
+
+from ._bench import best_of, create_bench_bookings, create_bench_tours, rolled_back
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara JSONRenderer de DRF con ORJSONRenderer sobre respuestas reales de "
+        "tours y reservas (datos de prueba en una transacción que se revierte)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=1000,
+            help='Filas de los listados de tours y reservas (por defecto 1000)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Repeticiones por medición; se reporta la mejor (por defecto 20)'
+        )
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            raise CommandError('orjson no está instalado')
+
+        rows = options['rows']
+        with rolled_back():
+            tours = create_bench_tours(rows)
+            create_bench_bookings(tours, rows)
+            payloads = self._payloads(rows)
+
+        for name, data in payloads.items():
+            self._bench(name, data, options['repeat'])
+
+    def _payloads(self, rows):
+        list_rows = TourPackageListRows()
+        tour_list = list_rows.build(list_rows.values(TourPackage.objects.order_by('-created_at', 'id')))
+
+        detail = TourPackageDetailSerializer(
+            TourPackage.objects.select_related('operator').first()
+        ).data
+
+        bookings = BookingListSerializer(
+            Booking.objects.select_related('tour_package', 'traveler').prefetch_related(
+                main_image_prefetch('tour_package__images')
+            ).order_by('-created_at')[:rows],
+            many=True
+        ).data
+
+        return {
+            f'tours ({rows})': {'count': rows, 'next': None, 'previous': None, 'results': tour_list},
+            'detalle de tour': detail,
+            f'reservas ({rows})': {'count': rows, 'next': None, 'previous': None, 'results': bookings},
+        }
+
+    def _bench(self, name, data, repeat):
+        stdlib, fast = JSONRenderer(), ORJSONRenderer()
+        if stdlib.render(data) != fast.render(data):
+            raise CommandError(f'ORJSONRenderer no produce el mismo JSON para {name}')
+
+        slow_time = best_of(lambda: stdlib.render(data), repeat)
+        fast_time = best_of(lambda: fast.render(data), repeat)
+        self.stdout.write(
+            f'{name:<18} JSONRenderer {slow_time * 1000:8.2f} ms | '
+            f'ORJSONRenderer {fast_time * 1000:8.2f} ms | x{slow_time / fast_time:.1f}'
+        )
@@ -0,0 +1,62 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from tours.models import TourPackage
+from tours.services import recalculate_commissions
+
+from ._bench import best_of, create_bench_tours, rolled_back
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara recalculate_commissions (UPDATE con executemany por lotes) con save() por "
+        "tour sobre tours de prueba (se crean en una transacción que se revierte)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tours',
+            type=int,
+            default=100000,
+            help='Cantidad de tours para recalculate_commissions (por defecto 100000)'
+        )
+        parser.add_argument(
+            '--save-sample',
+            type=int,
+            default=500,
+            help='Tours medidos con save(); el total se extrapola (por defecto 500)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Tours por lote de recalculate_commissions (por defecto 1000)'
+        )
+
+    def handle(self, *args, **options):
+        count = options['tours']
+        sample = min(options['save_sample'], count)
+
+        with rolled_back():
+            self.stderr.write(f'Creando {count} tours de prueba...')
+            create_bench_tours(count)
+            queryset = TourPackage.objects.all()
+
+            bulk = best_of(lambda: recalculate_commissions(
+                queryset, commission_rate=Decimal('0.12'), batch_size=options['batch_size']
+            ), 1)
+
+            def save_each():
+                for tour in queryset.order_by('pk')[:sample]:
+                    tour.commission_rate = Decimal('0.15')
+                    tour.save()
+
+            per_save = best_of(save_each, 1) / sample
+
+        estimated = per_save * count
+        self.stdout.write(f'recalculate_commissions: {count} tours en {bulk:.2f} s')
+        self.stdout.write(
+            f'save() por tour: {per_save * 1000:.2f} ms/tour '
+            f'(~{estimated:.1f} s estimados para {count}) | x{estimated / bulk:.1f}'
+        )
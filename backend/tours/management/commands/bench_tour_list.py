@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from tours.models import TourPackage, main_image_prefetch
+from tours.serializers import TourPackageListSerializer, TourPackageListRows
+
+from ._bench import best_of, create_bench_tours, rolled_back
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara TourPackageListSerializer con la ruta rápida TourPackageListRows "
+        "sobre tours de prueba (se crean dentro de una transacción que se revierte)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[20, 100, 1000],
+            help='Cantidad de filas por medición (por defecto 20 100 1000)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Repeticiones por medición; se reporta la mejor (por defecto 5)'
+        )
+
+    def handle(self, *args, **options):
+        sizes = sorted(options['sizes'])
+        with rolled_back():
+            ids = [tour.pk for tour in create_bench_tours(sizes[-1])]
+            for size in sizes:
+                self._bench(ids[:size], options['repeat'])
+
+    def _bench(self, ids, repeat):
+        base = TourPackage.objects.filter(pk__in=ids).order_by('-created_at', 'id')
+        renderer = JSONRenderer()
+
+        def serializer_path():
+            queryset = base.select_related('operator').prefetch_related(main_image_prefetch())
+            return renderer.render(TourPackageListSerializer(queryset, many=True).data)
+
+        def fast_path():
+            rows = TourPackageListRows()
+            return renderer.render(rows.build(rows.values(base)))
+
+        if serializer_path() != fast_path():
+            raise CommandError(f'La ruta rápida no produce el mismo JSON con {len(ids)} filas')
+
+        slow = best_of(serializer_path, repeat)
+        fast = best_of(fast_path, repeat)
+        self.stdout.write(
+            f'{len(ids):>5} filas: serializer {slow * 1000:8.2f} ms | '
+            f'rápida {fast * 1000:8.2f} ms | x{slow / fast:.1f}'
+        )
@@ -0,0 +1,41 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from tours.bulk import EXPORT_COLUMNS, export_rows
+from tours.models import TourPackage
+from ventu_api.exports import FILE_FORMATS, csv_lines, jsonl_lines
+
+
+class Command(BaseCommand):
+    help = "Exporta paquetes turísticos a CSV o JSONL (mismo formato que import_tours)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--operator',
+            help='Solo los paquetes de este operador (username)'
+        )
+        parser.add_argument(
+            '--file-format',
+            choices=list(FILE_FORMATS),
+            default='csv',
+            help='Formato de salida (por defecto csv)'
+        )
+        parser.add_argument(
+            '--output',
+            help='Archivo de salida (por defecto la salida estándar)'
+        )
+
+    def handle(self, *args, **options):
+        queryset = TourPackage.objects.all()
+        if options['operator']:
+            queryset = queryset.filter(operator__username=options['operator'])
+
+        lines = csv_lines if options['file_format'] == 'csv' else jsonl_lines
+        output = open(options['output'], 'w', encoding='utf-8', newline='') if options['output'] else sys.stdout
+        try:
+            for line in lines(export_rows(queryset), EXPORT_COLUMNS):
+                output.write(line)
+        finally:
+            if output is not sys.stdout:
+                output.close()
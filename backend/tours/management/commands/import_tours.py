@@ -0,0 +1,70 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from tours.bulk import TourImporter, read_rows
+from ventu_api.exports import FILE_FORMATS
+
+
+class Command(BaseCommand):
+    help = "Importa paquetes turísticos de un operador desde un archivo CSV o JSONL"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Archivo a importar')
+        parser.add_argument(
+            '--operator',
+            required=True,
+            help='Operador dueño de los paquetes (username)'
+        )
+        parser.add_argument(
+            '--file-format',
+            choices=list(FILE_FORMATS),
+            help='Formato del archivo (por defecto según la extensión)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Filas por bulk_create (por defecto 500)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo valida el archivo, no crea nada'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            operator = get_user_model().objects.get(
+                username=options['operator'], role='OPERATOR'
+            )
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"No existe el operador {options['operator']}")
+
+        path = options['path']
+        file_format = (options['file_format'] or path.rsplit('.', 1)[-1]).lower()
+        if file_format not in FILE_FORMATS:
+            raise CommandError('Formato no soportado. Use --file-format csv o jsonl')
+
+        importer = TourImporter(
+            operator, batch_size=options['batch_size'], dry_run=options['dry_run']
+        )
+        try:
+            with open(path, 'rb') as lines:
+                result = importer.run(read_rows(lines, file_format))
+        except OSError as e:
+            raise CommandError(str(e))
+
+        for error in result['errors']:
+            self.stderr.write(f"Fila {error['row']}: {json.dumps(error['errors'], ensure_ascii=False)}")
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(
+                f"Simulación: {result['created']} paquetes válidos, "
+                f"{len(result['errors'])} filas con errores (no se guardó nada)."
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"{result['created']} paquetes creados, {len(result['errors'])} filas con errores."
+            ))
@@ -0,0 +1,82 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tours.models import TourPackage
+from tours.services import recalculate_commissions
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula final_price, price_variations_with_commission y "
+        "extra_services_with_commission por lotes, opcionalmente con una nueva comisión"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rate',
+            help='Nueva comisión para los tours seleccionados, p. ej. 0.12 (por defecto se mantiene la actual)'
+        )
+        parser.add_argument(
+            '--operator',
+            help='Solo los tours de este operador (username)'
+        )
+        parser.add_argument(
+            '--status',
+            choices=[choice for choice, _ in TourPackage._meta.get_field('status').choices],
+            help='Solo los tours con este estado'
+        )
+        parser.add_argument(
+            '--ids',
+            type=int,
+            nargs='+',
+            help='Solo estos tours'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Cantidad de tours por lote (un executemany por lote, por defecto 1000)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Muestra los cambios sin guardarlos'
+        )
+
+    def handle(self, *args, **options):
+        queryset = TourPackage.objects.all()
+        if options['operator']:
+            queryset = queryset.filter(operator__username=options['operator'])
+        if options['status']:
+            queryset = queryset.filter(status=options['status'])
+        if options['ids']:
+            queryset = queryset.filter(pk__in=options['ids'])
+
+        dry_run = options['dry_run']
+        try:
+            result = recalculate_commissions(
+                queryset,
+                commission_rate=options['rate'],
+                batch_size=options['batch_size'],
+                dry_run=dry_run,
+                on_change=self._print_diff if dry_run else None,
+                on_progress=self._print_progress,
+            )
+        except (ValueError, ArithmeticError) as e:
+            raise CommandError(str(e))
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING(
+                f"Simulación: {result['updated']} de {result['processed']} tours cambiarían (no se guardó nada)."
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"{result['updated']} de {result['processed']} tours actualizados."
+            ))
+
+    def _print_diff(self, tour, before, after):
+        self.stdout.write(f'Tour {tour.pk} "{tour.title}":')
+        for name in before:
+            self.stdout.write(f'    {name}: {before[name]} -> {after[name]}')
+
+    def _print_progress(self, processed, total):
+        self.stderr.write(f'{processed}/{total} tours procesados')
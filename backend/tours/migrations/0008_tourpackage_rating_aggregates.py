@@ -0,0 +1,48 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:21
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum, Q
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    TourPackage = apps.get_model('tours', 'TourPackage')
+    approved = Q(reviews__is_approved=True)
+    tours = TourPackage.objects.order_by().annotate(
+        approved_count=Count('reviews', filter=approved),
+        approved_sum=Sum('reviews__rating', filter=approved),
+    ).filter(approved_count__gt=0)
+
+    for tour in tours.iterator():
+        rating_sum = tour.approved_sum or 0
+        TourPackage.objects.filter(pk=tour.pk).update(
+            rating_count=tour.approved_count,
+            rating_sum=rating_sum,
+            rating_avg=(Decimal(rating_sum) / Decimal(tour.approved_count)).quantize(Decimal('0.01')),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tours', '0007_alter_packageimage_options_alter_review_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tourpackage',
+            name='rating_avg',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), editable=False, max_digits=3, verbose_name='Calificación Promedio'),
+        ),
+        migrations.AddField(
+            model_name='tourpackage',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Cantidad de Reseñas'),
+        ),
+        migrations.AddField(
+            model_name='tourpackage',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Suma de Calificaciones'),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
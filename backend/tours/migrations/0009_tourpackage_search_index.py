@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+def install_search(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        # SQLite usa FTS5, creado en post_migrate (ver tours.signals)
+        return
+    from tours.search import install_postgres_search
+    install_postgres_search(schema_editor, apps.get_model('tours', 'TourPackage'))
+
+
+def uninstall_search(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    from tours.search import uninstall_postgres_search
+    uninstall_postgres_search(schema_editor, apps.get_model('tours', 'TourPackage'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tours', '0008_tourpackage_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search, uninstall_search),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tours', '0009_tourpackage_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['tour_package', 'is_approved', 'created_at'], name='tours_revie_tour_pa_2f4097_idx'),
+        ),
+    ]
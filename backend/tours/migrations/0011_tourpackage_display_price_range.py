@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:34
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def backfill_display_price_range(apps, schema_editor):
+    TourPackage = apps.get_model('tours', 'TourPackage')
+    tours = TourPackage.objects.order_by().only('id', 'final_price', 'price_variations_with_commission')
+
+    pending = []
+    for tour in tours.iterator(chunk_size=500):
+        variations = tour.price_variations_with_commission
+        if variations:
+            prices = [Decimal(str(price)).quantize(Decimal('0.01')) for price in variations.values()]
+            tour.min_display_price, tour.max_display_price = min(prices), max(prices)
+        else:
+            tour.min_display_price = tour.max_display_price = tour.final_price
+        pending.append(tour)
+
+        if len(pending) >= 500:
+            TourPackage.objects.bulk_update(pending, ['min_display_price', 'max_display_price'])
+            pending = []
+
+    if pending:
+        TourPackage.objects.bulk_update(pending, ['min_display_price', 'max_display_price'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tours', '0010_review_tour_approved_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tourpackage',
+            name='max_display_price',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, editable=False, max_digits=10, null=True, verbose_name='Precio Mostrado Máximo'),
+        ),
+        migrations.AddField(
+            model_name='tourpackage',
+            name='min_display_price',
+            field=models.DecimalField(blank=True, db_index=True, decimal_places=2, editable=False, max_digits=10, null=True, verbose_name='Precio Mostrado Mínimo'),
+        ),
+        migrations.RunPython(backfill_display_price_range, migrations.RunPython.noop),
+    ]
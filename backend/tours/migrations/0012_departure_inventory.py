@@ -0,0 +1,64 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:40
+
+import django.db.models.deletion
+from collections import defaultdict
+from django.db import migrations, models
+
+
+def backfill_departure_inventory(apps, schema_editor):
+    """Cupos ya reservados por día en tours OPEN_DATES (reservas pendientes o confirmadas)"""
+    TourPackage = apps.get_model('tours', 'TourPackage')
+    DepartureInventory = apps.get_model('tours', 'DepartureInventory')
+    Booking = apps.get_model('bookings', 'Booking')
+
+    bookings = Booking.objects.filter(
+        tour_package__availability_type='OPEN_DATES',
+        status__in=['PENDING', 'CONFIRMED'],
+    ).values_list('tour_package_id', 'travel_date', 'tickets_detail')
+
+    booked = defaultdict(int)
+    for tour_package_id, travel_date, tickets_detail in bookings.iterator():
+        booked[tour_package_id, travel_date] += sum((tickets_detail or {}).values())
+
+    group_sizes = dict(
+        TourPackage.objects.filter(
+            pk__in={tour_package_id for tour_package_id, _ in booked}
+        ).values_list('pk', 'group_size')
+    )
+    DepartureInventory.objects.bulk_create([
+        DepartureInventory(
+            tour_package_id=tour_package_id,
+            travel_date=travel_date,
+            capacity=max(group_sizes[tour_package_id], people),
+            booked=people,
+        )
+        for (tour_package_id, travel_date), people in booked.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tours', '0011_tourpackage_display_price_range'),
+        ('bookings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DepartureInventory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('travel_date', models.DateField(verbose_name='Fecha de Salida')),
+                ('capacity', models.PositiveIntegerField(verbose_name='Capacidad')),
+                ('booked', models.PositiveIntegerField(default=0, verbose_name='Cupos Reservados')),
+                ('tour_package', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='departures', to='tours.tourpackage')),
+            ],
+            options={
+                'verbose_name': 'Cupos por Fecha',
+                'verbose_name_plural': 'Cupos por Fecha',
+                'ordering': ['travel_date'],
+                'constraints': [models.UniqueConstraint(fields=('tour_package', 'travel_date'), name='unique_departure_per_tour_date'), models.CheckConstraint(condition=models.Q(('booked__lte', models.F('capacity'))), name='departure_booked_lte_capacity')],
+            },
+        ),
+        migrations.RunPython(backfill_departure_inventory, migrations.RunPython.noop),
+    ]
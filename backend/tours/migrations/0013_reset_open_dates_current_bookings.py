@@ -0,0 +1,20 @@
+from django.db import migrations
+
+
+def reset_open_dates_current_bookings(apps, schema_editor):
+    """Los cupos de OPEN_DATES viven en DepartureInventory; el contador del tour ya no se usa"""
+    TourPackage = apps.get_model('tours', 'TourPackage')
+    TourPackage.objects.filter(
+        availability_type='OPEN_DATES'
+    ).exclude(current_bookings=0).update(current_bookings=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tours', '0012_departure_inventory'),
+    ]
+
+    operations = [
+        migrations.RunPython(reset_open_dates_current_bookings, migrations.RunPython.noop),
+    ]
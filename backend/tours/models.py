@@ -1,10 +1,14 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Prefetch, Value
+from django.db.models.functions import Greatest
 from decimal import Decimal
 from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 
+from . import cache as catalog_cache
+
 VENEZUELA_STATES = [
     ("Amazonas", "Amazonas"),
     ("Anzoátegui", "Anzoátegui"), 
@@ -178,6 +182,27 @@ class TourPackage(models.Model):
         help_text="Calculado automáticamente aplicando commission_rate"
     )
 
+    # Rango de precios mostrado en listados (calculado automáticamente):
+    # el menor/mayor de las variaciones con comisión, o final_price si no hay
+    min_display_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+        verbose_name="Precio Mostrado Mínimo"
+    )
+    max_display_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        editable=False,
+        db_index=True,
+        verbose_name="Precio Mostrado Máximo"
+    )
+
     # ============ FIN SISTEMA DE PRECIOS ============
 
     # Información básica
@@ -274,6 +299,25 @@ class TourPackage(models.Model):
         verbose_name="Etiquetas"
     )
 
+    # Agregados de reseñas aprobadas (mantenidos por Review.save y tours.signals)
+    rating_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Cantidad de Reseñas"
+    )
+    rating_sum = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="Suma de Calificaciones"
+    )
+    rating_avg = models.DecimalField(
+        max_digits=3,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        editable=False,
+        verbose_name="Calificación Promedio"
+    )
+
     # Gestión
     is_active = models.BooleanField(default=True, verbose_name="Activo")
     is_recurring = models.BooleanField(default=False, verbose_name="Recurrente")
@@ -281,6 +325,11 @@ class TourPackage(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Campos mantenidos por fuera de save()
+    AGGREGATE_FIELDS = ('rating_count', 'rating_sum', 'rating_avg')
+    # Cupos ocupados: solo cambian con UPDATEs condicionales (increment/decrement_bookings)
+    COUNTER_FIELDS = ('current_bookings',)
+
     def _apply_commission(self, price):
         """Aplica la comisión a un precio"""
         if price is None:
@@ -307,6 +356,11 @@ class TourPackage(models.Model):
         else:
             self.price_variations_with_commission = None
         
+        # Rango de precios mostrado (filtros y orden por precio)
+        self.min_display_price, self.max_display_price = self.display_price_range(
+            self.final_price, self.price_variations_with_commission
+        )
+        
         # Servicios adicionales con comisión
         if self.extra_services:
             services_with_commission = {}
@@ -318,6 +372,17 @@ class TourPackage(models.Model):
         else:
             self.extra_services_with_commission = None
 
+    @staticmethod
+    def display_price_range(final_price, price_variations_with_commission):
+        """(mínimo, máximo) de las variaciones con comisión, o final_price si no hay"""
+        if price_variations_with_commission:
+            prices = [
+                Decimal(str(price)).quantize(Decimal('0.01'))
+                for price in price_variations_with_commission.values()
+            ]
+            return min(prices), max(prices)
+        return final_price, final_price
+
     def clean(self):
         """Validaciones personalizadas"""
         super().clean()
@@ -373,12 +438,53 @@ class TourPackage(models.Model):
             self.full_clean()
         except ValidationError as e:
             raise e
+
+        # Los agregados de reseñas y los cupos se mantienen con UPDATEs
+        # atómicos: no sobrescribirlos con valores que pueden estar desactualizados
+        if not self._state.adding and 'update_fields' not in kwargs:
+            skipped = self.AGGREGATE_FIELDS + self.COUNTER_FIELDS
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in skipped
+            ]
         
+        adding = self._state.adding
         super().save(*args, **kwargs)
 
+        update_fields = kwargs.get('update_fields')
+        if not adding and (update_fields is None or 'group_size' in update_fields):
+            self._sync_departure_capacity()
+
+    def _sync_departure_capacity(self):
+        """
+        Lleva el nuevo group_size a las salidas futuras ya creadas, sin
+        bajar de los cupos ya reservados en cada una.
+        """
+        if self.availability_type != self.AvailabilityType.OPEN_DATES:
+            return
+        self.departures.filter(
+            travel_date__gte=timezone.localdate()
+        ).exclude(
+            capacity=self.group_size
+        ).update(
+            capacity=Greatest(F('booked'), Value(self.group_size))
+        )
+
+    @classmethod
+    def tour_available_slots(cls, availability_type, group_size, current_bookings):
+        """
+        Cupos del tour para listados. En OPEN_DATES cada fecha tiene su
+        propio cupo (DepartureInventory) y current_bookings no se usa: se
+        informa la capacidad de una salida; el cupo de cada día sale de
+        available_slots_on() o de la acción availability.
+        """
+        if availability_type == cls.AvailabilityType.OPEN_DATES:
+            return group_size
+        return group_size - current_bookings
+
     @property
     def available_slots(self):
-        return self.group_size - self.current_bookings
+        return self.tour_available_slots(self.availability_type, self.group_size, self.current_bookings)
     
     @property
     def is_available(self):
@@ -386,38 +492,112 @@ class TourPackage(models.Model):
     
     @property
     def is_full(self):
-        return self.current_bookings >= self.group_size
+        return self.available_slots <= 0
 
     @property
     def main_image(self):
-        try:
-            return self.images.filter(is_main_image=True).first()
-        except:
-            return self.images.first()
+        # Usar la imagen precargada por main_image_prefetch() si existe
+        if hasattr(self, 'prefetched_main_images'):
+            return self.prefetched_main_images[0] if self.prefetched_main_images else None
+        return self.images.filter(is_main_image=True).first()
 
     @property
     def average_rating(self):
-        from django.db.models import Avg
-        result = self.reviews.filter(is_approved=True).aggregate(Avg('rating'))
-        return result['rating__avg'] or 0
-
-    @property
-    def rating_count(self):
-        return self.reviews.filter(is_approved=True).count()
+        return self.rating_avg
+
+    @staticmethod
+    def _rating_average(rating_sum, rating_count):
+        if not rating_count:
+            return Decimal('0.00')
+        return (Decimal(rating_sum) / Decimal(rating_count)).quantize(Decimal('0.01'))
+
+    @classmethod
+    def apply_rating_delta(cls, tour_package_id, count_delta, sum_delta):
+        """
+        Aplica un cambio incremental a los agregados de reseñas de un tour.
+        Bloquea la fila para que reseñas concurrentes no se pisen entre sí.
+        """
+        if not count_delta and not sum_delta:
+            return
+        with transaction.atomic():
+            current = cls.objects.select_for_update().filter(
+                pk=tour_package_id
+            ).values('rating_count', 'rating_sum').first()
+            if current is None:
+                return
+            rating_count = max(current['rating_count'] + count_delta, 0)
+            rating_sum = max(current['rating_sum'] + sum_delta, 0)
+            cls.objects.filter(pk=tour_package_id).update(
+                rating_count=rating_count,
+                rating_sum=rating_sum,
+                rating_avg=cls._rating_average(rating_sum, rating_count)
+            )
 
     def increment_bookings(self, count=1):
-        if self.current_bookings + count <= self.group_size:
+        """
+        Ocupa `count` cupos con un único UPDATE condicional
+        (current_bookings + count <= group_size): dos reservas simultáneas no
+        pueden sobrevender porque la base de datos evalúa la condición sobre
+        el valor vigente. Devuelve True si se ocuparon los cupos.
+        """
+        updated = TourPackage.objects.filter(
+            pk=self.pk,
+            current_bookings__lte=F('group_size') - count
+        ).update(
+            current_bookings=F('current_bookings') + count,
+            updated_at=timezone.now()
+        )
+        if updated:
+            # Reflejar el cambio sin releer la fila (puede haber otros en paralelo)
             self.current_bookings += count
-            self.save()
-            return True
-        return False
+            self._seats_changed()
+        return bool(updated)
 
     def decrement_bookings(self, count=1):
-        if self.current_bookings - count >= 0:
+        """Libera `count` cupos con un UPDATE condicional; nunca queda negativo"""
+        updated = TourPackage.objects.filter(
+            pk=self.pk,
+            current_bookings__gte=count
+        ).update(
+            current_bookings=F('current_bookings') - count,
+            updated_at=timezone.now()
+        )
+        if updated:
             self.current_bookings -= count
-            self.save()
-            return True
-        return False
+            self._seats_changed()
+        return bool(updated)
+
+    def _seats_changed(self):
+        """Invalidar el listado (available_slots) y el calendario del tour"""
+        catalog_cache.bump_version_on_commit(catalog_cache.LISTING)
+        catalog_cache.bump_version_on_commit(catalog_cache.availability_scope(self.pk))
+
+    # ============ CUPOS POR FECHA ============
+    # SPECIFIC_DATE usa current_bookings (una sola salida); OPEN_DATES lleva
+    # los cupos de cada día en DepartureInventory.
+
+    def available_slots_on(self, travel_date):
+        """Cupos libres para `travel_date` (una consulta por índice único en OPEN_DATES)"""
+        if self.availability_type != self.AvailabilityType.OPEN_DATES:
+            return self.available_slots
+        inventory = self.departures.filter(
+            travel_date=travel_date
+        ).values_list('capacity', 'booked').first()
+        if inventory is None:
+            return self.group_size
+        capacity, booked = inventory
+        return capacity - booked
+
+    def reserve_seats(self, count, travel_date):
+        """Ocupa `count` cupos para `travel_date`; False si no alcanzan"""
+        if self.availability_type == self.AvailabilityType.OPEN_DATES:
+            return DepartureInventory.reserve(self, travel_date, count)
+        return self.increment_bookings(count)
+
+    def release_seats(self, count, travel_date):
+        if self.availability_type == self.AvailabilityType.OPEN_DATES:
+            return DepartureInventory.release(self, travel_date, count)
+        return self.decrement_bookings(count)
 
     def __str__(self):
         if self.availability_type == self.AvailabilityType.SPECIFIC_DATE:
@@ -435,6 +615,33 @@ class TourPackage(models.Model):
             models.Index(fields=['operator', 'created_at']),
         ]
 
+def main_image_prefetch(lookup='images'):
+    """
+    Prefetch que carga solo la imagen principal de cada tour en
+    `prefetched_main_images`, para que `TourPackage.main_image` no haga
+    una consulta por fila. Usar lookup='tour_package__images' desde reservas.
+    """
+    return Prefetch(
+        lookup,
+        queryset=PackageImage.objects.filter(is_main_image=True),
+        to_attr='prefetched_main_images'
+    )
+
+def recent_reviews_prefetch(limit=None):
+    """
+    Prefetch de las `limit` reseñas aprobadas más recientes de cada tour en
+    `recent_reviews` (por defecto settings.TOURS_DETAIL_REVIEWS_LIMIT).
+    """
+    if limit is None:
+        limit = settings.TOURS_DETAIL_REVIEWS_LIMIT
+    return Prefetch(
+        'reviews',
+        queryset=Review.objects.filter(
+            is_approved=True
+        ).select_related('traveler').order_by('-created_at', '-id')[:limit],
+        to_attr='recent_reviews'
+    )
+
 class PackageImage(models.Model):
     tour_package = models.ForeignKey(
         TourPackage, 
@@ -457,6 +664,72 @@ class PackageImage(models.Model):
     class Meta:
         ordering = ['order', 'id']
 
+class DepartureInventory(models.Model):
+    """
+    Cupos de un tour OPEN_DATES en una fecha concreta. La fila se crea con
+    la primera reserva del día (capacity = group_size del tour) y se
+    actualiza con UPDATEs condicionales, igual que current_bookings. Si
+    cambia group_size, TourPackage.save() ajusta las salidas futuras.
+    """
+    tour_package = models.ForeignKey(
+        TourPackage,
+        on_delete=models.CASCADE,
+        related_name="departures"
+    )
+    travel_date = models.DateField(verbose_name="Fecha de Salida")
+    capacity = models.PositiveIntegerField(verbose_name="Capacidad")
+    booked = models.PositiveIntegerField(default=0, verbose_name="Cupos Reservados")
+
+    @classmethod
+    def reserve(cls, tour_package, travel_date, count):
+        """Ocupa `count` cupos del día; True si había lugar"""
+        departure = cls.objects.filter(tour_package=tour_package, travel_date=travel_date)
+        if cls._add(departure, count):
+            return True
+        # Sin fila para ese día (o sin cupo): crearla si falta y reintentar
+        cls.objects.get_or_create(
+            tour_package=tour_package,
+            travel_date=travel_date,
+            defaults={'capacity': tour_package.group_size}
+        )
+        return cls._add(departure, count)
+
+    @classmethod
+    def release(cls, tour_package, travel_date, count):
+        return bool(cls.objects.filter(
+            tour_package=tour_package,
+            travel_date=travel_date,
+            booked__gte=count
+        ).update(booked=F('booked') - count))
+
+    @staticmethod
+    def _add(departure, count):
+        return bool(departure.filter(
+            booked__lte=F('capacity') - count
+        ).update(booked=F('booked') + count))
+
+    @property
+    def available_slots(self):
+        return self.capacity - self.booked
+
+    def __str__(self):
+        return f"{self.tour_package} - {self.travel_date} ({self.booked}/{self.capacity})"
+
+    class Meta:
+        verbose_name = "Cupos por Fecha"
+        verbose_name_plural = "Cupos por Fecha"
+        ordering = ['travel_date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tour_package', 'travel_date'],
+                name='unique_departure_per_tour_date'
+            ),
+            models.CheckConstraint(
+                condition=models.Q(booked__lte=models.F('capacity')),
+                name='departure_booked_lte_capacity'
+            ),
+        ]
+
 class Review(models.Model):
     tour_package = models.ForeignKey(
         TourPackage, 
@@ -479,6 +752,33 @@ class Review(models.Model):
     is_approved = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    def save(self, *args, **kwargs):
+        """Guarda la reseña y actualiza los agregados del tour en la misma transacción"""
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = Review.objects.filter(pk=self.pk).values(
+                    'tour_package_id', 'rating', 'is_approved'
+                ).first()
+
+            super().save(*args, **kwargs)
+
+            # Delta neto por tour: (cantidad, suma)
+            deltas = {}
+            if previous and previous['is_approved']:
+                count, total = deltas.get(previous['tour_package_id'], (0, 0))
+                deltas[previous['tour_package_id']] = (count - 1, total - previous['rating'])
+            if self.is_approved:
+                count, total = deltas.get(self.tour_package_id, (0, 0))
+                deltas[self.tour_package_id] = (count + 1, total + self.rating)
+
+            for tour_package_id, (count, total) in deltas.items():
+                TourPackage.apply_rating_delta(tour_package_id, count, total)
+
     class Meta:
         unique_together = ('tour_package', 'traveler')
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+        indexes = [
+            # Reseñas aprobadas de un tour, más recientes primero
+            models.Index(fields=['tour_package', 'is_approved', 'created_at']),
+        ]
\ No newline at end of file
@@ -0,0 +1,209 @@
+"""
+Búsqueda de texto completo para el catálogo de tours.
+
+- PostgreSQL: SearchVector/SearchRank con la configuración `spanish_unaccent`
+  (stemming en español + unaccent) y un índice GIN sobre la misma expresión.
+- SQLite (desarrollo local): tabla virtual FTS5 con el tokenizer unicode61 y
+  remove_diacritics, sincronizada por triggers.
+- Otros motores: TourPackageFilter usa la búsqueda icontains original.
+"""
+
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F
+from django.db.models.expressions import RawSQL
+
+# Campos indexados y su peso en el ranking (A = más relevante)
+SEARCH_FIELDS = (
+    ('title', 'A'),
+    ('state_destination', 'B'),
+    ('specific_destination', 'B'),
+    ('state_origin', 'C'),
+    ('specific_origin', 'C'),
+    ('description', 'D'),
+)
+
+POSTGRES_CONFIG = 'spanish_unaccent'
+POSTGRES_INDEX_NAME = 'tour_search_vector_gin'
+
+SQLITE_FTS_TABLE = 'tours_tourpackage_fts'
+SQLITE_SOURCE_TABLE = 'tours_tourpackage'
+# Pesos bm25 en el mismo orden que SEARCH_FIELDS
+SQLITE_BM25_WEIGHTS = '10.0, 5.0, 5.0, 2.0, 2.0, 1.0'
+
+_sqlite_ready = set()
+
+
+def search_terms(words):
+    """Reduce las palabras normalizadas a tokens alfanuméricos seguros para MATCH/tsquery"""
+    terms = []
+    for word in words:
+        terms.extend(re.findall(r'\w+', word))
+    return terms
+
+
+def is_fulltext_available(using='default'):
+    if not getattr(settings, 'TOURS_FULLTEXT_SEARCH', True):
+        return False
+
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor == 'sqlite':
+        return _sqlite_fts_exists(connection)
+    return False
+
+
+def fulltext_search(queryset, words):
+    """
+    Filtra el queryset por los términos dados y anota `search_rank`.
+    Cualquier término basta para coincidir; las filas que coinciden con más
+    términos (y en campos más relevantes) obtienen mayor rank.
+    """
+    terms = search_terms(words)
+    if not terms:
+        return queryset
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        return _postgres_search(queryset, terms)
+    return _sqlite_search(queryset, terms)
+
+
+# ============ POSTGRESQL ============
+
+def search_vector():
+    """Expresión tsvector compartida por las consultas y el índice GIN"""
+    from django.contrib.postgres.search import SearchVector
+
+    vector = None
+    for field, weight in SEARCH_FIELDS:
+        field_vector = SearchVector(field, weight=weight, config=POSTGRES_CONFIG)
+        vector = field_vector if vector is None else vector + field_vector
+    return vector
+
+
+def _postgres_search(queryset, terms):
+    from django.contrib.postgres.search import SearchQuery, SearchRank
+
+    # Prefijo en cada término para soportar búsqueda mientras se escribe
+    raw_query = ' | '.join(f'{term}:*' for term in terms)
+    query = SearchQuery(raw_query, search_type='raw', config=POSTGRES_CONFIG)
+
+    return queryset.alias(
+        search_document=search_vector()
+    ).filter(
+        search_document=query
+    ).annotate(
+        search_rank=SearchRank(F('search_document'), query)
+    )
+
+
+def install_postgres_search(schema_editor, model):
+    """Crea la configuración spanish_unaccent y el índice GIN de búsqueda"""
+    from django.contrib.postgres.indexes import GinIndex
+
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS unaccent')
+    schema_editor.execute(f"""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = '{POSTGRES_CONFIG}') THEN
+                CREATE TEXT SEARCH CONFIGURATION {POSTGRES_CONFIG} (COPY = spanish);
+                ALTER TEXT SEARCH CONFIGURATION {POSTGRES_CONFIG}
+                    ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+            END IF;
+        END
+        $$;
+    """)
+    schema_editor.add_index(model, GinIndex(search_vector(), name=POSTGRES_INDEX_NAME))
+
+
+def uninstall_postgres_search(schema_editor, model):
+    from django.contrib.postgres.indexes import GinIndex
+
+    schema_editor.remove_index(model, GinIndex(search_vector(), name=POSTGRES_INDEX_NAME))
+    schema_editor.execute(f'DROP TEXT SEARCH CONFIGURATION IF EXISTS {POSTGRES_CONFIG}')
+
+
+# ============ SQLITE (FTS5) ============
+
+def _sqlite_search(queryset, terms):
+    match = ' OR '.join(f'"{term}"*' for term in terms)
+
+    matching_ids = RawSQL(
+        f'SELECT rowid FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH %s',
+        (match,)
+    )
+    # bm25 devuelve valores negativos: más negativo = más relevante
+    rank = RawSQL(
+        f'SELECT -bm25({SQLITE_FTS_TABLE}, {SQLITE_BM25_WEIGHTS}) FROM {SQLITE_FTS_TABLE} '
+        f'WHERE {SQLITE_FTS_TABLE} MATCH %s AND rowid = {SQLITE_SOURCE_TABLE}.id',
+        (match,)
+    )
+    return queryset.filter(id__in=matching_ids).annotate(search_rank=rank)
+
+
+def _sqlite_fts_exists(connection):
+    if connection.alias in _sqlite_ready:
+        return True
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+            [SQLITE_FTS_TABLE]
+        )
+        exists = cursor.fetchone() is not None
+    if exists:
+        _sqlite_ready.add(connection.alias)
+    return exists
+
+
+def ensure_sqlite_fts(connection):
+    """
+    Crea (si falta) la tabla FTS5 y sus triggers de sincronización.
+    Las migraciones de SQLite reconstruyen tours_tourpackage y eliminan los
+    triggers, por eso se ejecuta en cada post_migrate y reindexa cuando
+    los triggers no estaban.
+    """
+    columns = ', '.join(field for field, _ in SEARCH_FIELDS)
+    new_values = ', '.join(f'new.{field}' for field, _ in SEARCH_FIELDS)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+            [f'{SQLITE_FTS_TABLE}_%']
+        )
+        existing_triggers = {row[0] for row in cursor.fetchall()}
+
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} '
+            f"USING fts5({columns}, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+        triggers = {
+            f'{SQLITE_FTS_TABLE}_ai': (
+                f'AFTER INSERT ON {SQLITE_SOURCE_TABLE} BEGIN '
+                f'INSERT INTO {SQLITE_FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values}); END'
+            ),
+            f'{SQLITE_FTS_TABLE}_ad': (
+                f'AFTER DELETE ON {SQLITE_SOURCE_TABLE} BEGIN '
+                f'DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = old.id; END'
+            ),
+            f'{SQLITE_FTS_TABLE}_au': (
+                f'AFTER UPDATE OF {columns} ON {SQLITE_SOURCE_TABLE} BEGIN '
+                f'DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = old.id; '
+                f'INSERT INTO {SQLITE_FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values}); END'
+            ),
+        }
+        if set(triggers) <= existing_triggers:
+            return
+
+        for name, body in triggers.items():
+            cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {name} {body}')
+
+        cursor.execute(f'DELETE FROM {SQLITE_FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {SQLITE_FTS_TABLE}(rowid, {columns}) '
+            f'SELECT id, {columns} FROM {SQLITE_SOURCE_TABLE}'
+        )
@@ -1,6 +1,8 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.db import transaction
 from .models import TourPackage, PackageImage, Review, Tag, IncludedItem
+from ventu_api.serializers import SparseFieldsetMixin
 from decimal import Decimal
 
 class TagSerializer(serializers.ModelSerializer):
@@ -39,12 +41,19 @@ class ReviewSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['traveler_name', 'traveler_username', 'response_date', 'created_at']
 
-class TourPackageListSerializer(serializers.ModelSerializer):
-    """Serializer optimizado para listar paquetes"""
+class TourPackageListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    Serializer optimizado para listar paquetes.
+    Acepta ?fields=, ?omit= y ?expand=tags (ver SparseFieldsetMixin).
+    """
+    expandable_fields = {
+        'tags': lambda: TagSerializer(many=True, read_only=True),
+    }
+
     operator_name = serializers.CharField(source='operator.get_full_name', read_only=True)
     operator_username = serializers.CharField(source='operator.username', read_only=True)
     available_slots = serializers.ReadOnlyField()
-    average_rating = serializers.ReadOnlyField()
+    average_rating = serializers.ReadOnlyField(source='rating_avg')
     rating_count = serializers.ReadOnlyField()
     main_image = serializers.SerializerMethodField()
     
@@ -70,22 +79,114 @@ class TourPackageListSerializer(serializers.ModelSerializer):
         return None
     
     def get_display_price(self, obj):
-        """Precio a mostrar en listados (con comisión)"""
-        if obj.price_variations_with_commission:
-            # Si hay variaciones, mostrar el precio más bajo
-            prices = [float(p) for p in obj.price_variations_with_commission.values()]
-            return min(prices) if prices else float(obj.final_price or 0)
-        return float(obj.final_price or 0)
+        """Precio a mostrar en listados (con comisión): el menor si hay variaciones"""
+        return float(obj.min_display_price or 0)
     
     def get_has_price_variations(self, obj):
         """Indica si tiene variaciones de precio"""
         return bool(obj.price_variations_with_commission)
 
-class TourPackageDetailSerializer(serializers.ModelSerializer):
-    """Serializer completo para detalle de paquetes"""
+
+class TourPackageListRows:
+    """
+    Ruta rápida del listado del catálogo: construye con values() las mismas
+    filas que TourPackageListSerializer (JSON idéntico) sin instanciar
+    modelos, sin un PackageImageSerializer por fila y sin recorrer los
+    `source=` con puntos. Las imágenes principales salen de una consulta.
+
+    Solo cubre el formato completo; con ?fields=/?omit=/?expand= se usa
+    el serializer.
+    """
+    values_fields = (
+        'id', 'title', 'state_destination', 'specific_destination',
+        'base_price', 'final_price', 'commission_rate',
+        'price_variations_with_commission', 'min_display_price', 'duration_days',
+        'operator__first_name', 'operator__last_name', 'operator__username',
+        'availability_type', 'group_size', 'current_bookings', 'rating_avg', 'rating_count',
+        'environment', 'status', 'is_active', 'created_at',
+    )
+    image_fields = ('id', 'tour_package_id', 'image', 'is_main_image', 'caption', 'order')
+    decimal_fields = ('base_price', 'final_price', 'commission_rate')
+
+    def __init__(self):
+        # Misma representación (quantize y formato) que los DecimalField del serializer
+        fields = TourPackageListSerializer().fields
+        self.decimal_formatters = {name: fields[name].to_representation for name in self.decimal_fields}
+        self.image_storage = PackageImage._meta.get_field('image').storage
+
+    @staticmethod
+    def applies_to(request):
+        return not any(param in request.query_params for param in ('fields', 'omit', 'expand'))
+
+    def values(self, queryset):
+        return queryset.prefetch_related(None).values(*self.values_fields)
+
+    def build(self, rows):
+        rows = list(rows)
+        main_images = self._main_images([row['id'] for row in rows])
+        return [self._build_row(row, main_images.get(row['id'])) for row in rows]
+
+    def _build_row(self, row, main_image):
+        return {
+            'id': row['id'],
+            'title': row['title'],
+            'state_destination': row['state_destination'],
+            'specific_destination': row['specific_destination'],
+            'base_price': self._decimal('base_price', row),
+            'final_price': self._decimal('final_price', row),
+            'commission_rate': self._decimal('commission_rate', row),
+            'display_price': float(row['min_display_price'] or 0),
+            'has_price_variations': bool(row['price_variations_with_commission']),
+            'duration_days': row['duration_days'],
+            'operator_name': f"{row['operator__first_name']} {row['operator__last_name']}".strip(),
+            'operator_username': row['operator__username'],
+            'available_slots': TourPackage.tour_available_slots(
+                row['availability_type'], row['group_size'], row['current_bookings']
+            ),
+            'average_rating': row['rating_avg'],
+            'rating_count': row['rating_count'],
+            'main_image': main_image,
+            'environment': row['environment'],
+            'status': row['status'],
+            'is_active': row['is_active'],
+        }
+
+    def _decimal(self, name, row):
+        value = row[name]
+        return None if value is None else self.decimal_formatters[name](value)
+
+    def _main_images(self, tour_ids):
+        """Primera imagen principal de cada tour, como PackageImageSerializer"""
+        if not tour_ids:
+            return {}
+        images = PackageImage.objects.filter(
+            tour_package_id__in=tour_ids, is_main_image=True
+        ).values(*self.image_fields)
+
+        main_images = {}
+        for image in images:
+            if image['tour_package_id'] in main_images:
+                continue
+            url = self.image_storage.url(image['image']) if image['image'] else None
+            main_images[image['tour_package_id']] = {
+                'id': image['id'],
+                'image': url,
+                'image_url': url,
+                'is_main_image': image['is_main_image'],
+                'caption': image['caption'],
+                'order': image['order'],
+            }
+        return main_images
+
+class TourPackageDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    Serializer completo para detalle de paquetes.
+    En lecturas acepta ?fields= y ?omit= (ver SparseFieldsetMixin).
+    """
     # Campos relacionados
     images = PackageImageSerializer(many=True, read_only=True)
-    reviews = ReviewSerializer(many=True, read_only=True)
+    # Solo las reseñas aprobadas más recientes; el resto en /api/tours/{id}/reviews/
+    reviews = serializers.SerializerMethodField()
     tags = TagSerializer(many=True, read_only=True)
     what_is_included = IncludedItemSerializer(many=True, read_only=True)
     what_is_not_included = IncludedItemSerializer(many=True, read_only=True)
@@ -94,7 +195,7 @@ class TourPackageDetailSerializer(serializers.ModelSerializer):
     operator_name = serializers.CharField(source='operator.get_full_name', read_only=True)
     operator_username = serializers.CharField(source='operator.username', read_only=True)
     available_slots = serializers.ReadOnlyField()
-    average_rating = serializers.ReadOnlyField()
+    average_rating = serializers.ReadOnlyField(source='rating_avg')
     rating_count = serializers.ReadOnlyField()
     is_available = serializers.ReadOnlyField()
     is_full = serializers.ReadOnlyField()
@@ -122,6 +223,16 @@ class TourPackageDetailSerializer(serializers.ModelSerializer):
         required=False
     )
     
+    def get_reviews(self, obj):
+        reviews = getattr(obj, 'recent_reviews', None)
+        if reviews is None:
+            reviews = obj.reviews.filter(
+                is_approved=True
+            ).select_related('traveler').order_by(
+                '-created_at', '-id'
+            )[:settings.TOURS_DETAIL_REVIEWS_LIMIT]
+        return ReviewSerializer(reviews, many=True, context=self.context).data
+
     # Validaciones de precios
     def validate_price_variations(self, value):
         """Valida que price_variations tenga formato correcto"""
@@ -195,13 +306,6 @@ class TourPackageDetailSerializer(serializers.ModelSerializer):
             )
         return value
     
-    def validate_current_bookings(self, value):
-        if value < 0:
-            raise serializers.ValidationError(
-                "Las reservas no pueden ser negativas"
-            )
-        return value
-    
     def validate(self, data):
         """Validaciones cruzadas"""
         # Validar capacidad
@@ -289,7 +393,7 @@ class TourPackageDetailSerializer(serializers.ModelSerializer):
         read_only_fields = [
             'final_price', 'price_variations_with_commission', 
             'extra_services_with_commission',
-            'operator_name', 'operator_username',
+            'operator_name', 'operator_username', 'current_bookings',
             'available_slots', 'average_rating', 'rating_count',
             'is_available', 'is_full', 'created_at', 'updated_at'
         ]
@@ -337,6 +441,43 @@ class TourPackageCreateSerializer(TourPackageDetailSerializer):
             
             return instance
 
+class TourPackageImportSerializer(TourPackageDetailSerializer):
+    """
+    Valida una fila de importación masiva (tours.bulk).
+    Las relaciones llegan por nombre y se resuelven por lote en el importador.
+    """
+    images = None
+    reviews = None
+    what_is_included = None
+    what_is_not_included = None
+    tag_ids = None
+    included_item_ids = None
+    not_included_item_ids = None
+    operator_name = None
+    operator_username = None
+    available_slots = None
+    average_rating = None
+    rating_count = None
+    is_available = None
+    is_full = None
+
+    tags = serializers.ListField(child=serializers.CharField(), required=False)
+    included_items = serializers.ListField(child=serializers.CharField(), required=False)
+    not_included_items = serializers.ListField(child=serializers.CharField(), required=False)
+
+    class Meta:
+        model = TourPackage
+        fields = [
+            'title', 'description', 'is_active', 'is_recurring',
+            'state_origin', 'specific_origin', 'state_destination', 'specific_destination',
+            'base_price', 'commission_rate', 'price_variations', 'extra_services',
+            'meeting_point', 'meeting_time', 'duration_days', 'environment', 'group_size',
+            'availability_type', 'available_from', 'available_until',
+            'departure_date', 'departure_time',
+            'highlights', 'itinerary',
+            'tags', 'included_items', 'not_included_items',
+        ]
+
 class ImageUploadSerializer(serializers.ModelSerializer):
     """Serializer para subir imágenes"""
     class Meta:
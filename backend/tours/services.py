@@ -0,0 +1,199 @@
+"""
+Operaciones sobre paquetes turísticos que no encajan en un solo modelo:
+
+- recalculate_commissions: recálculo masivo de precios sin save() por fila
+  (recalcular comisiones + full_clean con sus consultas de unicidad).
+- month_availability: calendario de cupos por día de un tour.
+"""
+
+import calendar
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import TourPackage
+from . import cache as catalog_cache
+
+# Campos que recalcula TourPackage._calculate_prices_with_commission
+COMMISSION_PRICE_FIELDS = (
+    'final_price',
+    'price_variations_with_commission',
+    'extra_services_with_commission',
+    'min_display_price',
+    'max_display_price',
+)
+
+
+def recalculate_commissions(queryset, commission_rate=None, batch_size=1000,
+                            dry_run=False, on_change=None, on_progress=None):
+    """
+    Recalcula los precios con comisión de los tours de `queryset`.
+
+    - commission_rate: si se indica, se asigna a todos antes de recalcular.
+    - dry_run: calcula los cambios pero no escribe nada.
+    - on_change(tour, before, after): por cada tour con cambios, con los
+      valores anteriores y nuevos de los campos modificados.
+    - on_progress(processed, total): después de cada lote.
+
+    Todo corre en una transacción: o se actualizan todos los lotes o
+    ninguno. Devuelve {'processed': n, 'updated': m}.
+    """
+    if commission_rate is not None:
+        commission_rate = Decimal(str(commission_rate))
+        if not Decimal('0.00') <= commission_rate <= Decimal('1.00'):
+            raise ValueError('La comisión debe estar entre 0% y 100%')
+        if commission_rate != commission_rate.quantize(Decimal('0.01')):
+            raise ValueError('La comisión admite como máximo 2 decimales')
+        commission_rate = commission_rate.quantize(Decimal('0.01'))
+
+    fields = list(COMMISSION_PRICE_FIELDS) + ['updated_at']
+    if commission_rate is not None:
+        fields.append('commission_rate')
+
+    tours = queryset.order_by('pk').only(
+        'id', 'title', 'base_price', 'commission_rate',
+        'price_variations', 'extra_services', *COMMISSION_PRICE_FIELDS
+    )
+    total = queryset.count()
+    processed = updated = 0
+    last_pk = None
+    now = timezone.now()
+
+    with transaction.atomic(using=queryset.db):
+        while True:
+            # Lotes por pk (keyset): sin OFFSET y sin un cursor abierto mientras se escribe
+            batch = tours if last_pk is None else tours.filter(pk__gt=last_pk)
+            batch = list(batch[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            changed = []
+            for tour in batch:
+                if _recalculate(tour, commission_rate, on_change):
+                    tour.updated_at = now
+                    changed.append(tour)
+
+            if changed and not dry_run:
+                _update_rows(changed, fields, queryset.db)
+            processed += len(batch)
+            updated += len(changed)
+
+            if on_progress:
+                on_progress(processed, total)
+
+        if updated and not dry_run:
+            catalog_cache.bump_version_on_commit(catalog_cache.CATALOG)
+
+    return {'processed': processed, 'updated': updated}
+
+
+def _recalculate(tour, commission_rate, on_change):
+    """Aplica la comisión en memoria; True si algún campo cambió"""
+    tracked = COMMISSION_PRICE_FIELDS + ('commission_rate',)
+    before = {name: getattr(tour, name) for name in tracked}
+
+    if commission_rate is not None:
+        tour.commission_rate = commission_rate
+    tour._calculate_prices_with_commission()
+
+    after = {name: getattr(tour, name) for name in tracked}
+    diff = [name for name in tracked if before[name] != after[name]]
+    if not diff:
+        return False
+
+    if on_change:
+        on_change(
+            tour,
+            {name: before[name] for name in diff},
+            {name: after[name] for name in diff},
+        )
+    return True
+
+
+def _update_rows(tours, fields, using):
+    """
+    UPDATE por fila con executemany: una sentencia preparada para todo el
+    lote. bulk_update arma un CASE WHEN por campo y fila, y ese armado en
+    Python cuesta casi lo mismo que save() por tour.
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    model_fields = [TourPackage._meta.get_field(name) for name in fields]
+    pk_column = TourPackage._meta.pk.column
+
+    assignments = ', '.join(f'{quote(field.column)} = %s' for field in model_fields)
+    sql = f'UPDATE {quote(TourPackage._meta.db_table)} SET {assignments} WHERE {quote(pk_column)} = %s'
+    params = [
+        [field.get_db_prep_save(getattr(tour, field.attname), connection) for field in model_fields] + [tour.pk]
+        for tour in tours
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+# ============ DISPONIBILIDAD ============
+
+def month_availability(tour_package, year, month, today=None):
+    """
+    Cupos por día de `tour_package` en el mes dado, solo para los días en
+    que se puede reservar (desde hoy, dentro de available_from/until o el
+    día de departure_date).
+
+    Los cupos salen de la misma fuente que usa la reserva: en OPEN_DATES
+    las filas de DepartureInventory del rango (un día sin fila tiene
+    group_size libres); en SPECIFIC_DATE, current_bookings del tour.
+    """
+    today = today or timezone.localdate()
+    first_day = date(year, month, 1)
+    last_day = date(year, month, calendar.monthrange(year, month)[1])
+    start, end = _bookable_range(tour_package, max(first_day, today), last_day)
+
+    days = []
+    if start is not None and start <= end:
+        if tour_package.availability_type == TourPackage.AvailabilityType.OPEN_DATES:
+            inventory = {
+                travel_date: (capacity, booked)
+                for travel_date, capacity, booked in tour_package.departures.filter(
+                    travel_date__range=(start, end)
+                ).values_list('travel_date', 'capacity', 'booked')
+            }
+        else:
+            inventory = {start: (tour_package.group_size, tour_package.current_bookings)}
+
+        day = start
+        while day <= end:
+            capacity, people = inventory.get(day, (tour_package.group_size, 0))
+            available_slots = max(capacity - people, 0)
+            days.append({
+                'date': day.isoformat(),
+                'capacity': capacity,
+                'booked': people,
+                'available_slots': available_slots,
+                'is_available': available_slots > 0,
+            })
+            day += timedelta(days=1)
+
+    return {
+        'tour_id': tour_package.pk,
+        'month': f'{year:04d}-{month:02d}',
+        'availability_type': tour_package.availability_type,
+        'days': days,
+    }
+
+
+def _bookable_range(tour_package, start, end):
+    """Recorta [start, end] a las fechas reservables del tour; (None, None) si no hay"""
+    if tour_package.availability_type == TourPackage.AvailabilityType.SPECIFIC_DATE:
+        departure = tour_package.departure_date
+        if departure is None or not start <= departure <= end:
+            return None, None
+        return departure, departure
+
+    if tour_package.available_from:
+        start = max(start, tour_package.available_from)
+    if tour_package.available_until:
+        end = min(end, tour_package.available_until)
+    return start, end
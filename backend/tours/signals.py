@@ -0,0 +1,92 @@
+import logging
+
+from django.db import connections, DatabaseError
+from django.utils import timezone
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete, post_migrate, m2m_changed
+from django.dispatch import receiver
+from .models import TourPackage, PackageImage, Review, DepartureInventory, Tag
+from . import cache as catalog_cache
+from . import search
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_delete, sender=Review)
+def discount_deleted_review(sender, instance, **kwargs):
+    """
+    Descontar la reseña eliminada de los agregados del tour.
+    Cubre también los borrados masivos (admin, queryset.delete()).
+    """
+    if instance.is_approved:
+        TourPackage.apply_rating_delta(
+            instance.tour_package_id, -1, -instance.rating
+        )
+
+
+@receiver(post_save, sender=TourPackage)
+@receiver(post_delete, sender=TourPackage)
+@receiver(post_save, sender=PackageImage)
+@receiver(post_delete, sender=PackageImage)
+def invalidate_catalog_cache(sender, **kwargs):
+    """Invalidar las estadísticas cacheadas del catálogo cuando cambia un tour o una imagen"""
+    catalog_cache.bump_version_on_commit(catalog_cache.CATALOG)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(m2m_changed, sender=TourPackage.tags.through)
+def invalidate_listing(sender, **kwargs):
+    """Etiquetas renombradas o reasignadas: cambian las filas del listado"""
+    catalog_cache.bump_version_on_commit(catalog_cache.LISTING)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_operator_listing(sender, instance, update_fields=None, **kwargs):
+    """El nombre del operador sale en el listado; un login (last_login) no lo cambia"""
+    if instance.role != 'OPERATOR' or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    catalog_cache.bump_version_on_commit(catalog_cache.LISTING)
+
+
+@receiver(post_save, sender=TourPackage)
+@receiver(post_delete, sender=TourPackage)
+def invalidate_tour_availability(sender, instance, **kwargs):
+    """Fechas o capacidad del tour pueden haber cambiado"""
+    catalog_cache.bump_version_on_commit(catalog_cache.availability_scope(instance.pk))
+
+
+@receiver(post_save, sender=DepartureInventory)
+@receiver(post_delete, sender=DepartureInventory)
+def invalidate_departure_availability(sender, instance, **kwargs):
+    """Capacidad de un día editada (admin)"""
+    catalog_cache.bump_version_on_commit(catalog_cache.availability_scope(instance.tour_package_id))
+
+
+@receiver(post_save, sender=PackageImage)
+@receiver(post_delete, sender=PackageImage)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def touch_tour_package(sender, instance, **kwargs):
+    """
+    Actualizar updated_at del tour cuando cambian sus imágenes o reseñas,
+    para que los ETag/Last-Modified del detalle y del listado cambien.
+    """
+    TourPackage.objects.filter(pk=instance.tour_package_id).update(
+        updated_at=timezone.now()
+    )
+    catalog_cache.bump_version_on_commit(catalog_cache.LISTING)
+
+
+@receiver(post_migrate)
+def ensure_sqlite_search_index(sender, using='default', **kwargs):
+    """Mantener disponible el índice FTS5 de desarrollo tras cada migrate"""
+    if sender.name != 'tours':
+        return
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    try:
+        search.ensure_sqlite_fts(connection)
+    except DatabaseError as e:
+        logger.warning(f"No se pudo crear el índice FTS5 de tours: {e}")
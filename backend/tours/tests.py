@@ -1,3 +1,763 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import tempfile
+import threading
+from datetime import date, time, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.admin.sites import AdminSite
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from users.models import CustomUser, OperatorProfile
+from rest_framework.settings import api_settings
+
+from .admin import TourPackageAdmin
+from .bulk import IMPORT_COLUMNS, TourImporter, export_rows, read_rows
+from .models import TourPackage, PackageImage, Review, DepartureInventory, Tag, IncludedItem
+from .serializers import TourPackageListSerializer
+from .services import recalculate_commissions
+from . import cache as catalog_cache
+
+
+def create_tour(operator, **kwargs):
+    data = {
+        'title': 'Tour',
+        'description': 'Descripción',
+        'operator': operator,
+        'base_price': Decimal('100.00'),
+        'meeting_point': 'Plaza Altamira',
+        'meeting_time': time(8, 0),
+        'available_from': date.today() + timedelta(days=1),
+        'available_until': date.today() + timedelta(days=30),
+    }
+    data.update(kwargs)
+    return TourPackage.objects.create(**data)
+
+
+class CatalogStatsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        operator = CustomUser.objects.create_user(
+            username='operador', email='operador@ventu.com', password='x', role='OPERATOR'
+        )
+        states = ['Aragua', 'Mérida', 'Falcón', 'Sucre']
+        environments = ['BEACH', 'MOUNTAIN', 'NATURE']
+        for i in range(12):
+            tour = create_tour(
+                operator,
+                title=f'Tour {i}',
+                state_destination=states[i % len(states)],
+                environment=environments[i % len(environments)],
+            )
+            PackageImage.objects.create(tour_package=tour, image=f'tour_packages/{i}-b.jpg', order=1)
+            PackageImage.objects.create(
+                tour_package=tour, image=f'tour_packages/{i}-main.jpg', is_main_image=(i % 2 == 0)
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_destinations_stats_runs_a_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/tours/destinations_stats/', secure=True)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 4)
+        for destination in response.json():
+            self.assertEqual(destination['count'], 3)
+            self.assertTrue(destination['image'].endswith('-main.jpg'))
+
+    def test_experiences_stats_runs_a_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/tours/experiences_stats/', secure=True)
+
+        self.assertEqual(response.status_code, 200)
+        labels = {experience['code']: experience['label'] for experience in response.json()}
+        self.assertEqual(labels['BEACH'], '🏖️ Playa')
+        self.assertTrue(all(experience['image'] for experience in response.json()))
+
+    def test_stats_are_served_from_cache_until_the_catalog_changes(self):
+        self.client.get('/api/tours/destinations_stats/', secure=True)
+        with self.assertNumQueries(0):
+            self.client.get('/api/tours/destinations_stats/', secure=True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TourPackage.objects.first().delete()
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/tours/destinations_stats/', secure=True)
+        self.assertEqual(sum(destination['count'] for destination in response.json()), 11)
+
+
+class RecalculateCommissionsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.operator = CustomUser.objects.create_user(
+            username='operador', email='operador@ventu.com', password='x', role='OPERATOR'
+        )
+        cls.tour = create_tour(
+            cls.operator, base_price=Decimal('100.00'), commission_rate=Decimal('0.10'),
+            price_variations={'adulto': 100, 'niño': 60},
+            extra_services={'almuerzo': 20},
+        )
+        cls.other = create_tour(cls.operator, title='Otro', base_price=Decimal('50.00'))
+
+    def setUp(self):
+        cache.clear()
+
+    def prices(self):
+        return list(TourPackage.objects.order_by('pk').values_list(
+            'commission_rate', 'final_price', 'price_variations_with_commission',
+            'extra_services_with_commission', 'min_display_price', 'max_display_price', 'updated_at',
+        ))
+
+    def test_dry_run_writes_nothing(self):
+        before = self.prices()
+        changes = []
+
+        result = recalculate_commissions(
+            TourPackage.objects.all(), commission_rate='0.20', dry_run=True,
+            on_change=lambda tour, old, new: changes.append(tour.pk),
+        )
+
+        self.assertEqual(result, {'processed': 2, 'updated': 2})
+        self.assertEqual(sorted(changes), [self.tour.pk, self.other.pk])
+        self.assertEqual(self.prices(), before)
+
+    def test_prices_are_recomputed_with_the_new_rate(self):
+        updated_at = TourPackage.objects.get(pk=self.tour.pk).updated_at
+        version = catalog_cache.get_version(catalog_cache.CATALOG)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            recalculate_commissions(TourPackage.objects.filter(pk=self.tour.pk), commission_rate='0.20', batch_size=1)
+
+        tour = TourPackage.objects.get(pk=self.tour.pk)
+        self.assertEqual(tour.commission_rate, Decimal('0.20'))
+        self.assertEqual(tour.final_price, Decimal('120.00'))
+        self.assertEqual(tour.price_variations_with_commission, {'adulto': 120.0, 'niño': 72.0})
+        self.assertEqual(tour.extra_services_with_commission, {'almuerzo': 24.0})
+        self.assertEqual((tour.min_display_price, tour.max_display_price), (Decimal('72.00'), Decimal('120.00')))
+        self.assertGreater(tour.updated_at, updated_at)
+        self.assertGreater(catalog_cache.get_version(catalog_cache.CATALOG), version)
+        # Los demás tours no se tocan
+        self.assertEqual(TourPackage.objects.get(pk=self.other.pk).commission_rate, Decimal('0.10'))
+
+    def test_out_of_range_rates_are_rejected(self):
+        before = self.prices()
+        for rate in ('1.50', '-0.10', '0.125'):
+            with self.subTest(rate=rate), self.assertRaises(ValueError):
+                recalculate_commissions(TourPackage.objects.all(), commission_rate=rate)
+        with self.assertRaises(CommandError):
+            call_command('recalculate_commissions', rate='2', stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertEqual(self.prices(), before)
+
+
+class BulkImportExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.operator = CustomUser.objects.create_user(
+            username='operador', email='operador@ventu.com', password='x', role='OPERATOR'
+        )
+        # El perfil creado por la señal tiene un RIF vacío (único por tipo y número)
+        OperatorProfile.objects.filter(user=cls.operator).update(rif_number='J123')
+        cls.other_operator = CustomUser.objects.create_user(
+            username='otro', email='otro@ventu.com', password='x', role='OPERATOR'
+        )
+        cls.playa = Tag.objects.create(name='Playa')
+        cls.montana = Tag.objects.create(name='Montaña')
+        cls.transporte = IncludedItem.objects.create(name='Transporte')
+        cls.almuerzo = IncludedItem.objects.create(name='Almuerzo')
+
+    def csv_file(self, *rows):
+        header = 'title,description,base_price,meeting_point,meeting_time,available_from,available_until,tags,included_items,not_included_items\n'
+        start = (date.today() + timedelta(days=1)).isoformat()
+        end = (date.today() + timedelta(days=30)).isoformat()
+        lines = [header] + [
+            f'{title},Descripción,{price},Plaza Altamira,08:00,{start},{end},{tags},{included},{not_included}\n'
+            for title, price, tags, included, not_included in rows
+        ]
+        return io.BytesIO(''.join(lines).encode())
+
+    def test_invalid_rows_are_reported_by_number(self):
+        rows = read_rows(self.csv_file(
+            ('Choroní', '100.00', 'Playa', '', ''),
+            ('Sin precio', '', '', '', ''),
+            ('Negativo', '-5', '', '', ''),
+        ), 'csv')
+
+        result = TourImporter(self.operator).run(rows)
+
+        self.assertEqual(result['created'], 1)
+        self.assertEqual([error['row'] for error in result['errors']], [3, 4])
+        self.assertIn('base_price', result['errors'][0]['errors'])
+        self.assertIn('base_price', result['errors'][1]['errors'])
+        self.assertEqual(list(TourPackage.objects.values_list('title', flat=True)), ['Choroní'])
+
+    def test_unknown_names_reject_the_row(self):
+        rows = read_rows(self.csv_file(
+            ('Choroní', '100.00', 'Playa|Desierto', '', ''),
+            ('Roraima', '300.00', '', 'Transporte|Guía', ''),
+        ), 'csv')
+
+        result = TourImporter(self.operator).run(rows)
+
+        self.assertEqual(result['created'], 0)
+        self.assertEqual(result['errors'], [
+            {'row': 2, 'errors': {'tags': ['No existe: Desierto']}},
+            {'row': 3, 'errors': {'included_items': ['No existe: Guía']}},
+        ])
+        self.assertFalse(TourPackage.objects.exists())
+
+    def test_dry_run_writes_nothing(self):
+        with tempfile.NamedTemporaryFile(suffix='.csv') as upload:
+            upload.write(self.csv_file(('Choroní', '100.00', 'Playa', 'Transporte', '')).getvalue())
+            upload.flush()
+            stdout = io.StringIO()
+            version = catalog_cache.get_version(catalog_cache.CATALOG)
+
+            call_command('import_tours', upload.name, operator='operador', dry_run=True, stdout=stdout)
+
+        self.assertIn('1 paquetes válidos', stdout.getvalue())
+        self.assertFalse(TourPackage.objects.exists())
+        self.assertFalse(TourPackage.tags.through.objects.exists())
+        self.assertEqual(catalog_cache.get_version(catalog_cache.CATALOG), version)
+
+    def test_relations_are_created(self):
+        rows = read_rows(self.csv_file(
+            ('Choroní', '100.00', 'Playa|Montaña', 'Transporte', 'Almuerzo'),
+            ('Roraima', '300.00', '["Montaña"]', 'Transporte|Almuerzo', ''),
+        ), 'csv')
+
+        result = TourImporter(self.operator, batch_size=1).run(rows)
+
+        self.assertEqual(result, {'created': 2, 'errors': []})
+        choroni = TourPackage.objects.get(title='Choroní')
+        roraima = TourPackage.objects.get(title='Roraima')
+        self.assertEqual(set(choroni.tags.all()), {self.playa, self.montana})
+        self.assertEqual(set(choroni.what_is_included.all()), {self.transporte})
+        self.assertEqual(set(choroni.what_is_not_included.all()), {self.almuerzo})
+        self.assertEqual(set(roraima.tags.all()), {self.montana})
+        self.assertEqual(set(roraima.what_is_included.all()), {self.transporte, self.almuerzo})
+        self.assertEqual(choroni.final_price, Decimal('110.00'))
+
+    def test_export_import_round_trip(self):
+        tour = create_tour(
+            self.operator, title='Choroní', base_price=Decimal('120.00'),
+            price_variations={'adulto': 120, 'niño': 80}, extra_services={'almuerzo': 15},
+            highlights=['Playa Grande', 'Puerto Colombia'],
+            itinerary=[{'day': 1, 'description': 'Salida desde Caracas'}],
+        )
+        tour.tags.set([self.playa, self.montana])
+        tour.what_is_included.set([self.transporte])
+        tour.what_is_not_included.set([self.almuerzo])
+        create_tour(
+            self.operator, title='Mérida', description='Teleférico, páramo y "truchas"',
+            meeting_point='-Plaza Bolívar', specific_origin='=Mérida',
+        )
+
+        self.client.force_login(self.operator)
+        for file_format in ('csv', 'jsonl'):
+            with self.subTest(file_format=file_format):
+                TourPackage.objects.filter(operator=self.other_operator).delete()
+                response = self.client.get(
+                    '/api/tours/export/', {'file_format': file_format}, secure=True
+                )
+                exported = b''.join(response.streaming_content).splitlines(keepends=True)
+
+                result = TourImporter(self.other_operator).run(read_rows(exported, file_format))
+
+                self.assertEqual(result, {'created': 2, 'errors': []})
+                self.assertEqual(
+                    self.import_columns(self.other_operator), self.import_columns(self.operator)
+                )
+
+    def import_columns(self, operator):
+        return [
+            {column: row[column] for column in IMPORT_COLUMNS + ('final_price',)}
+            for row in export_rows(TourPackage.objects.filter(operator=operator))
+        ]
+
+
+class CatalogSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.operator = CustomUser.objects.create_user(
+            username='operador', email='operador@ventu.com', password='x', role='OPERATOR'
+        )
+        cls.choroni = create_tour(cls.operator, title='Playa en Choroní', state_destination='Aragua')
+        cls.merida = create_tour(cls.operator, title='Páramo andino', state_destination='Mérida')
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, text):
+        response = self.client.get('/api/tours/', {'destination': text}, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return {tour['id'] for tour in response.json()['results']}
+
+    def test_search_ignores_accents_and_case(self):
+        self.assertEqual(self.search('CHORONI'), {self.choroni.pk})
+        self.assertEqual(self.search('merida'), {self.merida.pk})
+
+    def test_quotes_and_operators_are_not_query_syntax(self):
+        self.assertEqual(self.search('"choroni'), {self.choroni.pk})
+        self.assertEqual(self.search("paramo' OR *"), {self.merida.pk})
+
+    def test_index_follows_updates_and_deletes(self):
+        self.merida.title = 'Pico Bolívar'
+        self.merida.save()
+        self.assertEqual(self.search('bolivar'), {self.merida.pk})
+        self.assertEqual(self.search('paramo'), set())
+
+        self.choroni.delete()
+        self.assertEqual(self.search('choroni'), set())
+
+
+class FastListParityTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        operator = CustomUser.objects.create_user(
+            username='operador', email='operador@ventu.com', password='x', role='OPERATOR',
+            first_name='Ana', last_name='Pérez',
+        )
+        plain = create_tour(operator, title='Simple', commission_rate=Decimal('0.15'))
+        PackageImage.objects.create(tour_package=plain, image='tour_packages/a.jpg', is_main_image=True, caption='Playa')
+        create_tour(
+            operator, title='Con variaciones', base_price=Decimal('250.00'),
+            price_variations={'adulto': 250, 'niño': 120},
+            availability_type='SPECIFIC_DATE', departure_date=date.today() + timedelta(days=10),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def rows(self, **params):
+        response = self.client.get('/api/tours/', params, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_fast_rows_match_the_serializer(self):
+        queryset = TourPackage.objects.filter(status='PUBLISHED', is_active=True).order_by('-created_at')
+        renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+        expected = json.loads(renderer.render(TourPackageListSerializer(queryset, many=True).data))
+
+        self.assertEqual(self.rows(), expected)
+        # ?fields= y ?omit= pasan por el serializer
+        all_fields = ','.join(TourPackageListSerializer.Meta.fields)
+        self.assertEqual(self.rows(fields=all_fields), expected)
+        self.assertEqual(
+            self.rows(omit='title,main_image'),
+            [{k: v for k, v in row.items() if k not in ('title', 'main_image')} for row in expected]
+        )
+
+
+class CursorPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        operator = CustomUser.objects.create_user(
+            username='operador', email='operador@ventu.com', password='x', role='OPERATOR'
+        )
+        for i in range(5):
+            create_tour(operator, title=f'Tour {i}')
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, **params):
+        return self.client.get('/api/tours/', {'pagination': 'cursor', 'page_size': 2, **params}, secure=True)
+
+    def test_next_cursor_walks_every_tour_once(self):
+        response = self.get()
+        seen = [tour['id'] for tour in response.json()['results']]
+        while response.json()['next']:
+            response = self.client.get(response.json()['next'], secure=True)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(tour['id'] for tour in response.json()['results'])
+
+        expected = TourPackage.objects.order_by('-created_at', 'id').values_list('id', flat=True)
+        self.assertEqual(seen, list(expected))
+
+    def test_malformed_cursor_is_not_found(self):
+        cursors = ['%%%', ['notadate', 1], [None, 1], ['2026-01-01T00:00:00+00:00', 'x'], [1]]
+        for cursor in cursors:
+            if not isinstance(cursor, str):
+                cursor = base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.get(cursor=cursor).status_code, 404)
+
+
+class DisplayPriceTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        operator = CustomUser.objects.create_user(
+            username='operador', email='operador@ventu.com', password='x', role='OPERATOR'
+        )
+        cls.cheap = create_tour(operator, title='Barato', base_price=Decimal('80.00'))
+        cls.expensive = create_tour(operator, title='Caro', base_price=Decimal('500.00'))
+        # Sin variaciones se muestra final_price; con variaciones, la menor
+        cls.varied = create_tour(
+            operator, title='Variado', base_price=Decimal('400.00'),
+            price_variations={'adulto': 400, 'niño': 150},
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def ids(self, **params):
+        response = self.client.get('/api/tours/', params, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return [tour['id'] for tour in response.json()['results']]
+
+    def test_display_price_uses_the_lowest_variation(self):
+        self.varied.refresh_from_db()
+        self.assertEqual(self.varied.min_display_price, self.varied._apply_commission(150))
+        self.assertEqual(self.varied.max_display_price, self.varied._apply_commission(400))
+
+    def test_price_filters_use_the_display_price(self):
+        self.assertEqual(set(self.ids(max_price=200)), {self.cheap.pk, self.varied.pk})
+        self.assertEqual(set(self.ids(min_price=200)), {self.expensive.pk})
+
+    def test_ordering_by_display_price(self):
+        expected = [self.cheap.pk, self.varied.pk, self.expensive.pk]
+        self.assertEqual(self.ids(ordering='display_price'), expected)
+        self.assertEqual(self.ids(ordering='-display_price'), expected[::-1])
+
+
+@override_settings(TOURS_LIST_ETAG=True)
+class ListValidatorTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.operator = CustomUser.objects.create_user(
+            username='operador', email='operador@ventu.com', password='x', role='OPERATOR'
+        )
+        cls.traveler = CustomUser.objects.create_user(
+            username='viajero', email='viajero@ventu.com', password='x', role='TRAVELER'
+        )
+        cls.tour = create_tour(
+            cls.operator, availability_type='SPECIFIC_DATE',
+            departure_date=date.today() + timedelta(days=10),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_unchanged_list_is_not_modified_without_queries(self):
+        etag = self.client.get('/api/tours/', secure=True)['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/tours/', HTTP_IF_NONE_MATCH=etag, secure=True)
+        self.assertEqual(response.status_code, 304)
+
+    def test_cursor_mode_skips_the_count(self):
+        # Filas + imágenes principales
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/tours/', {'pagination': 'cursor'}, secure=True)
+        self.assertEqual(response.status_code, 200)
+
+    def test_seats_and_reviews_change_the_etag(self):
+        etag = self.client.get('/api/tours/', secure=True)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tour.increment_bookings(2)
+        response = self.client.get('/api/tours/', HTTP_IF_NONE_MATCH=etag, secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['available_slots'], 8)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(
+                tour_package=self.tour, traveler=self.traveler, rating=4,
+                comment='Comentario', is_approved=True,
+            )
+        self.assertEqual(
+            self.client.get('/api/tours/', HTTP_IF_NONE_MATCH=response['ETag'], secure=True).status_code,
+            200
+        )
+
+    def assertEtagChanges(self, change):
+        etag = self.client.get('/api/tours/', secure=True)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        response = self.client.get('/api/tours/', HTTP_IF_NONE_MATCH=etag, secure=True)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results'][0]
+
+    def test_operator_and_tag_renames_change_the_etag(self):
+        tag = Tag.objects.create(name='Playa')
+        self.tour.tags.add(tag)
+
+        self.operator.first_name = 'Nuevo'
+        row = self.assertEtagChanges(self.operator.save)
+        self.assertEqual(row['operator_name'], 'Nuevo')
+
+        tag.name = 'Costa'
+        self.assertEtagChanges(tag.save)
+
+    @override_settings(TOURS_LIST_ETAG=False)
+    def test_no_list_etag_without_a_shared_cache(self):
+        response = self.client.get('/api/tours/', secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+    def test_publish_action_changes_the_detail_validator(self):
+        TourPackage.objects.filter(pk=self.tour.pk).update(status='DRAFT')
+        before = TourPackage.objects.get(pk=self.tour.pk).updated_at
+
+        TourPackageAdmin(TourPackage, AdminSite()).mark_as_published(
+            mock.Mock(), TourPackage.objects.filter(pk=self.tour.pk)
+        )
+
+        self.assertGreater(TourPackage.objects.get(pk=self.tour.pk).updated_at, before)
+
+
+class RatingAggregateTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.operator = CustomUser.objects.create_user(
+            username='operador', email='operador@ventu.com', password='x', role='OPERATOR'
+        )
+        cls.travelers = [
+            CustomUser.objects.create_user(
+                username=f'viajero{i}', email=f'viajero{i}@ventu.com', password='x', role='TRAVELER'
+            )
+            for i in range(3)
+        ]
+        cls.tour = create_tour(cls.operator)
+
+    def review(self, traveler, rating, is_approved=True):
+        return Review.objects.create(
+            tour_package=self.tour, traveler=traveler, rating=rating,
+            comment='Comentario', is_approved=is_approved,
+        )
+
+    def assertAggregates(self, count, total, average):
+        self.tour.refresh_from_db()
+        self.assertEqual(self.tour.rating_count, count)
+        self.assertEqual(self.tour.rating_sum, total)
+        self.assertEqual(self.tour.rating_avg, Decimal(average))
+
+    def test_only_approved_reviews_count(self):
+        self.review(self.travelers[0], 5)
+        self.review(self.travelers[1], 4)
+        self.review(self.travelers[2], 1, is_approved=False)
+
+        self.assertAggregates(2, 9, '4.50')
+
+    def test_update_applies_the_difference(self):
+        review = self.review(self.travelers[0], 5)
+        self.review(self.travelers[1], 3)
+
+        review.rating = 2
+        review.save()
+        self.assertAggregates(2, 5, '2.50')
+
+        review.is_approved = False
+        review.save()
+        self.assertAggregates(1, 3, '3.00')
+
+    def test_delete_removes_the_review(self):
+        review = self.review(self.travelers[0], 5)
+        self.review(self.travelers[1], 3)
+
+        review.delete()
+        self.assertAggregates(1, 3, '3.00')
+
+        Review.objects.all().delete()
+        self.assertAggregates(0, 0, '0.00')
+
+
+class SeatCounterSaveTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.operator = CustomUser.objects.create_user(
+            username='operador', email='operador@ventu.com', password='x', role='OPERATOR'
+        )
+        cls.tour = create_tour(
+            cls.operator, group_size=10, availability_type='SPECIFIC_DATE',
+            departure_date=date.today() + timedelta(days=10),
+        )
+
+    def test_stale_save_keeps_concurrent_reservations(self):
+        stale = TourPackage.objects.get(pk=self.tour.pk)
+        self.assertTrue(TourPackage.objects.get(pk=self.tour.pk).increment_bookings(4))
+
+        stale.title = 'Tour editado'
+        stale.save()
+
+        self.tour.refresh_from_db()
+        self.assertEqual(self.tour.title, 'Tour editado')
+        self.assertEqual(self.tour.current_bookings, 4)
+
+
+class OpenDatesSlotsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.operator = CustomUser.objects.create_user(
+            username='operador', email='operador@ventu.com', password='x', role='OPERATOR'
+        )
+        cls.tour = create_tour(cls.operator, group_size=10)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_tour_wide_counter_is_ignored(self):
+        # Contador heredado de antes de DepartureInventory
+        TourPackage.objects.filter(pk=self.tour.pk).update(current_bookings=10)
+        self.tour.refresh_from_db()
+        self.assertEqual(self.tour.available_slots, 10)
+        self.assertFalse(self.tour.is_full)
+
+        for params in ({}, {'fields': 'id,available_slots'}):
+            response = self.client.get('/api/tours/', params, secure=True)
+            self.assertEqual(response.json()['results'][0]['available_slots'], 10)
+
+    def test_group_size_change_updates_future_departures(self):
+        travel_date = self.tour.available_from + timedelta(days=2)
+        self.assertTrue(self.tour.reserve_seats(6, travel_date))
+        other = self.tour.available_from + timedelta(days=3)
+        self.assertTrue(self.tour.reserve_seats(1, other))
+        past = DepartureInventory.objects.create(
+            tour_package=self.tour, travel_date=date.today() - timedelta(days=1), capacity=10, booked=2
+        )
+
+        self.tour.group_size = 4
+        self.tour.save()
+
+        capacities = dict(self.tour.departures.values_list('travel_date', 'capacity'))
+        self.assertEqual(capacities[travel_date], 6)
+        self.assertEqual(capacities[other], 4)
+        self.assertEqual(capacities[past.travel_date], 10)
+        self.assertEqual(self.tour.available_slots_on(travel_date), 0)
+
+        self.tour.group_size = 12
+        self.tour.save()
+        self.assertEqual(self.tour.available_slots_on(travel_date), 6)
+
+
+class AvailabilityTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.operator = CustomUser.objects.create_user(
+            username='operador', email='operador@ventu.com', password='x', role='OPERATOR'
+        )
+        cls.tour = create_tour(cls.operator, group_size=10)
+
+    def setUp(self):
+        cache.clear()
+
+    def availability(self, month):
+        return self.client.get(f'/api/tours/{self.tour.pk}/availability/', {'month': month}, secure=True)
+
+    def test_days_come_from_departure_inventory(self):
+        booked_day = self.tour.available_from + timedelta(days=1)
+        DepartureInventory.objects.create(
+            tour_package=self.tour, travel_date=booked_day, capacity=10, booked=7
+        )
+
+        response = self.availability(booked_day.strftime('%Y-%m'))
+
+        self.assertEqual(response.status_code, 200)
+        days = {day['date']: day for day in response.json()['days']}
+        self.assertNotIn(date.today().isoformat(), days)
+        self.assertEqual(days[booked_day.isoformat()]['available_slots'], 3)
+        self.assertEqual(days[booked_day.isoformat()]['booked'], 7)
+        others = [day for key, day in days.items() if key != booked_day.isoformat()]
+        self.assertTrue(all(day['available_slots'] == 10 for day in others))
+
+    def test_reservations_invalidate_the_cached_month(self):
+        travel_date = self.tour.available_from + timedelta(days=1)
+        month = travel_date.strftime('%Y-%m')
+        self.availability(month)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            DepartureInventory.objects.create(
+                tour_package=self.tour, travel_date=travel_date, capacity=10, booked=10
+            )
+
+        days = {day['date']: day for day in self.availability(month).json()['days']}
+        self.assertFalse(days[travel_date.isoformat()]['is_available'])
+
+    def test_manual_seat_changes_invalidate_the_cached_month(self):
+        tour = create_tour(
+            self.operator, title='Salida', group_size=10, availability_type='SPECIFIC_DATE',
+            departure_date=date.today() + timedelta(days=10),
+        )
+        url = f'/api/tours/{tour.pk}/availability/'
+        month = tour.departure_date.strftime('%Y-%m')
+        self.client.get(url, {'month': month}, secure=True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tour.increment_bookings(4)
+
+        day, = self.client.get(url, {'month': month}, secure=True).json()['days']
+        self.assertEqual(day['available_slots'], 6)
+
+    def test_bad_month_is_rejected(self):
+        for month in ('2026-13', 'marzo', '2026'):
+            with self.subTest(month=month):
+                response = self.availability(month)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+
+class SeatCounterContentionTests(TransactionTestCase):
+    """increment_bookings con varios hilos (una conexión cada uno) sobre el mismo tour"""
+
+    def setUp(self):
+        operator = CustomUser.objects.create_user(
+            username='operador', email='operador@ventu.com', password='x', role='OPERATOR'
+        )
+        self.tour = create_tour(operator, group_size=10)
+
+    def run_in_threads(self, workers, target):
+        barrier = threading.Barrier(workers)
+        results = []
+        lock = threading.Lock()
+
+        def worker():
+            try:
+                tour = TourPackage.objects.get(pk=self.tour.pk)
+                barrier.wait()
+                result = target(tour)
+                with lock:
+                    results.append(result)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_concurrent_increments_never_oversell(self):
+        results = self.run_in_threads(8, lambda tour: tour.increment_bookings(3))
+
+        self.tour.refresh_from_db()
+        self.assertEqual(results.count(True), 3)
+        self.assertEqual(self.tour.current_bookings, 9)
+
+    def test_concurrent_decrements_never_go_negative(self):
+        TourPackage.objects.filter(pk=self.tour.pk).update(current_bookings=4)
+
+        results = self.run_in_threads(6, lambda tour: tour.decrement_bookings(1))
+
+        self.tour.refresh_from_db()
+        self.assertEqual(results.count(True), 4)
+        self.assertEqual(self.tour.current_bookings, 0)
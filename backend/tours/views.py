@@ -2,17 +2,25 @@ from django.conf import settings
 from rest_framework import viewsets, permissions, status, serializers
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.db.models import Q, Count, Avg, Sum
+from django.db.models import Q, Count, Sum, OuterRef, Subquery
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import SearchFilter
+from django.utils import timezone
+from datetime import date
+from decimal import Decimal
 import logging
 
-from .models import TourPackage, Tag, Review, PackageImage, IncludedItem
+from .models import (
+    TourPackage, Tag, Review, PackageImage, IncludedItem, Environment,
+    main_image_prefetch, recent_reviews_prefetch
+)
 from .serializers import (
     TourPackageListSerializer, 
+    TourPackageListRows,
     TourPackageDetailSerializer,
     TourPackageCreateSerializer,
     TagSerializer, 
@@ -23,21 +31,63 @@ from .serializers import (
     TourPackageStatsSerializer
 )
 from .permissions import IsOwnerOrReadOnly
-from .filters import TourPackageFilter
+from .filters import TourPackageFilter, TourOrderingFilter
+from . import cache as catalog_cache
+from . import services
+from . import bulk
 from users.serializers import UserProfileSerializer 
+from bookings.models import ACTIVE_STATUSES, BookingDailyRollup
+from ventu_api.pagination import CursorPaginationMixin, KeysetPagination
+from ventu_api import conditional, exports
 
 logger = logging.getLogger(__name__)
 
-class TourPackageViewSet(viewsets.ModelViewSet):
+class TourPackageViewSet(CursorPaginationMixin, viewsets.ModelViewSet):
     """
     Endpoint principal para tours - Maneja todos los paquetes con filtros y permisos
+    
+    list y my_packages aceptan ?pagination=cursor para paginar por cursor
+    (sin COUNT ni OFFSET) en lugar de por número de página.
     """
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
     filterset_class = TourPackageFilter
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, SearchFilter, TourOrderingFilter]
     search_fields = ['title', 'description', 'specific_destination', 'tags__name']
-    ordering_fields = ['base_price', 'duration_days', 'created_at', 'final_price']
+    ordering_fields = [
+        'base_price', 'duration_days', 'created_at', 'final_price',
+        'rating_avg', 'rating_count',
+        'display_price', 'min_display_price', 'max_display_price'
+    ]
     ordering = ['-created_at']
+    # Límite propio de algunas acciones públicas: @action(..., throttle_scope=...)
+    # (ver ventu_api.throttling.ScopedTokenBucketThrottle)
+    throttle_scope = None
+    cursor_ordering = {
+        'list': ('-created_at', 'id'),
+        'my_packages': ('-created_at', 'id'),
+    }
+
+    # Columnas que lee cada campo de TourPackageListSerializer; los que no
+    # aparecen usan su propia columna. id y created_at siempre (orden y cursor).
+    list_field_columns = {
+        'display_price': ('min_display_price',),
+        'has_price_variations': ('price_variations_with_commission',),
+        'available_slots': ('availability_type', 'group_size', 'current_bookings'),
+        'average_rating': ('rating_avg',),
+        'operator_name': ('operator', 'operator__first_name', 'operator__last_name'),
+        'operator_username': ('operator', 'operator__username'),
+        'main_image': (),
+        'tags': (),
+    }
+
+    # Precarga que necesita cada relación de TourPackageDetailSerializer
+    detail_field_prefetches = {
+        'tags': lambda: 'tags',
+        'images': lambda: 'images',
+        'reviews': recent_reviews_prefetch,
+        'what_is_included': lambda: 'what_is_included',
+        'what_is_not_included': lambda: 'what_is_not_included',
+    }
 
     def get_serializer_class(self):
         """Usa diferentes serializers según la acción"""
@@ -56,17 +106,8 @@ class TourPackageViewSet(viewsets.ModelViewSet):
         """
         user = self.request.user
         
-        # Base queryset optimizado
-        queryset = TourPackage.objects.select_related(
-            'operator'
-        ).prefetch_related(
-            'tags', 
-            'images', 
-            'reviews',
-            'reviews__traveler',
-            'what_is_included',
-            'what_is_not_included'
-        )
+        # Plan de consulta según la acción
+        queryset = self.get_query_plan()
 
         # Si es operador y está viendo sus propios paquetes, mostrar todos
         if user.is_authenticated and user.role == 'OPERATOR':
@@ -83,6 +124,107 @@ class TourPackageViewSet(viewsets.ModelViewSet):
 
         return queryset
 
+    def get_query_plan(self):
+        """
+        Queryset base con solo las columnas y relaciones que usa cada acción:
+        - list / my_packages: columnas del listado, operador e imagen principal
+        - retrieve: las relaciones del serializer de detalle
+        - escritura y acciones puntuales: sin precargas (una sola fila)
+        En list/my_packages/retrieve se omite lo que ?fields= / ?omit= excluyen.
+        """
+        if self.action in ('list', 'my_packages'):
+            return self._list_query_plan()
+
+        if self.action == 'retrieve':
+            return self._detail_query_plan()
+
+        return TourPackage.objects.select_related('operator')
+
+    def _list_query_plan(self):
+        selected = TourPackageListSerializer.selected_fields(self.request)
+
+        columns = {'id', 'created_at'}
+        for name in selected:
+            columns.update(self.list_field_columns.get(name, (name,)))
+
+        queryset = TourPackage.objects.all()
+        if 'operator' in columns:
+            queryset = queryset.select_related('operator')
+        if 'main_image' in selected:
+            queryset = queryset.prefetch_related(main_image_prefetch())
+        if 'tags' in selected:
+            queryset = queryset.prefetch_related('tags')
+        return queryset.only(*columns)
+
+    def _detail_query_plan(self):
+        selected = TourPackageDetailSerializer.selected_fields(self.request)
+
+        queryset = TourPackage.objects.all()
+        if selected & {'operator_name', 'operator_username'}:
+            queryset = queryset.select_related('operator')
+        prefetches = [
+            build() for name, build in self.detail_field_prefetches.items()
+            if name in selected
+        ]
+        return queryset.prefetch_related(*prefetches)
+
+    def list(self, request, *args, **kwargs):
+        """
+        Listado con ETag: el validador sale de las versiones de caché del
+        catálogo (sin consultas), así que si nada cambió desde la versión del
+        cliente se responde 304 sin tocar la base de datos. Solo con una caché
+        compartida entre workers (settings.TOURS_LIST_ETAG).
+        Sin ?fields=/?omit=/?expand= las filas se arman con TourPackageListRows.
+        """
+        if not settings.TOURS_LIST_ETAG:
+            return self._list_response(request, *args, **kwargs)
+
+        # El resultado depende del usuario (los operadores ven sus paquetes)
+        etag = conditional.compute_etag(
+            request, 'list', request.user.pk,
+            catalog_cache.get_version(catalog_cache.CATALOG),
+            catalog_cache.get_version(catalog_cache.LISTING),
+        )
+        response = conditional.not_modified(request, etag)
+        if response is None:
+            response = self._list_response(request, *args, **kwargs)
+        return conditional.set_validators(response, etag, vary=['Authorization', 'Cookie'])
+
+    def _list_response(self, request, *args, **kwargs):
+        if TourPackageListRows.applies_to(request):
+            return self._fast_list()
+        return super().list(request, *args, **kwargs)
+
+    def _fast_list(self):
+        """list sin ModelSerializer: mismas filas vía TourPackageListRows"""
+        rows = TourPackageListRows()
+        queryset = rows.values(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(rows.build(page))
+        return Response(rows.build(queryset))
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Detalle con ETag/Last-Modified basados en updated_at, que también se
+        actualiza al cambiar reseñas o imágenes (ver tours.signals).
+        """
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        last_updated = self.get_queryset().filter(
+            **{self.lookup_field: kwargs[lookup_url_kwarg]}
+        ).values_list('updated_at', flat=True).first()
+
+        if last_updated is None:
+            # No existe o no es visible: retrieve devuelve el 404
+            return super().retrieve(request, *args, **kwargs)
+
+        etag = conditional.compute_etag(request, 'detail', kwargs[lookup_url_kwarg], last_updated)
+        response = conditional.not_modified(request, etag, last_updated)
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+        return conditional.set_validators(response, etag, last_updated)
+
     def perform_create(self, serializer):
         """Crea un paquete y lo marca como PUBLISHED automáticamente"""
         if not hasattr(self.request.user, 'role') or self.request.user.role != 'OPERATOR':
@@ -184,6 +326,11 @@ class TourPackageViewSet(viewsets.ModelViewSet):
     def increment_bookings(self, request, pk=None):
         """Incrementar reservas de forma segura"""
         tour_package = self.get_object()
+        if tour_package.availability_type == TourPackage.AvailabilityType.OPEN_DATES:
+            return Response(
+                {'error': 'Los tours de fechas abiertas llevan los cupos por fecha (reservas)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         count = request.data.get('count', 1)
         
         try:
@@ -217,6 +364,11 @@ class TourPackageViewSet(viewsets.ModelViewSet):
     def decrement_bookings(self, request, pk=None):
         """Decrementar reservas de forma segura"""
         tour_package = self.get_object()
+        if tour_package.availability_type == TourPackage.AvailabilityType.OPEN_DATES:
+            return Response(
+                {'error': 'Los tours de fechas abiertas llevan los cupos por fecha (reservas)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         count = request.data.get('count', 1)
         
         try:
@@ -246,6 +398,51 @@ class TourPackageViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+    @action(detail=True, methods=['get'])
+    def reviews(self, request, pk=None):
+        """Reseñas aprobadas del tour, paginadas por cursor (más recientes primero)"""
+        tour_package = self.get_object()
+        reviews = Review.objects.filter(
+            tour_package=tour_package,
+            is_approved=True
+        ).select_related('traveler')
+
+        paginator = KeysetPagination(('-created_at', '-id'))
+        page = paginator.paginate_queryset(reviews, request, view=self)
+        serializer = ReviewSerializer(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def availability(self, request, pk=None):
+        """
+        Cupos por día de un mes: /api/tours/{id}/availability/?month=YYYY-MM
+        (por defecto el mes actual). Cacheado por tour hasta que cambie una
+        de sus reservas o el propio tour (ver bookings.signals y tours.signals).
+        """
+        today = timezone.localdate()
+        month = request.query_params.get('month')
+        if month:
+            try:
+                year, month_number = (int(part) for part in month.split('-'))
+                date(year, month_number, 1)
+            except ValueError:
+                return Response(
+                    {'error': 'El parámetro month debe tener el formato YYYY-MM'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        else:
+            year, month_number = today.year, today.month
+
+        tour_package = self.get_object()
+        data = catalog_cache.get_or_build(
+            catalog_cache.availability_scope(tour_package.pk),
+            'availability',
+            lambda: services.month_availability(tour_package, year, month_number, today),
+            # Con la fecha de hoy: los días pasados salen del calendario a diario
+            key_parts=(year, month_number, today)
+        )
+        return Response(data)
+
     @action(detail=False, methods=['get'])
     def my_packages(self, request):
         """Paquetes del operador actual (incluyendo borradores)"""
@@ -256,138 +453,204 @@ class TourPackageViewSet(viewsets.ModelViewSet):
         page = self.paginate_queryset(packages)
         
         if page is not None:
-            serializer = TourPackageListSerializer(page, many=True)
+            serializer = TourPackageListSerializer(page, many=True, context=self.get_serializer_context())
             return self.get_paginated_response(serializer.data)
         
-        serializer = TourPackageListSerializer(packages, many=True)
+        serializer = TourPackageListSerializer(packages, many=True, context=self.get_serializer_context())
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_packages(self, request):
+        """
+        Importación masiva de paquetes del operador actual desde CSV o JSONL
+        (campo `file`). Opcionales: file_format (por defecto según la
+        extensión) y dry_run=true para solo validar.
+        """
+        if not request.user.is_authenticated or request.user.role != 'OPERATOR':
+            raise PermissionDenied("Solo los operadores pueden importar paquetes")
+
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response(
+                {'error': 'Adjunte el archivo en el campo file'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        file_format = (
+            request.data.get('file_format') or upload.name.rsplit('.', 1)[-1]
+        ).lower()
+        if file_format not in exports.FILE_FORMATS:
+            return Response(
+                {'error': 'Formato no soportado. Use csv o jsonl'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        dry_run = str(request.data.get('dry_run', '')).lower() in ('1', 'true')
+        result = bulk.TourImporter(request.user, dry_run=dry_run).run(
+            bulk.read_rows(upload, file_format)
+        )
+        result['dry_run'] = dry_run
+
+        if result['errors'] and not result['created']:
+            response_status = status.HTTP_400_BAD_REQUEST
+        elif result['created'] and not dry_run:
+            response_status = status.HTTP_201_CREATED
+        else:
+            response_status = status.HTTP_200_OK
+        return Response(result, status=response_status)
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export_packages(self, request):
+        """Exporta en streaming los paquetes del operador (?file_format=csv|jsonl)"""
+        if not request.user.is_authenticated or request.user.role != 'OPERATOR':
+            raise PermissionDenied("Solo los operadores pueden exportar sus paquetes")
+
+        file_format = exports.get_file_format(request)
+        if file_format is None:
+            return Response(
+                {'error': 'Formato no soportado. Use csv o jsonl'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        rows = bulk.export_rows(TourPackage.objects.filter(operator=request.user))
+        return exports.streaming_export(rows, bulk.EXPORT_COLUMNS, file_format, 'paquetes')
+
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Estadísticas de paquetes"""
         if not request.user.is_authenticated or request.user.role != 'OPERATOR':
             raise PermissionDenied("Solo los operadores pueden ver estadísticas")
         
-        user_packages = TourPackage.objects.filter(operator=request.user)
+        # Conteos y valoraciones en una sola consulta: rating_sum/rating_count
+        # son los agregados desnormalizados de las reseñas aprobadas
+        packages = TourPackage.objects.filter(operator=request.user).order_by().aggregate(
+            total_packages=Count('pk'),
+            published_packages=Count('pk', filter=Q(status='PUBLISHED')),
+            draft_packages=Count('pk', filter=Q(status='DRAFT')),
+            active_packages=Count('pk', filter=Q(is_active=True)),
+            rating_sum=Sum('rating_sum'),
+            rating_count=Sum('rating_count'),
+        )
+        # Reservas e ingresos desde los resúmenes diarios, como /api/bookings/stats/
+        bookings = BookingDailyRollup.objects.filter(operator=request.user).order_by().aggregate(
+            total_bookings=Sum('bookings_count', filter=Q(status__in=ACTIVE_STATUSES)),
+            total_revenue=Sum('operator_amount', filter=Q(status__in=['CONFIRMED', 'COMPLETED'])),
+        )
+        
+        rating_count = packages['rating_count'] or 0
+        average_rating = (
+            Decimal(packages['rating_sum']) / rating_count if rating_count else Decimal('0.00')
+        )
         
         stats = {
-            'total_packages': user_packages.count(),
-            'published_packages': user_packages.filter(status='PUBLISHED').count(),
-            'draft_packages': user_packages.filter(status='DRAFT').count(),
-            'active_packages': user_packages.filter(is_active=True).count(),
-            'total_revenue': user_packages.aggregate(
-                total=Sum('base_price')
-            )['total'] or 0,
-            'average_rating': user_packages.aggregate(
-                avg_rating=Avg('reviews__rating')
-            )['avg_rating'] or 0,
-            'total_bookings': user_packages.aggregate(
-                total=Sum('current_bookings')
-            )['total'] or 0,
+            'total_packages': packages['total_packages'],
+            'published_packages': packages['published_packages'],
+            'draft_packages': packages['draft_packages'],
+            'active_packages': packages['active_packages'],
+            'total_revenue': bookings['total_revenue'] or Decimal('0.00'),
+            'average_rating': average_rating,
+            'total_bookings': bookings['total_bookings'] or 0,
         }
         
         serializer = TourPackageStatsSerializer(stats)
         return Response(serializer.data)
 
-    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
-
+    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny], throttle_scope='public_stats')
     def destinations_stats(self, request):
         """Obtiene estadísticas de destinos con conteo de tours y una imagen representativa"""
-        # Solo contar tours publicados y activos
-        published_tours = TourPackage.objects.filter(
-            status='PUBLISHED',
-            is_active=True
-        ).select_related('operator').prefetch_related('images')
+        # Cacheado hasta que cambie el catálogo (ver tours.signals)
+        results = catalog_cache.get_or_build(
+            catalog_cache.CATALOG,
+            'destinations_stats',
+            lambda: self._build_destinations_stats(request),
+            key_parts=(request.build_absolute_uri('/'),)
+        )
+        return Response(results)
 
-        # Agrupar por estado de destino y contar
-        destinations_data = published_tours.values(
-            'state_destination'
-        ).annotate(
-            count=Count('id')
-        ).order_by('-count')
+    def _build_destinations_stats(self, request):
+        # Una sola consulta: conteo por destino + imagen representativa (subquery)
+        destinations_data = self._published_tours_grouped_by('state_destination')
 
-        # Enriquecer con imagen representativa de cada destino
         results = []
         for dest in destinations_data:
             state = dest['state_destination']
             count = dest['count']
 
-            # Obtener un tour de este destino que tenga imagen
-            sample_tour = published_tours.filter(
-                state_destination=state
-            ).prefetch_related('images').first()
-
-            image_url = None
-            if sample_tour and sample_tour.images.exists():
-                main_image = sample_tour.images.filter(is_main_image=True).first()
-                if not main_image:
-                    main_image = sample_tour.images.first()
-                if main_image and main_image.image:
-                    image_url = request.build_absolute_uri(main_image.image.url)
-
             results.append({
                 'name': state,
                 'state': state,
                 'tours': count,
                 'count': count,
-                'image': image_url
+                'image': self._absolute_image_url(request, dest['image'])
             })
-        return Response(results)
-    
+        return results
 
-    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny])
+    @action(detail=False, methods=['get'], permission_classes=[permissions.AllowAny], throttle_scope='public_stats')
     def experiences_stats(self, request):
         """Obtiene estadísticas de experiencias con conteo de tours y una imagen representativa"""
-        # Solo contar tours publicados y activos
-        published_tours = TourPackage.objects.filter(
-            status='PUBLISHED',
-            is_active=True
-        ).select_related('operator').prefetch_related('images')
+        results = catalog_cache.get_or_build(
+            catalog_cache.CATALOG,
+            'experiences_stats',
+            lambda: self._build_experiences_stats(request),
+            key_parts=(request.build_absolute_uri('/'),)
+        )
+        return Response(results)
 
-        # Agrupar por environment y contar
-        experiences_data = published_tours.values(
-            'environment'
-        ).annotate(
-            count=Count('id')
-        ).order_by('-count')
+    def _build_experiences_stats(self, request):
+        # Una sola consulta: conteo por environment + imagen representativa (subquery)
+        experiences_data = self._published_tours_grouped_by('environment')
 
-        # Enriquecer con imagen representativa y label con emoji
+        # Enriquecer con label con emoji
         results = []
         for exp in experiences_data:
             environment_code = exp['environment']
             count = exp['count']
 
             # Obtener el label con emoji desde el modelo
-            from .models import Environment
             try:
                 environment_choice = Environment[environment_code]
                 label = environment_choice.label
             except (KeyError, AttributeError):
                 label = environment_code
 
-            # Obtener un tour de esta categoría que tenga imagen
-            sample_tour = published_tours.filter(
-                environment=environment_code
-            ).prefetch_related('images').first()
-
-            image_url = None
-            if sample_tour and sample_tour.images.exists():
-                main_image = sample_tour.images.filter(is_main_image=True).first()
-                if not main_image:
-                    main_image = sample_tour.images.first()
-                if main_image and main_image.image:
-                    image_url = request.build_absolute_uri(main_image.image.url)
-
             results.append({
                 'code': environment_code,
                 'label': label,
                 'name': label,  # Alias para compatibilidad
                 'count': count,
                 'tours': count,  # Alias para compatibilidad
-                'image': image_url
+                'image': self._absolute_image_url(request, exp['image'])
             })
 
-        return Response(results)
+        return results
+
+    def _published_tours_grouped_by(self, field):
+        """
+        Cuenta los tours publicados y activos agrupados por `field` y elige
+        en SQL una imagen representativa por grupo: primero las imágenes
+        principales, luego la del tour más reciente y luego según `order`.
+        """
+        representative_image = PackageImage.objects.filter(
+            tour_package__status='PUBLISHED',
+            tour_package__is_active=True,
+            **{f'tour_package__{field}': OuterRef(field)}
+        ).order_by(
+            '-is_main_image', '-tour_package__created_at', 'order', 'id'
+        ).values('image')[:1]
+
+        return TourPackage.objects.filter(
+            status='PUBLISHED',
+            is_active=True
+        ).values(field).annotate(
+            count=Count('id'),
+            image=Subquery(representative_image)
+        ).order_by('-count')
+
+    def _absolute_image_url(self, request, image_name):
+        if not image_name:
+            return None
+        storage = PackageImage._meta.get_field('image').storage
+        return request.build_absolute_uri(storage.url(image_name))
  
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
@@ -398,6 +661,7 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
 class ReviewViewSet(viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    filterset_fields = ['tour_package', 'is_approved']
     
     def get_queryset(self):
         """Optimiza consultas de reseñas"""
@@ -447,6 +711,7 @@ class PackageImageViewSet(viewsets.ModelViewSet):
 # Vista de diagnóstico 
 class TourDiagnosticView(APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_scope = 'diagnostic'
     
     def get(self, request):
         tours = TourPackage.objects.select_related('operator').all()[:10]  # Limitar a 10
@@ -1,12 +1,13 @@
 from rest_framework import generics, permissions, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.db.models import Avg, Count, Q
+from django.db.models import Avg, Count, Q, Sum
 from django.shortcuts import get_object_or_404
 from .models import CustomUser
 from .serializers import UserProfileSerializer
-from tours.models import TourPackage, Review
+from tours.models import TourPackage, Review, main_image_prefetch
 from tours.serializers import TourPackageListSerializer
+from bookings.models import ACTIVE_STATUSES, BookingDailyRollup
 
 
 class CurrentUserView(APIView):
@@ -84,13 +85,16 @@ class OperatorDashboardView(APIView):
             is_approved=True
         ).aggregate(avg=Avg('rating'))['avg'] or 0
         
-        # Reservas totales
-        total_bookings = tours.aggregate(
-            total=Count('current_bookings')
-        )['total'] or 0
+        # Reservas vigentes o ya viajadas, desde los resúmenes diarios sin
+        # recorrer las reservas
+        total_bookings = BookingDailyRollup.objects.filter(
+            operator=user, status__in=ACTIVE_STATUSES
+        ).aggregate(total=Sum('bookings_count'))['total'] or 0
         
         # Tours recientes
-        recent_tours = tours.order_by('-created_at')[:5]
+        recent_tours = tours.select_related('operator').prefetch_related(
+            main_image_prefetch()
+        ).order_by('-created_at')[:5]
         recent_tours_data = TourPackageListSerializer(recent_tours, many=True).data
         
         dashboard_data = {
@@ -132,7 +136,7 @@ class OperatorPublicProfileView(APIView):
         all_tours = TourPackage.objects.filter(
             operator=operator
         ).select_related('operator').prefetch_related(
-            'images', 'tags', 'reviews'
+            main_image_prefetch(), 'tags'
         )
         
         # Tours activos (publicados y activos)
@@ -158,6 +162,11 @@ class OperatorPublicProfileView(APIView):
             is_approved=True
         ).aggregate(avg=Avg('rating'))['avg'] or 0
         
+        # Viajeros de reservas vigentes o ya viajadas (resúmenes diarios)
+        total_travelers = BookingDailyRollup.objects.filter(
+            operator=operator, status__in=ACTIVE_STATUSES
+        ).aggregate(total=Sum('people'))['total'] or 0
+        
         # Reviews más recientes
         recent_reviews = Review.objects.filter(
             tour_package__operator=operator,
@@ -214,7 +223,7 @@ class OperatorPublicProfileView(APIView):
                 'total_tours': all_tours.count(),
                 'total_reviews': total_reviews,
                 'average_rating': round(average_rating, 1),
-                'total_travelers': sum(tour.current_bookings for tour in all_tours),
+                'total_travelers': total_travelers,
             },
             'active_tours': active_tours_data,
             'past_tours': inactive_tours_data,
@@ -0,0 +1,38 @@
+"""
+Soporte de GET condicional (ETag / Last-Modified) para vistas DRF.
+
+La vista calcula marcadores baratos (p. ej. updated_at y un conteo) con una
+consulta pequeña; si el cliente ya tiene esa versión se responde 304 sin
+ejecutar el serializer ni los prefetch.
+"""
+
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def compute_etag(request, *parts):
+    """ETag débil a partir de los marcadores y del query string (filtros, página, etc.)"""
+    raw = '|'.join(str(part) for part in parts) + '?' + request.META.get('QUERY_STRING', '')
+    return 'W/' + quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def not_modified(request, etag, last_modified=None):
+    """Devuelve un HttpResponseNotModified si la versión del cliente sigue vigente"""
+    return get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+
+
+def set_validators(response, etag, last_modified=None, vary=()):
+    if response.status_code != 200:
+        return response
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    if vary:
+        patch_vary_headers(response, vary)
+    return response
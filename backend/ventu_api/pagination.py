@@ -0,0 +1,169 @@
+"""
+Paginación por cursor (keyset) para listados grandes.
+
+A diferencia de PageNumberPagination no ejecuta COUNT(*) ni usa OFFSET:
+cada página continúa desde los valores de ordenamiento de la última fila
+de la página anterior, así que el costo no crece al avanzar.
+"""
+
+import base64
+import json
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación keyset sobre un orden fijo, p. ej. ('-created_at', 'id').
+    El último campo debe ser único (normalmente el id) para que los
+    cursores sean estables aunque haya empates en los anteriores.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Cursor inválido'
+
+    def __init__(self, ordering, page_size=None):
+        self.ordering = tuple(ordering)
+        self.default_page_size = page_size or settings.REST_FRAMEWORK.get('PAGE_SIZE', 20)
+        self.next_position = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            position = self._clean_position(queryset.model, position)
+            queryset = queryset.filter(self._after(position))
+
+        # Una fila extra indica si hay página siguiente, sin COUNT(*)
+        rows = list(queryset[:self.page_size + 1])
+        page = rows[:self.page_size]
+
+        self.next_position = None
+        if len(rows) > self.page_size:
+            self.next_position = self._position(page[-1])
+        return page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.default_page_size
+        if page_size <= 0:
+            return self.default_page_size
+        return min(page_size, self.max_page_size)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    # ============ CURSORES ============
+
+    def encode_cursor(self, position):
+        payload = json.dumps(position, separators=(',', ':'), default=_encode_value)
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padding = '=' * (-len(encoded) % 4)
+            position = json.loads(base64.urlsafe_b64decode(encoded + padding))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def _clean_position(self, model, position):
+        """Convierte cada valor del cursor al tipo de su campo; 404 si no es válido"""
+        cleaned = []
+        for (name, _), value in zip(self._fields(), position):
+            if value is None:
+                raise NotFound(self.invalid_cursor_message)
+            try:
+                cleaned.append(model._meta.get_field(name).to_python(value))
+            except (FieldDoesNotExist, ValidationError, ValueError, TypeError):
+                raise NotFound(self.invalid_cursor_message)
+        return cleaned
+
+    def _fields(self):
+        return [(field.lstrip('-'), field.startswith('-')) for field in self.ordering]
+
+    def _position(self, row):
+        if isinstance(row, dict):
+            return [row[name] for name, _ in self._fields()]
+        return [getattr(row, name) for name, _ in self._fields()]
+
+    def _after(self, position):
+        """
+        Filas posteriores a `position` en el orden dado:
+        (a > x) OR (a = x AND b > y) OR ...  respetando cada dirección.
+        """
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(self._fields(), position):
+            lookup = 'lt' if descending else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+
+
+def _encode_value(value):
+    if hasattr(value, 'isoformat'):
+        # isoformat conserva los microsegundos (DjangoJSONEncoder los trunca)
+        return value.isoformat()
+    return str(value)
+
+
+class CursorPaginationMixin:
+    """
+    Mixin para ViewSets: activa KeysetPagination cuando el cliente envía
+    ?pagination=cursor (o un ?cursor=) en las acciones de `cursor_ordering`.
+    Sin esos parámetros se mantiene la paginación por páginas por defecto.
+    """
+    cursor_ordering = {}
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            ordering = self.cursor_ordering.get(self.action)
+            if ordering and self.wants_cursor_pagination():
+                self._paginator = KeysetPagination(ordering)
+                return self._paginator
+        return super().paginator
+
+    def wants_cursor_pagination(self):
+        params = self.request.query_params
+        return (
+            params.get('pagination') == 'cursor'
+            or KeysetPagination.cursor_query_param in params
+        )
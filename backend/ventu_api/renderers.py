@@ -0,0 +1,77 @@
+"""
+Renderer y parser JSON basados en orjson (opcional).
+
+Producen el mismo JSON que los de DRF: Decimal como número, fechas en
+ISO 8601 (UTC con 'Z') y UUID como texto. Los tipos que orjson no maneja
+igual que DRF se delegan al encoder de DRF, y ante cualquier error, o si
+orjson no está instalado, se usa la implementación estándar.
+"""
+
+import io
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.parsers import JSONParser
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Fechas por el encoder de DRF (termina en 'Z' para UTC, como JSONRenderer)
+ORJSON_OPTIONS = (
+    orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+    if orjson else 0
+)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer con orjson. Las respuestas con indentación (Accept:
+    application/json; indent=4) o con COMPACT_JSON/UNICODE_JSON desactivados
+    se siguen generando con json.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if not self._can_use_orjson(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=JSONEncoder().default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # Enteros de más de 64 bits u otros valores que orjson no acepta
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Igual que JSONRenderer: U+2028/U+2029 son válidos en JSON pero no en JavaScript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+    def _can_use_orjson(self, accepted_media_type, renderer_context):
+        return (
+            orjson is not None
+            and self.compact
+            and not self.ensure_ascii
+            and not self.get_indent(accepted_media_type, renderer_context)
+        )
+
+
+class ORJSONParser(JSONParser):
+    """
+    JSONParser con orjson; si orjson rechaza el cuerpo se reintenta con json.
+    A diferencia de json, los enteros de más de 64 bits llegan como float.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        try:
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            # Otra codificación, enteros enormes...: mismo resultado y errores que DRF
+            return super().parse(io.BytesIO(body), media_type, parser_context)
@@ -0,0 +1,63 @@
+"""
+Utilidades compartidas para serializers de la API.
+"""
+
+from rest_framework import permissions
+
+
+def _param_set(request, name):
+    value = request.query_params.get(name, '')
+    return {item.strip() for item in value.split(',') if item.strip()}
+
+
+class SparseFieldsetMixin:
+    """
+    Permite al cliente elegir los campos de la respuesta en lecturas:
+
+    - ?fields=id,title   solo esos campos
+    - ?omit=description  todos menos esos
+    - ?expand=tags       agrega campos opcionales de `expandable_fields`
+
+    Los campos no pedidos se eliminan antes de serializar, así que sus
+    SerializerMethodField no se ejecutan. Las vistas usan selected_fields()
+    para podar también select_related/prefetch_related.
+
+    Solo aplica cuando el request llega en el contexto (serializer raíz de
+    la vista); los serializers anidados sin contexto no se modifican.
+    """
+    # nombre -> callable que construye el campo, p. ej. lambda: TagSerializer(many=True, read_only=True)
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if not self.applies_to(request):
+            return
+
+        selected = self.selected_fields(request)
+        for name in list(self.fields):
+            if name not in selected:
+                self.fields.pop(name)
+        for name, build in self.expandable_fields.items():
+            if name in selected:
+                self.fields[name] = build()
+
+    @classmethod
+    def applies_to(cls, request):
+        return request is not None and request.method in permissions.SAFE_METHODS
+
+    @classmethod
+    def selected_fields(cls, request):
+        """Nombres de los campos que tendrá la respuesta para este request"""
+        names = list(cls.Meta.fields)
+        if not cls.applies_to(request):
+            return set(names)
+
+        fields = _param_set(request, 'fields')
+        omit = _param_set(request, 'omit')
+        expand = _param_set(request, 'expand') & set(cls.expandable_fields)
+
+        if fields:
+            names = [name for name in names if name in fields]
+        names.extend(name for name in cls.expandable_fields if name in expand)
+        return {name for name in names if name not in omit}
@@ -155,6 +155,95 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20,
 }
 
+# JSON con orjson si está instalado (ventu_api/renderers.py); si no, los de DRF
+try:
+    import orjson  # noqa: F401
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = (
+        'ventu_api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    )
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'] = (
+        'ventu_api.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    )
+except ImportError:
+    pass
+
+# ==============================================================================
+# Cache
+# ==============================================================================
+# locmem por defecto (una caché por proceso). En producción con varios
+# workers conviene una caché compartida, p. ej.:
+#   CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+#   CACHE_LOCATION=redis://localhost:6379/1
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'ventu-cache'),
+    }
+}
+
+# ==============================================================================
+# Límites de peticiones (ventu_api/throttling.py)
+# ==============================================================================
+# Token bucket sobre CACHES['default']: por IP para anónimos, por usuario
+# para autenticados y límites propios para endpoints públicos sensibles
+# (throttle_scope). Formato 'N/periodo' (s, min, hour, day); vacío = sin límite.
+REST_FRAMEWORK['DEFAULT_THROTTLE_CLASSES'] = (
+    'ventu_api.throttling.AnonTokenBucketThrottle',
+    'ventu_api.throttling.UserTokenBucketThrottle',
+    'ventu_api.throttling.ScopedTokenBucketThrottle',
+)
+REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] = {
+    scope: os.environ.get(f'THROTTLE_RATE_{scope.upper()}', default) or None
+    for scope, default in {
+        'anon': '120/min',
+        'user': '600/min',
+        # Login, registro y tokens JWT (fuerza bruta de contraseñas)
+        'auth': '10/min',
+        'dj_rest_auth': '10/min',
+        # Búsqueda de reservas por código (fuerza bruta de códigos)
+        'booking_verify': '10/min',
+        # Estadísticas públicas del catálogo y diagnóstico
+        'public_stats': '60/min',
+        'diagnostic': '10/min',
+    }.items()
+}
+# Proxies de confianza delante de la app: la IP del cliente es la que agregó
+# el último de ellos en X-Forwarded-For, no lo que envíe el cliente en ese
+# encabezado. Por defecto 0 (REMOTE_ADDR), porque sin un proxy delante el
+# cliente controla X-Forwarded-For; en Render se usa 1 (ver render.yaml).
+REST_FRAMEWORK['NUM_PROXIES'] = int(os.environ.get('THROTTLE_NUM_PROXIES', '0'))
+
+# Tiempo máximo (segundos) de destinations_stats/experiences_stats en caché.
+# Se invalidan antes si cambia el catálogo; el límite acota la desactualización
+# entre procesos cuando la caché no es compartida.
+TOURS_STATS_CACHE_TIMEOUT = int(os.environ.get('TOURS_STATS_CACHE_TIMEOUT', 60 * 60))
+
+# Vida máxima (segundos) de los números de versión de la caché del catálogo:
+# al vencer se arranca una versión nueva y se descarta lo cacheado con la anterior
+TOURS_CACHE_VERSION_TIMEOUT = int(os.environ.get('TOURS_CACHE_VERSION_TIMEOUT', 60 * 60 * 24))
+
+# ETag del listado de tours. Se arma con las versiones de la caché, así que
+# solo es confiable si todos los workers comparten la caché (Redis, Memcached);
+# con locmem cada worker tendría sus propias versiones y respondería 304 viejos.
+TOURS_LIST_ETAG = os.environ.get(
+    'TOURS_LIST_ETAG',
+    str(not CACHES['default']['BACKEND'].endswith(('LocMemCache', 'DummyCache')))
+).lower() == 'true'
+
+# ==============================================================================
+# Búsqueda de tours
+# ==============================================================================
+# Texto completo (PostgreSQL: SearchVector + unaccent, SQLite: FTS5).
+# Con False se usa la búsqueda icontains original.
+TOURS_FULLTEXT_SEARCH = os.environ.get('TOURS_FULLTEXT_SEARCH', 'True').lower() == 'true'
+
+# Reseñas aprobadas incluidas en el detalle de un tour (el resto se pagina
+# en /api/tours/{id}/reviews/)
+TOURS_DETAIL_REVIEWS_LIMIT = int(os.environ.get('TOURS_DETAIL_REVIEWS_LIMIT', 10))
+
 # ==============================================================================
 # CORS Configuration
 # ==============================================================================
@@ -256,6 +345,12 @@ EMAIL_BACKEND = os.environ.get(
     'django.core.mail.backends.console.EmailBackend'
 )
 
+# Los emails de reservas se guardan en bookings.OutboxEmail dentro de la
+# transacción y los envía `manage.py run_outbox`. Tras un fallo se reintenta
+# a los OUTBOX_RETRY_BACKOFF segundos, duplicando la espera en cada intento.
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 5))
+OUTBOX_RETRY_BACKOFF = int(os.environ.get('OUTBOX_RETRY_BACKOFF', 60))
+
 # ==============================================================================
 # Logging Configuration (útil para debugging)
 # ==============================================================================
@@ -0,0 +1,61 @@
+import io
+import uuid
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import skipIf
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from .renderers import ORJSONParser, ORJSONRenderer, orjson
+
+
+@skipIf(orjson is None, 'orjson no está instalado')
+class ORJSONRendererTests(SimpleTestCase):
+
+    def test_output_matches_drf(self):
+        data = {
+            'price': Decimal('10.50'),
+            'created_at': datetime(2026, 3, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+            'local': timezone.localtime(datetime(2026, 3, 1, 12, 0, tzinfo=dt_timezone.utc)),
+            'offset': datetime(2026, 3, 1, 8, 0, tzinfo=dt_timezone(timedelta(hours=-4))),
+            'day': date(2026, 3, 1),
+            'hour': time(8, 30),
+            'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'nested': [{'rating': Decimal('4.25'), 'title': 'Choroní '}],
+            1: 'clave numérica',
+        }
+
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_indented_responses_use_json(self):
+        context = {'indent': 2}
+        self.assertEqual(
+            ORJSONRenderer().render({'a': [1, 2]}, 'application/json', context),
+            JSONRenderer().render({'a': [1, 2]}, 'application/json', context),
+        )
+
+
+@skipIf(orjson is None, 'orjson no está instalado')
+class ORJSONParserTests(TestCase):
+
+    def parse(self, parser, body):
+        return parser.parse(io.BytesIO(body), 'application/json', {})
+
+    def test_parses_like_drf(self):
+        body = '{"title": "Mérida", "price": 10.5, "tags": [1, 2], "nested": {"a": null}}'.encode()
+        self.assertEqual(self.parse(ORJSONParser(), body), self.parse(JSONParser(), body))
+
+    def test_malformed_body_raises_parse_error(self):
+        with self.assertRaises(ParseError):
+            self.parse(ORJSONParser(), b'{"username": ')
+
+    def test_malformed_body_is_a_400(self):
+        response = self.client.post(
+            '/api/token/', data='{"username": ', content_type='application/json', secure=True
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('JSON parse error', response.json()['detail'])
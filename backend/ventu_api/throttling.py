@@ -0,0 +1,124 @@
+"""
+Límites de peticiones con token bucket sobre la caché de Django.
+
+Cada cliente (usuario o IP) tiene un balde de N fichas que se rellena a
+razón de N por periodo; cada petición gasta una. A diferencia de la
+ventana deslizante de DRF (SimpleRateThrottle), el estado es un par
+(fichas, instante) por cliente en vez de la lista de todas sus peticiones,
+y permite ráfagas cortas sin superar el promedio.
+
+Los límites se configuran en REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] con
+el formato de DRF ('30/min'). Con la caché locmem cada worker lleva su
+propia cuenta; para un límite compartido usar una caché común (Redis).
+Como SimpleRateThrottle, leer y escribir el balde no es atómico: con
+peticiones simultáneas del mismo cliente el límite es aproximado.
+
+La IP sale de get_ident() de DRF con REST_FRAMEWORK['NUM_PROXIES']
+(THROTTLE_NUM_PROXIES): sin ese valor DRF usaría el X-Forwarded-For
+completo y un cliente podría estrenar balde en cada petición.
+"""
+
+import time
+
+from django.core.cache import cache as default_cache
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Base: las subclases definen `scope` y get_ident_key()"""
+    cache = default_cache
+    cache_format = 'throttle_bucket_%(scope)s_%(ident)s'
+    scope = None
+    timer = time.time
+
+    def get_ident_key(self, request, view):
+        """Identificador del cliente, o None para no limitar esta petición"""
+        raise NotImplementedError('.get_ident_key() must be overridden')
+
+    def get_scope(self, view):
+        return self.scope
+
+    def parse_rate(self, rate):
+        """'30/min' -> (30, 60)"""
+        num, period = rate.split('/')
+        duration = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+        return int(num), duration
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        scope = self.get_scope(view)
+        if scope is None:
+            return True
+        try:
+            rate = api_settings.DEFAULT_THROTTLE_RATES[scope]
+        except KeyError:
+            raise ImproperlyConfigured(f"No default throttle rate set for '{scope}' scope")
+        if rate is None:
+            return True
+
+        ident = self.get_ident_key(request, view)
+        if ident is None:
+            return True
+
+        capacity, duration = self.parse_rate(rate)
+        refill_per_second = capacity / duration
+        key = self.cache_format % {'scope': scope, 'ident': ident}
+        now = self.timer()
+
+        tokens, last = self.cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - last) * refill_per_second)
+
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        else:
+            self.wait_seconds = (1 - tokens) / refill_per_second
+        # El balde se llena por completo en `duration`: no hace falta guardarlo más
+        self.cache.set(key, (tokens, now), duration)
+        return allowed
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class AnonTokenBucketThrottle(TokenBucketThrottle):
+    """Peticiones anónimas, por IP"""
+    scope = 'anon'
+
+    def get_ident_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return None
+        return self.get_ident(request)
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """Peticiones autenticadas, por usuario"""
+    scope = 'user'
+
+    def get_ident_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return None
+
+
+class ScopedTokenBucketThrottle(TokenBucketThrottle):
+    """
+    Límite propio de una vista o acción según su `throttle_scope`
+    (p. ej. @action(..., throttle_scope='booking_verify')), por usuario o
+    por IP. Las vistas sin throttle_scope no se limitan aquí.
+    """
+
+    def get_scope(self, view):
+        return getattr(view, 'throttle_scope', None) or self.scope
+
+    def get_ident_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return f'user-{request.user.pk}'
+        return f'ip-{self.get_ident(request)}'
+
+
+class AuthTokenBucketThrottle(ScopedTokenBucketThrottle):
+    """Endpoints de tokens JWT (simplejwt no define throttle_scope)"""
+    scope = 'auth'
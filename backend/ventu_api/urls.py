@@ -8,14 +8,18 @@ from rest_framework_simplejwt.views import (
     TokenVerifyView,
     TokenRefreshView,
 )
+from ventu_api.throttling import AnonTokenBucketThrottle, AuthTokenBucketThrottle
+
+# Endpoints de tokens: límite general por IP + límite 'auth' (fuerza bruta)
+token_throttles = [AnonTokenBucketThrottle, AuthTokenBucketThrottle]
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     
     # --- 2. Añade las URLs de simple_jwt ---
     # La ruta 'refresh/' es la que nuestro interceptor necesita para renovar la sesión.
-    path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
-    path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('api/token/', TokenObtainPairView.as_view(throttle_classes=token_throttles), name='token_obtain_pair'),
+    path('api/token/refresh/', TokenRefreshView.as_view(throttle_classes=token_throttles), name='token_refresh'),
 
     # Rutas de Autenticación de dj-rest-auth (registro, login, etc.)
     path('api/auth/', include('dj_rest_auth.urls')),
@@ -27,7 +31,7 @@ urlpatterns = [
     path('api/', include('bookings.urls')),
 
     # JWT endpoints
-    path('api/token/verify/', TokenVerifyView.as_view(), name='token_verify'),
+    path('api/token/verify/', TokenVerifyView.as_view(throttle_classes=token_throttles), name='token_verify'),
 ]
 
 if settings.DEBUG: